@@ -0,0 +1,57 @@
+"""Адаптивный интервал опроса вместо постоянного RETRY_TIME.
+
+Пока работа на ревью, опрашиваем часто; когда ничего не меняется или API
+отвечает ошибкой, интервал растёт экспоненциально до max_interval.
+К каждому интервалу добавляется случайный разброс, чтобы подписчики не
+синхронизировались.
+
+По умолчанию max_interval равен RETRY_TIME: более редкий опрос экономит
+запросы, но на столько же задерживает уведомление о взятой на ревью
+работе (см. benchmarks/simulate_polling.py).
+"""
+import random
+from collections import namedtuple
+
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+ERROR = 'error'
+
+PollPolicy = namedtuple(
+    'PollPolicy',
+    [
+        'base_interval',
+        'min_interval',
+        'max_interval',
+        'reviewing_interval',
+        'backoff',
+        'jitter',
+    ],
+    defaults=(600, 60, 600, 60, 2.0, 0.1),
+)
+
+DEFAULT_POLICY = PollPolicy()
+
+
+def policy_from_dict(data: dict, default=DEFAULT_POLICY) -> PollPolicy:
+    """Политика подписчика: переданные поля поверх политики по умолчанию."""
+    fields = {
+        name: data[name] for name in PollPolicy._fields if name in data
+    }
+    return default._replace(**fields)
+
+
+def next_interval(policy: PollPolicy, previous, outcome: str,
+                  reviewing: bool, rand=random.random) -> float:
+    """Интервал до следующего опроса по итогу текущего."""
+    if previous is None:
+        previous = policy.base_interval
+    if outcome == ERROR:
+        interval = previous * policy.backoff
+    elif reviewing:
+        interval = policy.reviewing_interval
+    elif outcome == CHANGED:
+        interval = policy.base_interval
+    else:
+        interval = max(previous, policy.base_interval) * policy.backoff
+    interval *= 1 + policy.jitter * (2 * rand() - 1)
+    return min(policy.max_interval, max(policy.min_interval, interval))
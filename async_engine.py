@@ -0,0 +1,482 @@
+"""Асинхронный цикл опроса API и отправки уведомлений."""
+import asyncio
+import collections
+import logging
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import aiohttp
+
+import adaptive
+import exceptions
+import homework
+import json_stream
+import lifecycle
+import metrics
+import outbox
+import profiling
+import schema
+import tenants
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+async def get_api_answer_async(session, token: str, current_timestamp: int,
+                               timeout=homework.REQUEST_TIMEOUT):
+    """Асинхронный аналог homework.get_tenant_api_answer."""
+    return await _call_api(
+        _request_api_async, session, token, current_timestamp, timeout)
+
+
+async def open_stream_async(session, token: str, current_timestamp: int,
+                            timeout=homework.REQUEST_TIMEOUT):
+    """Асинхронный аналог homework.get_tenant_api_stream: возвращает
+    AsyncValidatedStream. Кеш ответов не используется.
+    """
+    return await _call_api(
+        _open_stream_async, session, token, current_timestamp, timeout)
+
+
+async def _call_api(request, *args):
+    breaker = homework.api_breaker
+    with metrics.API_LATENCY.time():
+        if breaker is None:
+            return await request(*args)
+        breaker.check()
+        try:
+            response = await request(*args)
+        except breaker.ignore:
+            breaker.record_success()
+            raise
+        except BaseException:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return response
+
+
+async def _request_api_async(session, token, current_timestamp, timeout):
+    params = {'from_date': current_timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    cache = homework.response_cache
+    if cache is not None:
+        headers.update(cache.request_headers(token, params))
+    try:
+        async with session.get(
+            homework.ENDPOINT, headers=headers, params=params,
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if (cache is not None
+                    and response.status == HTTPStatus.NOT_MODIFIED):
+                return cache.not_modified(token)
+            await _check_status(response, token, params)
+            if cache is not None:
+                return cache.decode(
+                    token, params, await response.read(), response.headers)
+            return await response.json(content_type=None)
+    except asyncio.TimeoutError:
+        raise ConnectionError(
+            f'API не ответил за {timeout} с: {homework.ENDPOINT},{params}')
+    except aiohttp.ClientError as error:
+        raise ConnectionError(
+            f'Не удалось подключиться к API {error}, '
+            f'{homework.ENDPOINT},{params}')
+
+
+async def _check_status(response, token, params):
+    if response.status in homework.UNAUTHORIZED:
+        homework.reject_token(token)
+    if response.status != HTTPStatus.OK:
+        raise ConnectionError(
+            'Возникла ошибка соединения!'
+            f'{response.status}, {response.reason},'
+            f'{await response.text()},{homework.ENDPOINT},{params}'
+        )
+
+
+async def _open_stream_async(session, token, current_timestamp, timeout):
+    params = {'from_date': current_timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    try:
+        response = await session.get(
+            homework.ENDPOINT, headers=headers, params=params,
+            timeout=aiohttp.ClientTimeout(total=timeout))
+    except asyncio.TimeoutError:
+        raise ConnectionError(
+            f'API не ответил за {timeout} с: {homework.ENDPOINT},{params}')
+    except aiohttp.ClientError as error:
+        raise ConnectionError(
+            f'Не удалось подключиться к API {error}, '
+            f'{homework.ENDPOINT},{params}')
+    try:
+        await _check_status(response, token, params)
+    except BaseException:
+        response.release()
+        raise
+    return AsyncValidatedStream(response)
+
+
+class AsyncValidatedStream:
+    """schema.ValidatedStream для ответа aiohttp.
+
+    async for отдаёт пачки проверенных HomeworkRecord по мере чтения
+    кусков тела: в памяти лежит одна пачка, а не весь ответ. После
+    итерации заполняется current_date. close() освобождает соединение.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.current_date = None
+
+    async def __aiter__(self):
+        parser = json_stream.HomeworkStreamParser()
+        errors = []
+        seen = 0
+        try:
+            async for chunk in self.response.content.iter_chunked(
+                    homework.STREAM_CHUNK_SIZE):
+                items = parser.feed(chunk)
+                yield schema.validate_homeworks(items, errors, seen)
+                seen += len(items)
+        except asyncio.TimeoutError:
+            raise ConnectionError('API не дослал ответ вовремя')
+        except aiohttp.ClientError as error:
+            raise ConnectionError(f'Обрыв ответа API: {error}')
+        yield schema.validate_homeworks(parser.close(), errors, seen)
+        self.current_date = schema.finish_stream(parser, errors)
+
+    def close(self):
+        self.response.release()
+
+
+def _updated_before(item, from_date: int) -> bool:
+    try:
+        updated = datetime.strptime(item['date_updated'], DATE_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return False
+    return updated.replace(tzinfo=timezone.utc).timestamp() < from_date
+
+
+def updated_since(response, from_date: int):
+    """Ответ API без работ, обновлённых раньше from_date.
+
+    Если отбрасывать нечего или ответ не разобрать, возвращается он сам:
+    проверять его будет schema.validate_response.
+    """
+    try:
+        homeworks = response['homeworks']
+        kept = [
+            item for item in homeworks
+            if not _updated_before(item, from_date)
+        ]
+    except (KeyError, TypeError):
+        return response
+    if len(kept) == len(homeworks):
+        return response
+    return dict(response, homeworks=kept)
+
+
+class SingleFlight:
+    """Объединяет одновременные запросы к API по одному токену.
+
+    Пока запрос с from_date идёт, опрос того же токена с from_date не
+    раньше него не шлёт свой запрос, а ждёт общий ответ: в нём есть всё,
+    что изменилось с его from_date. Работы, обновлённые раньше from_date
+    опроса, из ответа для него отбрасываются. Ошибка общего запроса
+    достаётся всем его ожидающим, а предохранитель API учитывает её один
+    раз. Отмена одного ожидающего не отменяет запрос для остальных.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def get(self, token: str, from_date: int, fetch):
+        """Ответ API для (token, from_date); fetch(token, from_date) —
+        корутина настоящего запроса.
+        """
+        for started_from, task in self._flights.get(token, ()):
+            if started_from <= from_date:
+                metrics.API_COALESCED.inc()
+                response = await asyncio.shield(task)
+                if from_date == started_from:
+                    return response
+                return updated_since(response, from_date)
+        task = asyncio.ensure_future(fetch(token, from_date))
+        flight = (from_date, task)
+        self._flights.setdefault(token, []).append(flight)
+        task.add_done_callback(lambda _: self._land(token, flight))
+        return await asyncio.shield(task)
+
+    def _land(self, token, flight):
+        flights = self._flights[token]
+        flights.remove(flight)
+        if not flights:
+            del self._flights[token]
+        task = flight[1]
+        # Ошибку могли не забрать, если все ожидающие отменены.
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self):
+        return sum(len(flights) for flights in self._flights.values())
+
+
+async def notify_async(poller, subscription, message: str, key=None):
+    """poller.notify, не блокирующий цикл событий."""
+    await asyncio.to_thread(poller.notify, subscription, message, key)
+
+
+class AsyncTenantPoller(tenants.TenantPoller):
+    """Опрос подписчика с ограничением числа одновременных запросов."""
+
+    def __init__(self, bot, session, concurrency=homework.POLL_CONCURRENCY,
+                 timeout=homework.REQUEST_TIMEOUT, start_timestamp=None,
+                 store=None, registry=None):
+        super().__init__(bot, start_timestamp, store, registry)
+        self.session = session
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timeout = timeout
+        self.flights = SingleFlight()
+        # Опрос и вебхук одной подписки разбирают ответы по очереди:
+        # иначе оба увидят одни и те же изменения до записи отпечатков.
+        self.locks = collections.defaultdict(asyncio.Lock)
+
+    async def __call__(self, subscription):
+        metrics.POLLS.inc()
+        await self.handle(subscription)
+
+    async def fetch(self, token: str, from_date: int):
+        """Ответ API; одновременные опросы токена делят один запрос."""
+        return await self.flights.get(token, from_date, self._request)
+
+    async def _request(self, token: str, from_date: int):
+        async with self.semaphore:
+            with profiling.stage('get_api_answer'):
+                return await get_api_answer_async(
+                    self.session, token, from_date, self.timeout)
+
+    async def push(self, subscription, response: dict):
+        """Обрабатывает ответ, присланный вебхуком, без запроса к API.
+
+        Курсор не сдвигается: опрос остаётся сверкой на случай
+        потерянных вебхуков, а повторы отсекаются по отпечаткам.
+        """
+        await self.handle(subscription, response)
+
+    async def handle(self, subscription, response=None):
+        """Запрашивает API (если ответ не передан) и рассылает изменения."""
+        state = self.state(subscription)
+        outcome = adaptive.ERROR
+        try:
+            if response is None and self.stream:
+                sent = await self._handle_stream(subscription, state)
+            else:
+                sent = await self._handle_response(
+                    subscription, state, response)
+            outcome = adaptive.CHANGED if sent else adaptive.UNCHANGED
+        except exceptions.NoTelegramError as error:
+            metrics.count_error(error)
+            logger.error(error)
+        except Exception as error:
+            metrics.count_error(error)
+            message = self.failure_message(state, error)
+            if message is not None:
+                try:
+                    await notify_async(self, subscription, message)
+                except exceptions.NoTelegramError as send_error:
+                    logger.error(send_error)
+        self.finish(subscription, state, outcome)
+
+    async def _handle_response(self, subscription, state, response):
+        advance = response is None
+        if advance:
+            response = await self.fetch(subscription.token, state.cursor)
+        async with self.locks[subscription]:
+            return await self._send_all(subscription, state, self.process(
+                subscription, state, response, advance))
+
+    async def _handle_stream(self, subscription, state):
+        """Опрос с потоковым разбором: изменения рассылаются по мере
+        чтения ответа, как в TenantPoller.process_stream. Такие запросы
+        не объединяются (SingleFlight): поток нельзя раздать нескольким
+        опросам, не храня тело целиком.
+        """
+        async with self.semaphore:
+            with profiling.stage('get_api_answer'):
+                stream = await open_stream_async(
+                    self.session, subscription.token, state.cursor,
+                    self.timeout)
+        sent = 0
+        try:
+            async with self.locks[subscription]:
+                async for records in stream:
+                    sent += await self._send_all(
+                        subscription, state,
+                        self._changes(subscription, state, records))
+        finally:
+            stream.close()
+        state.cursor = stream.current_date
+        self._count_changes(subscription, sent, 'в потоке ответа')
+        return sent
+
+    async def _send_all(self, subscription, state, changed) -> int:
+        sent = 0
+        for key, fingerprint, message in changed:
+            await notify_async(
+                self, subscription, message,
+                outbox.message_key(subscription, key, fingerprint))
+            state.fingerprints[key] = fingerprint
+            sent += 1
+        return sent
+
+
+class AsyncEngine:
+    """Планирует опросы подписчиков и выполняет их конкурентно."""
+
+    def __init__(self, registry, bot, concurrency=homework.POLL_CONCURRENCY,
+                 timeout=homework.REQUEST_TIMEOUT, period=homework.RETRY_TIME,
+                 start_timestamp=None, store=None, leases=None):
+        self.registry = registry
+        self.leases = leases
+        self.bot = bot
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.period = period
+        self.start_timestamp = start_timestamp
+        self.store = store
+        self.poller = None
+        self._tasks = set()
+
+    def _session(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        return aiohttp.ClientSession(connector=connector)
+
+    def _poller(self, session=None):
+        if self.poller is None:
+            self.poller = AsyncTenantPoller(
+                self.bot, session, self.concurrency, self.timeout,
+                self.start_timestamp, self.store, self.registry)
+        if session is not None:
+            self.poller.session = session
+        return self.poller
+
+    def push(self, token: str, response: dict) -> int:
+        """Ставит в обработку присланный ответ для всех подписок токена."""
+        subscriptions = self.registry.by_token(token)
+        poller = self._poller()
+        if self.leases is not None:
+            subscriptions = [
+                sub for sub in subscriptions
+                if self.leases.claim(sub, poller)
+            ]
+        for subscription in subscriptions:
+            self._spawn(poller.push(subscription, response))
+        return len(subscriptions)
+
+    async def drain(self):
+        """Ждёт завершения всех запущенных опросов и обработок."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def poll_all(self):
+        """Один проход по всем подписчикам без распределения по окну."""
+        async with self._session() as session:
+            poller = self._poller(session)
+            await asyncio.gather(*(poller(sub) for sub in self.registry))
+
+    async def run_forever(self, process=None):
+        """Основной цикл: опросы распределены по окну period.
+
+        Когда process (lifecycle.Lifecycle) останавливается, новые опросы
+        не начинаются, а начатые доводятся до конца, пока есть время.
+        """
+        loop = asyncio.get_running_loop()
+        process = process or lifecycle.Lifecycle()
+        wakeup = asyncio.Event()
+        process.add_waker(lambda: loop.call_soon_threadsafe(wakeup.set))
+        async with self._session() as session:
+            poller = self._poller(session)
+
+            def poll(subscription):
+                if (self.leases is None
+                        or self.leases.claim(subscription, poller)):
+                    self._spawn(poller(subscription))
+
+            scheduler = tenants.PollScheduler(
+                self.registry, poll,
+                period=self.period, clock=loop.time,
+                interval=poller.interval, pause=tenants.api_pause)
+            while not process.stopping.is_set():
+                wakeup.clear()
+                process.reload_if_requested()
+                if homework.outbox is not None:
+                    homework.outbox.replay(self.bot)
+                scheduler.sync()
+                scheduler.run_pending()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), scheduler.delay())
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await asyncio.wait_for(self.drain(), process.remaining())
+            except asyncio.TimeoutError:
+                logger.error(
+                    f'Не дождались завершения опросов: {len(self._tasks)}')
+
+
+def run(bot, path: str, store=None, webhook_port=None, worker_id=0,
+        worker_count=1, process=None, checks=None):
+    """Запускает асинхронный опрос всех подписок из файла.
+
+    Если указан webhook_port, рядом поднимается приём вебхуков, а опрос
+    продолжает работать как сверка. При worker_count > 1 опрашивается
+    только шард worker_id, см. sharding.py. Сигналы процесса
+    обрабатывает process, см. lifecycle.py: по SIGHUP файл подписок
+    перечитывается. Токены подписок проверяются до первого опроса, а
+    подписки с недействительными токенами не опрашиваются, пока checks
+    (preflight.TokenChecks) помнит результат.
+    """
+    process = process or lifecycle.Lifecycle()
+    registry = base = tenants.load_registry(path)
+    process.on_reload(lambda: tenants.reload_registry(base, path))
+    leases = None
+    if worker_count > 1:
+        import sharding
+        registry, leases = sharding.shard(
+            registry, store, worker_id, worker_count)
+        leases.start()
+    if checks is not None:
+        import preflight
+        checked = registry
+        preflight.check_tokens(checked, checks)
+        process.on_reload(lambda: preflight.check_tokens(checked, checks))
+        registry = preflight.QuarantinedRegistry(checked, checks)
+    engine = AsyncEngine(registry, bot, store=store, leases=leases)
+
+    async def main():
+        process.install_async(asyncio.get_running_loop())
+        runner = None
+        if webhook_port:
+            import webhook
+            runner = await webhook.start(engine, webhook_port)
+        profiling.start()
+        try:
+            await engine.run_forever(process)
+        finally:
+            profiling.stop()
+            if runner is not None:
+                await runner.cleanup()
+
+    try:
+        asyncio.run(main())
+    finally:
+        if leases is not None:
+            leases.release()
@@ -0,0 +1,255 @@
+"""Догрузка истории статусов: python launcher.py backfill --since ...
+
+Запрашивает API Практикума с from_date=since для всех токенов из файла
+подписок в пуле потоков, не превышая общий лимит запросов. Уже
+отправленные статусы отсекаются по отпечаткам в хранилище состояния
+(homework_diff.History): из истории работы отправляются только записи
+новее её сохранённого состояния, поэтому повторный запуск ничего не
+дублирует. Курсор подписчика после
+догрузки не отстаёт от current_date ответа.
+
+Ответ с since в прошлом большой, поэтому он разбирается потоком
+(json_stream), а каждая прочитанная запись сразу раздаётся подпискам
+токена: статусы уходят в порядке ответа API, и весь ответ в памяти не
+копится. С --latest-only ответ сначала сводится к последней записи
+каждой работы, и они отправляются по возрастанию date_updated.
+"""
+import argparse
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import telegram
+
+import exceptions
+import homework
+import homework_diff
+import notifiers
+import state_store
+import tenants
+from message_queue import MessageQueue, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 5.0
+
+BackfillReport = namedtuple(
+    'BackfillReport',
+    ['tokens', 'requests', 'over_budget', 'errors', 'sent', 'duplicates'])
+
+
+class RequestBudget:
+    """Общий на все потоки лимит: rate запросов в секунду и не больше
+    total запросов за запуск (None — без ограничения).
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, total=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.total = total
+        self.used = 0
+        self.clock = clock
+        self.sleep = sleep
+        self._bucket = TokenBucket(rate, max(1.0, rate), clock())
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Ждёт своей очереди; False, если запросы за запуск кончились."""
+        with self._lock:
+            if self.total is not None and self.used >= self.total:
+                return False
+            self.used += 1
+            now = self.clock()
+            delay = self._bucket.delay(now)
+            self._bucket.consume(now)
+        # Токен уже списан, поэтому ждать можно без блокировки.
+        if delay > 0:
+            self.sleep(delay)
+        return True
+
+
+def latest_only(records):
+    """Оставляет для каждой работы запись с самым поздним date_updated."""
+    latest = {}
+    for record in records:
+        key = homework_diff.homework_key(record)
+        current = latest.get(key)
+        if current is None or (record.date_updated or '') >= (
+                current.date_updated or ''):
+            latest[key] = record
+    return list(latest.values())
+
+
+class Backfill:
+    """Один запуск догрузки по реестру подписок."""
+
+    def __init__(self, bot, registry, since: int, store=None, budget=None,
+                 workers: int = DEFAULT_WORKERS, latest: bool = False):
+        self.bot = bot
+        self.registry = registry
+        self.since = since
+        self.budget = budget or RequestBudget()
+        self.workers = workers
+        self.latest = latest
+        self.poller = tenants.TenantPoller(
+            bot, start_timestamp=since, store=store, registry=registry)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(BackfillReport._fields, 0)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def run(self) -> BackfillReport:
+        """Догружает историю всех токенов и возвращает итоги."""
+        tokens = list(dict.fromkeys(sub.token for sub in self.registry))
+        self._count('tokens', len(tokens))
+        with ThreadPoolExecutor(self.workers) as pool:
+            list(pool.map(self.fetch, tokens))
+        self.poller.store.flush()
+        return BackfillReport(**self._counts)
+
+    def fetch(self, token: str):
+        """Один запрос на токен, ответ раздаётся всем его подпискам."""
+        if not self.budget.acquire():
+            self._count('over_budget')
+            return
+        self._count('requests')
+        replays = [
+            Replay(self.poller, subscription)
+            for subscription in self.registry.by_token(token)
+        ]
+        try:
+            stream = homework.get_tenant_api_stream(token, self.since)
+            records = stream
+            if self.latest:
+                records = sorted(
+                    latest_only(stream),
+                    key=lambda item: item.date_updated or '')
+            for item in records:
+                for replay in replays:
+                    replay.feed(item)
+            for replay in replays:
+                replay.finish(stream.current_date)
+        except (Exception, exceptions.NoTelegramError) as error:
+            self._count('errors')
+            logger.error(f'Догрузка токена не удалась: {error}')
+        for replay in replays:
+            replay.save()
+            self._count('errors', replay.error is not None)
+            self._count('sent', replay.sent)
+            self._count('duplicates', replay.records - replay.sent)
+
+
+class Replay:
+    """Догрузка для одной подписки: записи подаются по одной."""
+
+    def __init__(self, poller, subscription):
+        self.poller = poller
+        self.subscription = subscription
+        self.state = poller.state(subscription)
+        self.history = homework_diff.History(self.state.fingerprints)
+        self.render = poller.renderer(subscription)
+        self.records = 0
+        self.sent = 0
+        self.error = None
+
+    def feed(self, record):
+        """Отправляет запись, если подписчик её ещё не получал."""
+        self.records += 1
+        self._send(self.history.feed(record))
+
+    def finish(self, current_date: int):
+        """Досылает отложенное и сдвигает курсор, если не было ошибок."""
+        self._send(self.history.finish())
+        if self.error is None:
+            self.state.cursor = max(self.state.cursor, current_date)
+
+    def save(self):
+        self.poller.save(self.subscription, self.state)
+
+    def _send(self, changed):
+        # После ошибки отправки подписчику до конца ответа ничего не шлём.
+        if self.error is not None:
+            return
+        try:
+            for key, fingerprint, item in changed:
+                self.poller.notify(self.subscription, self.render(item))
+                self.history.delivered(key, fingerprint, item)
+                self.sent += 1
+        except (Exception, exceptions.NoTelegramError) as error:
+            self.error = error
+            logger.error(f'Догрузка для чата {self.subscription.chat_id} '
+                         f'прервана: {error}')
+
+
+def parse_since(value: str) -> int:
+    """Unix-время или дата ISO 8601 (без зоны — UTC)."""
+    if value.isdigit():
+        return int(value)
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Ожидалось unix-время или дата ISO 8601: {value}')
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='launcher.py backfill',
+        description='Догрузка истории статусов домашних работ.')
+    parser.add_argument(
+        '--since', type=parse_since, required=True,
+        help='с какого момента: unix-время или дата ISO 8601')
+    parser.add_argument(
+        '--tenants', default=homework.SUBSCRIPTIONS_FILE,
+        help='JSON-файл подписок; по умолчанию SUBSCRIPTIONS_FILE, без '
+             'него — подписка из PRACTICUM_TOKEN и TELEGRAM_CHAT_ID')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument(
+        '--rate', type=float, default=DEFAULT_RATE,
+        help='запросов к API в секунду на все потоки')
+    parser.add_argument(
+        '--max-requests', type=int, default=None,
+        help='запросов к API за запуск, остальные токены пропускаются')
+    parser.add_argument(
+        '--latest-only', action='store_true',
+        help='отправлять только последний статус каждой работы')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    """Точка входа команды backfill."""
+    args = parse_args(argv)
+    if args.tenants:
+        registry = tenants.load_registry(args.tenants)
+    elif homework.check_tokens():
+        registry = tenants.SubscriptionRegistry(
+            [(homework.PRACTICUM_TOKEN, homework.TELEGRAM_CHAT_ID)])
+    else:
+        raise SystemExit('Нет ни файла подписок, ни переменных окружения')
+    homework.use_session(homework.create_session(pool_size=args.workers))
+    bot = telegram.Bot(
+        token=homework.TELEGRAM_TOKEN, base_url=homework.TELEGRAM_API_URL)
+    queue = MessageQueue(bot).start()
+    fanout = notifiers.create_fanout(queue)
+    homework.use_notifier(fanout)
+    store = state_store.open_store(homework.STATE_DB)
+    try:
+        report = Backfill(
+            queue, registry, args.since, store,
+            RequestBudget(args.rate, args.max_requests),
+            args.workers, args.latest_only,
+        ).run()
+    finally:
+        fanout.stop()
+        queue.stop()
+        store.close()
+    logger.info(f'Догрузка завершена: {report._asdict()}')
+    return report
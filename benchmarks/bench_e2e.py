@@ -0,0 +1,134 @@
+"""Сквозной бенчмарк: main() против заглушек из simulator.py.
+
+Бот запускается отдельным процессом (python launcher.py) в режиме
+нескольких подписчиков с коротким интервалом опроса. Заглушка API меняет
+статусы работ, заглушка Telegram записывает время получения сообщений.
+Для каждого сценария печатаются пропускная способность и задержка от
+смены статуса до уведомления.
+
+С --workers N бот запускается как python launcher.py workers N с общим
+SQLite-хранилищем, см. sharding.py. С --share K на каждый токен
+подписано K чатов: их опросы объединяются в один запрос к API.
+
+Запуск: python benchmarks/bench_e2e.py [--tenants 1000] [--duration 30]
+        [--scenario clean flaky rate-limited] [--workers 1] [--share 1]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulator import (  # noqa: E402
+    Latency, PracticumSimulator, TelegramSimulator, percentile)
+
+SCENARIOS = {
+    'clean': {},
+    'flaky': {'error_rate': 0.05, 'timeout_rate': 0.01,
+              'malformed_rate': 0.02},
+    'rate-limited': {'telegram_rate_limit': 0.2},
+}
+POLICY = {
+    'base_interval': 2, 'min_interval': 1, 'max_interval': 4,
+    'reviewing_interval': 1, 'jitter': 0.1,
+}
+
+
+def run_scenario(name, args):
+    options = SCENARIOS[name]
+    api = PracticumSimulator(
+        homeworks_per_token=args.homeworks,
+        transition_interval=args.transition_interval,
+        latency=Latency(args.api_latency),
+        error_rate=options.get('error_rate', 0.0),
+        timeout_rate=options.get('timeout_rate', 0.0),
+        malformed_rate=options.get('malformed_rate', 0.0),
+        hang=3.0, seed=1,
+    ).start()
+    bot_api = TelegramSimulator(
+        latency=Latency(args.telegram_latency),
+        rate_limit_rate=options.get('telegram_rate_limit', 0.0), seed=1,
+    ).start()
+    with tempfile.NamedTemporaryFile(
+            'w', suffix='.json', delete=False) as file:
+        json.dump([
+            {'token': f'token-{number // args.share}', 'chat_id': number,
+             'policy': POLICY}
+            for number in range(args.tenants)
+        ], file)
+    state_dir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        SUBSCRIPTIONS_FILE=file.name,
+        PRACTICUM_ENDPOINT=api.url,
+        TELEGRAM_API_URL=bot_api.url,
+        TELEGRAM_TOKEN='123:bench',
+        RETRY_TIME='2',
+        STATE_DB=os.path.join(state_dir, 'state.db'),
+        LOG_FILE='',
+        LOG_LEVEL='CRITICAL',
+    )
+    started = time.time()
+    command = [sys.executable, os.path.join(ROOT, 'launcher.py')]
+    if args.workers > 1:
+        command += ['workers', str(args.workers)]
+    bot = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+    try:
+        time.sleep(args.duration)
+    finally:
+        bot.terminate()
+        bot.wait()
+        api.stop()
+        bot_api.stop()
+        os.unlink(file.name)
+        shutil.rmtree(state_dir)
+    elapsed = time.time() - started
+
+    latencies = bot_api.notification_latencies(api.transitions)
+    transitions = api.stats['transitions']
+    print(f'\n[{name}] tenants: {args.tenants}, workers: {args.workers}, '
+          f'share: {args.share}, {elapsed:.0f}s')
+    print(f'  API requests:      {api.stats["requests"]} '
+          f'({api.stats["requests"] / elapsed:.0f}/s), '
+          f'errors {api.stats["errors"]}, timeouts {api.stats["timeouts"]}, '
+          f'malformed {api.stats["malformed"]}')
+    print(f'  Telegram:          {bot_api.stats["messages"]} messages '
+          f'({bot_api.stats["messages"] / elapsed:.0f}/s), '
+          f'429: {bot_api.stats["rate_limited"]}')
+    # Смены, перекрытые следующей до ближайшего опроса, увидеть нельзя.
+    served = api.stats['served']
+    print(f'  status changes:    {transitions}, superseded before a poll '
+          f'{api.stats["superseded"]}, returned by the API {served}, '
+          f'notified {len(latencies)} '
+          f'({len(latencies) / max(1, served):.0%} of returned)')
+    print(f'  notify latency:    p50 {percentile(latencies, 0.5):.2f}s, '
+          f'p95 {percentile(latencies, 0.95):.2f}s, '
+          f'p99 {percentile(latencies, 0.99):.2f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--homeworks', type=int, default=2)
+    parser.add_argument('--transition-interval', type=float, default=60)
+    parser.add_argument('--api-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-latency', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--share', type=int, default=1)
+    parser.add_argument(
+        '--scenario', nargs='+', choices=sorted(SCENARIOS),
+        default=['clean', 'flaky', 'rate-limited'])
+    args = parser.parse_args()
+    for name in args.scenario:
+        run_scenario(name, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Бенчмарк: время импорта homework по python -X importtime.
+
+Импортирует модуль в --runs свежих интерпретаторах, печатает медиану и
+самые долгие прямые импорты и завершается с кодом 1, если медиана больше
+--budget миллисекунд или импорт подтянул telegram, requests или dotenv.
+Время site и самого интерпретатора не учитывается.
+
+Запуск: python benchmarks/bench_import.py [--runs 5] [--budget 60]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('telegram', 'requests', 'dotenv')
+
+
+def import_times(module):
+    """[(глубина, модуль, накопленное время в мкс)] в порядке вывода:
+    вложенные импорты идут перед импортировавшим их модулем.
+    """
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    times = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Отступ в имени — глубина вложенности импорта.
+        depth = (len(name) - len(name.lstrip())) // 2
+        times.append((depth, name.strip(), int(cumulative)))
+    return times
+
+
+def children(times, module):
+    """Прямые импорты module: (время, имя), самые долгие первыми."""
+    end = next(
+        number for number, item in enumerate(times)
+        if item[:2] == (0, module))
+    found = []
+    for depth, name, cumulative in reversed(times[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            found.append((cumulative, name))
+    return sorted(found, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--module', default='homework')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=60,
+                        help='миллисекунд на импорт модуля')
+    args = parser.parse_args()
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    total = statistics.median(
+        cumulative for times in runs
+        for depth, name, cumulative in times
+        if (depth, name) == (0, args.module)) / 1000
+    last = runs[-1]
+    heavy = sorted({
+        name.split('.')[0] for _, name, _ in last
+        if name.split('.')[0] in HEAVY
+    })
+    print(f'import {args.module}: {total:.1f} ms '
+          f'(median of {args.runs}, budget {args.budget:g} ms)')
+    for cumulative, name in children(last, args.module)[:5]:
+        print(f'  {name:20} {cumulative / 1000:6.1f} ms')
+    if heavy:
+        print(f'heavy modules imported: {", ".join(heavy)}')
+    if total > args.budget or heavy:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Бенчмарк: устойчивая пропускная способность очереди сообщений.
+
+Фейковый бот отвечает с задержкой и иногда возвращает 429. Очередь
+получает поток статусов для множества чатов; считаем, сколько вызовов
+send_message в секунду удерживается и сколько статусов склеилось.
+
+Запуск: python benchmarks/bench_message_queue.py [--seconds 10]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+import telegram
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message_queue  # noqa: E402
+
+
+class FakeBot:
+    """Бот с задержкой ответа и долей ответов 429."""
+
+    def __init__(self, latency, throttle_ratio):
+        self.latency = latency
+        self.throttle_ratio = throttle_ratio
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        time.sleep(self.latency)
+        if random.random() < self.throttle_ratio:
+            raise telegram.error.RetryAfter(1)
+        with self.lock:
+            self.calls += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--statuses-per-second', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--throttle-ratio', type=float, default=0.01)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    bot = FakeBot(args.latency, args.throttle_ratio)
+    queue = message_queue.MessageQueue(bot).start()
+    produced = 0
+    started = time.monotonic()
+    while time.monotonic() - started < args.seconds:
+        for _ in range(args.statuses_per_second // 10):
+            queue.send_message(random.randrange(args.chats), 'статус')
+            produced += 1
+        time.sleep(0.1)
+    elapsed = time.monotonic() - started
+    calls_in_window = bot.calls
+    queue.stop(timeout=60)
+
+    print(f'statuses produced:   {produced} '
+          f'({produced / elapsed:.0f}/s into {args.chats} chats)')
+    print(f'sustained sends:     {calls_in_window / elapsed:.1f} msg/s '
+          f'(limit {message_queue.GLOBAL_RATE} msg/s)')
+    print(f'total sends:         {bot.calls}, 429 retries: '
+          f'{queue.sent - queue.delivered - queue.failed}')
+    print(f'coalescing ratio:    {produced / max(bot.calls, 1):.2f} '
+          'statuses per message')
+
+
+if __name__ == '__main__':
+    main()
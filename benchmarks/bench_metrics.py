@@ -0,0 +1,100 @@
+"""Бенчмарк: накладные расходы метрик на один опрос.
+
+Сравнивает цикл TenantPoller с фейковыми API и ботом (без сети) с
+включёнными метриками и с метриками, заменёнными на пустышки; берётся
+лучший из нескольких чередующихся прогонов.
+
+Запуск: python benchmarks/bench_metrics.py [--polls 50000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import metrics  # noqa: E402
+import tenants  # noqa: E402
+
+
+class NullMetric:
+    """Метрика, которая ничего не делает."""
+
+    def inc(self, amount=1):
+        pass
+
+    def labels(self, *values):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeBot:
+
+    def send_message(self, chat_id, text):
+        pass
+
+
+def fake_api(token, timestamp):
+    return {
+        'homeworks': [{
+            'id': timestamp % 3,
+            'homework_name': 'hw',
+            'status': ('reviewing', 'approved')[timestamp % 2],
+        }],
+        'current_date': timestamp + 1,
+    }
+
+
+def run(polls):
+    poller = tenants.TenantPoller(FakeBot(), start_timestamp=0)
+    subscription = tenants.Subscription('token', 1)
+    started = time.perf_counter()
+    for _ in range(polls):
+        poller(subscription)
+    return (time.perf_counter() - started) / polls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--polls', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    homework._request_api = fake_api
+
+    names = ('POLLS', 'STATUS_CHANGES', 'TELEGRAM_SENDS', 'ERRORS',
+             'API_LATENCY', 'SEND_LATENCY')
+    real = {name: getattr(metrics, name) for name in names}
+    null = {name: NullMetric() for name in names}
+    enabled, disabled = [], []
+    for _ in range(args.repeat):
+        for variant, results in ((real, enabled), (null, disabled)):
+            for name, metric in variant.items():
+                setattr(metrics, name, metric)
+            results.append(run(args.polls))
+    for name, metric in real.items():
+        setattr(metrics, name, metric)
+    enabled, disabled = min(enabled), min(disabled)
+
+    print(f'polls:                 {args.polls}')
+    print(f'poll with metrics:     {enabled * 1e6:.2f} us')
+    print(f'poll without metrics:  {disabled * 1e6:.2f} us')
+    print(f'metrics overhead:      {(enabled - disabled) * 1e6:.2f} us/poll '
+          f'({(enabled - disabled) / disabled:.1%} of a network-free poll)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Бенчмарк: запись уведомлений в журнал outbox.
+
+Сравнивает outbox.Outbox (групповая запись: один fsync на всё, что
+накопилось) с записью, где на каждое уведомление свой write и fsync.
+Писатели — --threads потоков, как потоки asyncio.to_thread в боте.
+
+Запуск: python benchmarks/bench_outbox.py [--messages 5000] [--threads 32]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import outbox  # noqa: E402
+
+
+class FsyncEach:
+    """Журнал без групповой записи: fsync на каждую запись."""
+
+    def __init__(self, path):
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def add(self, key, chat_id, text):
+        line = outbox._line({'add': key, 'chat': chat_id, 'text': text})
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def run(journal, messages, threads):
+    text = 'Изменился статус проверки работы "hw.zip". ' * 2
+
+    def append(worker):
+        for number in range(worker, messages, threads):
+            journal.add(f'{number}:key', number, text)
+
+    workers = [
+        threading.Thread(target=append, args=(worker,))
+        for worker in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    journal.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=32)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    directory = tempfile.mkdtemp()
+    print(f'messages: {args.messages}, threads: {args.threads}')
+    for name, factory in (
+            ('fsync per message', FsyncEach),
+            ('group commit', outbox.Outbox)):
+        path = os.path.join(directory, name.replace(' ', '-'))
+        journal = factory(path)
+        seconds = run(journal, args.messages, args.threads)
+        commits = getattr(journal, 'commits', args.messages)
+        print(f'{name:18} {seconds:7.2f} s, '
+              f'{args.messages / seconds:8.0f} msg/s, fsync: {commits}')
+
+
+if __name__ == '__main__':
+    main()
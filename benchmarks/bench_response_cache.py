@@ -0,0 +1,137 @@
+"""Бенчмарк: трафик и CPU с условными запросами и кешем ответов.
+
+Локальная заглушка API отдаёт большой ответ, который меняется раз в
+--change-every опросов. С --no-etag заглушка не поддерживает ETag, и
+экономия идёт только за счёт сравнения хеша тела. Время CPU считается
+для всего процесса, включая заглушку, поэтому экономия клиента занижена.
+
+Заглушка отдаёт постоянный current_date, поэтому from_date опроса не
+меняется. Настоящий API с каждым ответом сдвигает current_date, и опрос
+сдвигает from_date: там условных запросов и совпадений хеша не бывает, а
+эта экономия достижима только на повторах с тем же from_date.
+
+Запуск: python benchmarks/bench_response_cache.py [--polls 300]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import response_cache  # noqa: E402
+import tenants  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Отдаёт текущую версию ответа, поддерживает If-None-Match."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = b''
+    etag = ''
+    use_etag = True
+    bytes_sent = 0
+
+    def do_GET(self):
+        cls = type(self)
+        if cls.use_etag and self.headers.get('If-None-Match') == cls.etag:
+            self.send_response(304)
+            self.send_header('ETag', cls.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cls.body)))
+        if cls.use_etag:
+            self.send_header('ETag', cls.etag)
+        self.end_headers()
+        self.wfile.write(cls.body)
+        cls.bytes_sent += len(cls.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def set_version(version, homeworks):
+    StubHandler.body = json.dumps({
+        'homeworks': [
+            {
+                'id': i,
+                'homework_name': f'student__project_{i}.zip',
+                'status': 'approved' if i != version % homeworks
+                else 'reviewing',
+                'reviewer_comment': 'Всё отлично. ' * 10,
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for i in range(homeworks)
+        ],
+        'current_date': 1_600_000_000,
+    }, ensure_ascii=False).encode()
+    StubHandler.etag = '"' + hashlib.md5(StubHandler.body).hexdigest() + '"'
+
+
+class FakeBot:
+
+    def send_message(self, chat_id, text):
+        pass
+
+
+def run(polls, change_every, homeworks, cache):
+    homework.use_response_cache(cache)
+    StubHandler.bytes_sent = 0
+    poller = tenants.TenantPoller(FakeBot(), start_timestamp=1_600_000_000)
+    subscription = tenants.Subscription('token', 1)
+    cpu = time.process_time()
+    for poll in range(polls):
+        set_version(poll // change_every, homeworks)
+        poller(subscription)
+    return StubHandler.bytes_sent, time.process_time() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--polls', type=int, default=300)
+    parser.add_argument('--change-every', type=int, default=20)
+    parser.add_argument('--homeworks', type=int, default=500)
+    parser.add_argument('--no-etag', action='store_true')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    StubHandler.use_etag = not args.no_etag
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    homework.ENDPOINT = f'http://127.0.0.1:{server.server_port}/'
+    homework.use_session(homework.create_session())
+
+    plain_bytes, plain_cpu = run(
+        args.polls, args.change_every, args.homeworks, None)
+    cache = response_cache.ResponseCache()
+    cached_bytes, cached_cpu = run(
+        args.polls, args.change_every, args.homeworks, cache)
+    server.shutdown()
+
+    print(f'polls: {args.polls}, body changes every {args.change_every}, '
+          f'ETag: {"off" if args.no_etag else "on"}')
+    print(f'bytes transferred:   {plain_bytes} -> {cached_bytes} '
+          f'({1 - cached_bytes / plain_bytes:.0%} saved)')
+    print(f'process CPU time:    {plain_cpu:.2f}s -> {cached_cpu:.2f}s '
+          f'({1 - cached_cpu / plain_cpu:.0%} saved)')
+    print(f'decodes skipped:     {cache.stats.decodes_skipped} '
+          f'(304: {cache.stats.not_modified}, '
+          f'hash hits: {cache.stats.hash_hits})')
+    print('note: the stub pins current_date, so from_date never moves; '
+          'against the real API\n      from_date changes every poll and '
+          'these savings do not apply')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Бенчмарк: проверка ответа с 10k работ.
+
+Сравнивает прежний путь (check_response и parse_status на каждую работу)
+с schema.validate_response и тем же текстом уведомления. Для каждого
+варианта берётся лучший из --repeat прогонов. Прежний путь смотрит лишь
+два ключа и не проверяет типы, поэтому он остаётся быстрее: разница —
+цена записей HomeworkRecord и проверки date_updated.
+
+Запуск: python benchmarks/bench_schema.py [--homeworks 10000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import schema  # noqa: E402
+
+
+def make_response(homeworks):
+    return {
+        'homeworks': [
+            {
+                'id': i,
+                'homework_name': f'student__project_{i}.zip',
+                'status': ('approved', 'reviewing', 'rejected')[i % 3],
+                'reviewer_comment': 'Всё отлично.',
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for i in range(homeworks)
+        ],
+        'current_date': 1_600_000_000,
+    }
+
+
+def current(response):
+    return [
+        homework.parse_status(item)
+        for item in homework.check_response(response)
+    ]
+
+
+def validated(response):
+    return [
+        homework.render_status(record.homework_name, record.status)
+        for record in schema.validate_response(response).homeworks
+    ]
+
+
+def best_of(func, response, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(response)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def retained(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--homeworks', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    response = make_response(args.homeworks)
+
+    print(f'homeworks: {args.homeworks}, best of {args.repeat}')
+    baseline = None
+    for name, func in (('check_response + parse_status', current),
+                       ('validate_response + render', validated),
+                       ('validate_response only', schema.validate_response)):
+        seconds = best_of(func, response, args.repeat)
+        baseline = baseline or seconds
+        print(f'{name:32} {seconds * 1000:8.2f} ms '
+              f'({baseline / seconds:.2f}x)')
+
+    dict_bytes = retained(lambda: make_response(args.homeworks)['homeworks'])
+    record_bytes = retained(lambda: schema.validate_response(
+        make_response(args.homeworks)).homeworks)
+    print(f'memory per homework: dict {dict_bytes / args.homeworks:.0f} B, '
+          f'record {record_bytes / args.homeworks:.0f} B '
+          '(record keeps the same field values)')
+
+    broken = make_response(args.homeworks)
+    for item in broken['homeworks'][::100]:
+        item['status'] = None
+    try:
+        schema.validate_response(broken)
+    except schema.exceptions.ResponseValidationError as error:
+        print(f'violations reported in one pass: {len(error.errors)}')
+
+
+if __name__ == '__main__':
+    main()
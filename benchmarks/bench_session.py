@@ -0,0 +1,99 @@
+"""Бенчмарк: экономия на TLS-рукопожатиях при пуле соединений.
+
+Поднимает локальную HTTPS-заглушку API с самоподписанным сертификатом и
+сравнивает requests.get (новое соединение на каждый опрос) с сессией из
+homework.create_session().
+
+Запуск: python benchmarks/bench_session.py [--polls 500]
+"""
+import argparse
+import json
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Отдаёт одну и ту же домашку, поддерживает keep-alive."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = json.dumps({
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 1,
+    }).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_certificate(directory):
+    """Генерирует самоподписанный сертификат для 127.0.0.1."""
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1',
+         '-keyout', key, '-out', cert],
+        check=True, capture_output=True)
+    return cert, key
+
+
+def measure(polls):
+    started = time.perf_counter()
+    for _ in range(polls):
+        homework.get_tenant_api_answer('token', 0)
+    return (time.perf_counter() - started) / polls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--polls', type=int, default=500)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        os.environ['REQUESTS_CA_BUNDLE'] = cert
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        homework.ENDPOINT = f'https://127.0.0.1:{server.server_port}/'
+
+        homework.use_session(None)
+        fresh = measure(args.polls)
+        session = homework.create_session()
+        homework.use_session(session)
+        pooled = measure(args.polls)
+        session.close()
+        server.shutdown()
+
+    print(f'polls:               {args.polls}')
+    print(f'requests.get:        {fresh * 1000:.2f} ms/poll')
+    print(f'pooled session:      {pooled * 1000:.2f} ms/poll')
+    print(f'saved per poll:      {(fresh - pooled) * 1000:.2f} ms '
+          f'({1 - pooled / fresh:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Бенчмарк: запись и загрузка состояния 100k подписчиков из SQLite.
+
+Запуск: python benchmarks/bench_state_store.py [--tenants 100000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_store  # noqa: E402
+import tenants  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=100_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'state.db')
+        store = state_store.SQLiteStateStore(path)
+        started = time.perf_counter()
+        for i in range(args.tenants):
+            store.put((f'token-{i}', i), 1_600_000_000 + i, 'approved')
+        store.close()
+        written = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store = state_store.SQLiteStateStore(path)
+        poller = tenants.TenantPoller(bot=None, store=store)
+        loaded = time.perf_counter() - started
+        store.close()
+
+    print(f'tenants:        {args.tenants}')
+    print(f'write (put):    {written:.2f}s '
+          f'({args.tenants / written:.0f} puts/s)')
+    print(f'startup load:   {loaded * 1000:.0f} ms '
+          f'({len(poller.states)} states)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Бенчмарк: пиковая память опроса при буферизованном и потоковом разборе.
+
+Локальная заглушка API отдаёт ответ с --sizes работ. Первый опрос
+заполняет отпечатки, второй (ничего не изменилось) замеряется через
+tracemalloc — считается только то, что выделено во время опроса.
+В потоковом режиме пик растёт лишь из-за сериализации отпечатков для
+хранилища состояния: она пропорциональна числу работ подписчика, а не
+размеру ответа.
+
+Запуск: python benchmarks/bench_stream.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import tenants  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = b''
+
+    def do_GET(self):
+        body = type(self).body
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_body(homeworks):
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': i,
+                'homework_name': f'student__project_{i}.zip',
+                'status': 'approved',
+                'reviewer_comment': 'Всё отлично. ' * 10,
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for i in range(homeworks)
+        ],
+        'current_date': 1_600_000_000,
+    }, ensure_ascii=False).encode()
+
+
+class FakeBot:
+
+    def send_message(self, chat_id, text):
+        pass
+
+
+def measure(stream):
+    poller = tenants.TenantPoller(
+        FakeBot(), start_timestamp=1_600_000_000, stream=stream)
+    subscription = tenants.Subscription('token', 1)
+    poller(subscription)
+    tracemalloc.start()
+    started = time.perf_counter()
+    poller(subscription)
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    homework.ENDPOINT = f'http://127.0.0.1:{server.server_port}/'
+    homework.use_session(homework.create_session())
+
+    print(f'{"homeworks":>10} {"body":>9} {"buffered peak":>14} '
+          f'{"streamed peak":>14} {"buffered":>9} {"streamed":>9}')
+    for size in args.sizes:
+        StubHandler.body = make_body(size)
+        buffered_peak, buffered_time = measure(stream=False)
+        streamed_peak, streamed_time = measure(stream=True)
+        print(f'{size:>10} {len(StubHandler.body) / 2**20:>7.1f}MB '
+              f'{buffered_peak / 2**20:>12.1f}MB '
+              f'{streamed_peak / 2**20:>12.2f}MB '
+              f'{buffered_time:>8.2f}s {streamed_time:>8.2f}s')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Бенчмарк: тексты уведомлений для 10k работ.
+
+Сравнивает прежний render_status (f-строка и поиск в HOMEWORK_STATUSES на
+каждую работу), templates.Catalog.render с выбором языка на каждую
+работу и Catalog.renderer, выбранный один раз на пачку, как при опросе. Для
+каждого варианта берётся лучший из --repeat прогонов.
+
+Запуск: python benchmarks/bench_templates.py [--homeworks 10000]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import schema  # noqa: E402
+import templates  # noqa: E402
+
+
+def make_records(count):
+    return [
+        schema.HomeworkRecord(
+            i, f'student__project_{i}.zip',
+            ('approved', 'reviewing', 'rejected')[i % 3],
+            '2022-02-13T14:40:57Z', 'Всё отлично.', 'Итоговый проект')
+        for i in range(count)
+    ]
+
+
+def f_string(records):
+    return [
+        homework.render_status(record.homework_name, record.status)
+        for record in records
+    ]
+
+
+def per_record(records):
+    catalog = templates.catalog
+    return [catalog.render(record) for record in records]
+
+
+def renderer(records):
+    return list(map(templates.catalog.renderer(), records))
+
+
+def best_of(func, records, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(records)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--homeworks', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    records = make_records(args.homeworks)
+    assert f_string(records) == renderer(records)
+
+    print(f'homeworks: {args.homeworks}, best of {args.repeat}')
+    baseline = None
+    for name, func in (('render_status', f_string),
+                       ('Catalog.render per record', per_record),
+                       ('Catalog.renderer per batch', renderer)):
+        seconds = best_of(func, records, args.repeat)
+        baseline = baseline or seconds
+        print(f'{name:28} {seconds * 1000:8.2f} ms '
+              f'({baseline / seconds:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Бенчмарк: один процесс опрашивает 10k подписчиков через заглушку API.
+
+Запуск: python benchmarks/bench_tenants.py [--tenants 10000]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import homework  # noqa: E402
+import tenants  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Отдаёт одну и ту же домашку на любой запрос."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = json.dumps({
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 1,
+    }).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeBot:
+    """Бот, который только считает сообщения."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send_message(self, chat_id, text):
+        self.sent += 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=10_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    homework.ENDPOINT = f'http://127.0.0.1:{server.server_port}/'
+
+    registry = tenants.SubscriptionRegistry(
+        (f'token-{i}', i) for i in range(args.tenants))
+    bot = FakeBot()
+    scheduler = tenants.PollScheduler(
+        registry, tenants.TenantPoller(bot, start_timestamp=0))
+    scheduler.sync(now=0)
+
+    buckets = Counter(
+        int(scheduler.offset(subscription) // 60) for subscription in registry)
+    started = time.perf_counter()
+    polled = scheduler.run_pending(now=scheduler.period)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    print(f'tenants:            {args.tenants}')
+    print(f'polled:             {polled}')
+    print(f'messages sent:      {bot.sent}')
+    print(f'elapsed:            {elapsed:.2f}s '
+          f'({polled / elapsed:.0f} polls/s)')
+    print(f'window usage:       {elapsed / scheduler.period:.1%} '
+          f'of {scheduler.period}s')
+    print(f'polls per minute:   min {min(buckets.values())}, '
+          f'max {max(buckets.values())}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Нагрузочный тест приёма вебхуков: 1k событий в секунду.
+
+Движок с вебхуком работает в отдельном потоке со своим циклом событий,
+клиент aiohttp в основном потоке шлёт события с заданной частотой.
+Каждое событие меняет статус работы, поэтому порождает уведомление.
+
+Запуск: python benchmarks/load_webhook.py [--rate 1000 --seconds 10]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_engine  # noqa: E402
+import tenants  # noqa: E402
+import webhook  # noqa: E402
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+class FakeBot:
+
+    def __init__(self):
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text):
+        with self.lock:
+            self.sent += 1
+
+
+def serve(engine, ready, holder):
+    async def main():
+        runner = await webhook.start(engine, 0, '127.0.0.1', secret=None)
+        holder['port'] = runner.addresses[0][1]
+        holder['loop'] = asyncio.get_running_loop()
+        holder['stop'] = asyncio.Event()
+        ready.set()
+        await holder['stop'].wait()
+        await engine.drain()
+        await runner.cleanup()
+
+    asyncio.run(main())
+
+
+async def load(port, tokens, rate, seconds):
+    url = f'http://127.0.0.1:{port}{webhook.WEBHOOK_PATH}'
+    latencies = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=200)
+    async with aiohttp.ClientSession(connector=connector) as session:
+
+        async def post(number):
+            nonlocal errors
+            token = tokens[number % len(tokens)]
+            payload = {
+                'homeworks': [{
+                    'id': 1,
+                    'homework_name': 'hw',
+                    'status': STATUSES[number // len(tokens) % 3],
+                }],
+                'current_date': number + 1,
+            }
+            started = time.perf_counter()
+            async with session.post(
+                url, json=payload, headers={'Authorization': f'OAuth {token}'}
+            ) as response:
+                await response.read()
+                if response.status != 202:
+                    errors += 1
+            latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        started = time.perf_counter()
+        total = int(rate * seconds)
+        for number in range(total):
+            delay = started + number / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(post(number)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return total, elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--tenants', type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    tokens = [f'token-{i}' for i in range(args.tenants)]
+    registry = tenants.SubscriptionRegistry(
+        (token, i) for i, token in enumerate(tokens))
+    bot = FakeBot()
+    engine = async_engine.AsyncEngine(registry, bot, start_timestamp=0)
+    ready = threading.Event()
+    holder = {}
+    server = threading.Thread(target=serve, args=(engine, ready, holder))
+    server.start()
+    ready.wait()
+
+    total, elapsed, latencies, errors = asyncio.run(
+        load(holder['port'], tokens, args.rate, args.seconds))
+    holder['loop'].call_soon_threadsafe(holder['stop'].set)
+    server.join()
+    latencies.sort()
+
+    print(f'events sent:        {total} in {elapsed:.1f}s '
+          f'({total / elapsed:.0f}/s, target {args.rate}/s)')
+    print(f'non-202 responses:  {errors}')
+    print(f'accept latency:     p50 {statistics.median(latencies) * 1000:.1f}'
+          f' ms, p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms')
+    print(f'notifications:      {bot.sent}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Симуляция: задержка уведомлений и число запросов к API при
+постоянном RETRY_TIME и при адаптивном интервале (adaptive.py).
+
+Для каждого подписчика генерируется история: работа сдаётся, через
+случайное время берётся на ревью, затем получает вердикт. Опрос видит
+изменение, случившееся с прошлого опроса; задержка — время от события до
+опроса, который его обнаружил. Сети нет, время виртуальное.
+
+Запуск: python benchmarks/simulate_polling.py [--tenants 1000 --days 7]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adaptive  # noqa: E402
+
+DAY = 24 * 3600
+
+
+def make_history(rng, horizon):
+    """Список (время, статус) для одного подписчика."""
+    events = []
+    now = rng.uniform(0, DAY)
+    while now < horizon:
+        now += rng.uniform(1, 24) * 3600
+        events.append((now, 'reviewing'))
+        now += rng.uniform(10 * 60, 3 * 3600)
+        events.append((now, rng.choice(('approved', 'rejected'))))
+        now += rng.expovariate(1 / (2 * DAY))
+    return [event for event in events if event[0] < horizon]
+
+
+def simulate(histories, horizon, next_delay, error_rate, rng):
+    polls = 0
+    latencies = []
+    verdict_latencies = []
+    for history in histories:
+        now = rng.uniform(0, 600)
+        seen = 0
+        interval = None
+        status = None
+        while now < horizon:
+            polls += 1
+            if rng.random() < error_rate:
+                outcome = adaptive.ERROR
+            else:
+                fresh = 0
+                while seen + fresh < len(history) and (
+                    history[seen + fresh][0] <= now
+                ):
+                    event_time, status = history[seen + fresh]
+                    latencies.append(now - event_time)
+                    if status != 'reviewing':
+                        verdict_latencies.append(now - event_time)
+                    fresh += 1
+                seen += fresh
+                outcome = adaptive.CHANGED if fresh else adaptive.UNCHANGED
+            interval = next_delay(interval, outcome, status == 'reviewing')
+            now += interval
+    return polls, latencies, verdict_latencies
+
+
+def report(name, polls, latencies, verdicts, tenants, days):
+    def p95(values):
+        return statistics.quantiles(values, n=20)[-1] if values else 0
+
+    print(f'{name}:')
+    print(f'  API calls:              {polls} '
+          f'({polls / tenants / days:.0f} per tenant per day)')
+    for label, values in (('mean latency:', latencies),
+                          ('verdict mean latency:', verdicts)):
+        print(f'  {label:23} {statistics.mean(values) / 60:.1f} min, '
+              f'p95 {p95(values) / 60:.1f} min')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tenants', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    horizon = args.days * DAY
+    histories = [make_history(rng, horizon) for _ in range(args.tenants)]
+    policy = adaptive.DEFAULT_POLICY
+
+    fixed = simulate(
+        histories, horizon,
+        lambda previous, outcome, reviewing: policy.base_interval,
+        args.error_rate, random.Random(args.seed))
+    report('fixed RETRY_TIME', *fixed, args.tenants, args.days)
+    for name, variant in (
+            ('adaptive', policy),
+            ('adaptive, max_interval = 2 * RETRY_TIME',
+             policy._replace(max_interval=2 * policy.base_interval))):
+        result = simulate(
+            histories, horizon,
+            lambda previous, outcome, reviewing: adaptive.next_interval(
+                variant, previous, outcome, reviewing, rng.random),
+            args.error_rate, random.Random(args.seed))
+        report(name, *result, args.tenants, args.days)
+        print(f'  API calls vs fixed:     {result[0] / fixed[0] - 1:+.0%}')
+
+
+if __name__ == '__main__':
+    main()
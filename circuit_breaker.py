@@ -0,0 +1,120 @@
+"""Предохранитель для внешних сервисов: API Практикума и Telegram.
+
+closed — запросы идут как обычно; после failure_threshold ошибок подряд
+предохранитель размыкается (open) и reset_timeout секунд не пропускает
+запросы. Затем переходит в half-open и пропускает один пробный запрос:
+успех замыкает цепь, ошибка снова размыкает её.
+"""
+import logging
+import threading
+import time
+
+import exceptions
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 60
+
+
+class CircuitBreaker:
+    """Предохранитель одного внешнего сервиса."""
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT, clock=time.monotonic,
+                 ignore=()):
+        self.name = name
+        # Исключения, после которых сервис считается исправным: он ответил,
+        # но отказал по причине на нашей стороне (например, токен).
+        self.ignore = tuple(ignore)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние: closed, open или half-open."""
+        with self._lock:
+            return self._state(self.clock())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return CLOSED
+        if now - self.opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def retry_in(self) -> float:
+        """Сколько секунд предохранитель ещё будет разомкнут."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+    def allow(self) -> bool:
+        """Можно ли сейчас обращаться к сервису."""
+        with self._lock:
+            state = self._state(self.clock())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def check(self):
+        """Бросает CircuitOpen, если обращаться к сервису нельзя."""
+        if not self.allow():
+            raise exceptions.CircuitOpen(
+                f'{self.name} недоступен, повтор через '
+                f'{self.retry_in():.0f} с')
+
+    def record_success(self):
+        """Отмечает успешный запрос."""
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f'{self.name}: связь восстановлена')
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> bool:
+        """Отмечает ошибку.
+
+        True, если после неё предохранитель только что разомкнулся.
+        """
+        with self._lock:
+            now = self.clock()
+            self.failures += 1
+            was_open = self.opened_at is not None
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = now
+            self._trial = False
+            opened = self.opened_at is not None and not was_open
+        if opened:
+            logger.error(
+                f'{self.name}: {self.failures} ошибок подряд, запросы '
+                f'приостановлены на {self.reset_timeout} с')
+        return opened
+
+    def call(self, func, *args, **kwargs):
+        """Вызывает func через предохранитель."""
+        self.check()
+        try:
+            result = func(*args, **kwargs)
+        except self.ignore:
+            self.record_success()
+            raise
+        except BaseException:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
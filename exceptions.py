@@ -18,3 +18,19 @@ class NoTelegramError(BaseException):
     
 class CriticalError(NoTelegramError):
     """Критическая ошибка в работе Бота."""
+
+
+class CircuitOpen(NoTelegramError):
+    """Сервис временно отключён предохранителем."""
+
+
+class ResponseValidationError(IncorrectFormatResponse):
+    """Ответ API не прошёл проверку схемы; errors — все нарушения."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+class InvalidToken(Exception):
+    """Сервис отклонил токен (401 или 403): повтор не поможет."""
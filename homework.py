@@ -1,32 +1,93 @@
+"""Бот, присылающий в Telegram изменения статусов домашних работ.
+
+Импорт модуля лишь читает настройки из окружения: .env, логирование и
+тяжёлые клиенты (telegram, requests) подключает create_app() и первый
+запрос, поэтому воркеры и короткие команды стартуют быстро.
+"""
 import logging
 import os
 import sys
-import time
 from http import HTTPStatus
 
-import requests
-import telegram
-from dotenv import load_dotenv
-
 import exceptions
-
-load_dotenv()
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s, %(name)s,%(levelname)s, %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout),
-              logging.FileHandler('file.log')])
+import metrics
+from message_queue import MessageQueue
 
 logger = logging.getLogger(__name__)
 
-PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
-TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
-TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+REQUEST_TIMEOUT = 10
+UNAUTHORIZED = (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+# Модули, читающие свои настройки из homework.config функцией configure().
+CONFIGURED_MODULES = (
+    'lifecycle', 'notifiers', 'profiling', 'templates', 'webhook')
+
+
+def configure(environ=os.environ):
+    """Читает настройки модуля из environ (словаря переменных окружения).
+
+    environ запоминается в config: из него берут настройки остальные
+    модули и воркеры.
+    """
+    global config, PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    global SUBSCRIPTIONS_FILE, STATE_DB, OUTBOX_FILE, METRICS_PORT
+    global WEBHOOK_PORT, HOMEWORK_STATUSES_FILE, TELEGRAM_API_URL
+    global RETRY_TIME, POLL_CONCURRENCY, WORKER_COUNT, HTTP_POOL_SIZE
+    global HTTP_RETRIES, TOKEN_CHECK_TTL, STREAM_RESPONSES, RESPONSE_CACHE
+    global ENDPOINT, HEADERS
+    config = environ
+    PRACTICUM_TOKEN = environ.get('PRACTICUM_TOKEN')
+    TELEGRAM_TOKEN = environ.get('TELEGRAM_TOKEN')
+    TELEGRAM_CHAT_ID = environ.get('TELEGRAM_CHAT_ID')
+    SUBSCRIPTIONS_FILE = environ.get('SUBSCRIPTIONS_FILE')
+    STATE_DB = environ.get('STATE_DB', 'state.db')
+    # Журнал исходящих уведомлений, см. outbox.py; пустое значение
+    # выключает.
+    OUTBOX_FILE = environ.get('OUTBOX_FILE', 'outbox.jsonl')
+    METRICS_PORT = environ.get('METRICS_PORT')
+    WEBHOOK_PORT = environ.get('WEBHOOK_PORT')
+    # JSON-файл шаблонов сообщений (templates.py), перечитывается по
+    # SIGHUP.
+    HOMEWORK_STATUSES_FILE = environ.get('HOMEWORK_STATUSES_FILE')
+    # Адрес Bot API, например локальной заглушки из simulator.py.
+    TELEGRAM_API_URL = environ.get('TELEGRAM_API_URL')
+    RETRY_TIME = int(environ.get('RETRY_TIME', 600))
+    POLL_CONCURRENCY = int(environ.get('POLL_CONCURRENCY', 100))
+    # Число процессов-воркеров, делящих подписки, см. sharding.py.
+    WORKER_COUNT = int(environ.get('WORKER_COUNT', 1))
+    HTTP_POOL_SIZE = int(environ.get('HTTP_POOL_SIZE', 10))
+    HTTP_RETRIES = int(environ.get('HTTP_RETRIES', 3))
+    # Сколько секунд помнить результат проверки токена, см. preflight.py.
+    TOKEN_CHECK_TTL = int(environ.get('TOKEN_CHECK_TTL', 3600))
+    # Разбирать ответы API потоком, не загружая тело целиком.
+    STREAM_RESPONSES = bool(environ.get('STREAM_RESPONSES'))
+    # Условные запросы и кеш ответов (response_cache.py); при обычном
+    # опросе from_date меняется каждый раз, поэтому по умолчанию выключен.
+    RESPONSE_CACHE = bool(environ.get('RESPONSE_CACHE'))
+    ENDPOINT = environ.get(
+        'PRACTICUM_ENDPOINT',
+        'https://practicum.yandex.ru/api/user_api/homework_statuses/')
+    HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-RETRY_TIME = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
+configure()
+
+# Клиент запросов к API: сессия из create_session() или None — модуль
+# requests, импортируемый при первом запросе, см. api_client().
+http_client = None
+# Кеш ответов для условных запросов, см. use_response_cache().
+response_cache = None
+# Предохранители API Практикума и Telegram, см. use_breakers().
+api_breaker = None
+telegram_breaker = None
+# Результаты проверки токенов Практикума, см. use_token_checks().
+token_checks = None
+# Рассылка по каналам уведомлений (notifiers.FanOut), см. use_notifier().
+notifier = None
+# Журнал исходящих уведомлений (outbox.Outbox), см. use_outbox().
+outbox = None
 
 HOMEWORK_STATUSES = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -35,43 +96,254 @@ HOMEWORK_STATUSES = {
 }
 
 
+def load_config():
+    """Настройки из .env и окружения.
+
+    Переменные из .env попадают и в os.environ: их при импорте читают
+    остальные модули (notifiers, lifecycle и другие).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    return dict(os.environ)
+
+
+class App:
+    """Бот, настроенный create_app()."""
+
+    def __init__(self, config):
+        """Бот с настройками config (словарём переменных окружения)."""
+        self.config = config
+
+    def run(self, argv=()):
+        """Запускает команду из argv: backfill, workers или сам бот."""
+        argv = list(argv)
+        if argv[:1] == ['backfill']:
+            import backfill
+            backfill.main(argv[1:])
+        elif argv[:1] == ['workers']:
+            import sharding
+            sharding.spawn_workers(int(argv[1]), environ=self.config)
+        else:
+            main()
+
+
+def create_app(config=None):
+    """Настраивает модуль и логирование по config и возвращает App.
+
+    Без config читаются .env и окружение (load_config()).
+    """
+    import log_config
+    if config is None:
+        config = load_config()
+    configure(config)
+    # Уже импортированные модули перечитывают настройки, остальные
+    # прочтут homework.config при импорте.
+    for name in CONFIGURED_MODULES:
+        module = sys.modules.get(name)
+        if module is not None:
+            module.configure(config)
+    log_config.setup_logging(config)
+    return App(config)
+
+
+def create_session(pool_size: int = None, retries: int = None):
+    """Создаёт сессию с пулом keep-alive соединений и повторами.
+
+    По умолчанию — HTTP_POOL_SIZE соединений и HTTP_RETRIES повторов.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=HTTP_POOL_SIZE if pool_size is None else pool_size,
+        max_retries=Retry(
+            total=HTTP_RETRIES if retries is None else retries,
+            backoff_factor=0.5,
+            status_forcelist=(
+                HTTPStatus.BAD_GATEWAY,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                HTTPStatus.GATEWAY_TIMEOUT,
+            ),
+            allowed_methods=('GET',),
+            raise_on_status=False,
+        ),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def use_session(session):
+    """Переключает запросы к API на переданную сессию."""
+    global http_client
+    http_client = session
+
+
+def api_client():
+    """Клиент запросов к API: http_client или модуль requests."""
+    if http_client is not None:
+        return http_client
+    import requests
+    return requests
+
+
+def use_response_cache(cache):
+    """Включает условные запросы и кеш ответов API (None — выключает)."""
+    global response_cache
+    response_cache = cache
+
+
+def use_breakers(api=None, telegram_=None):
+    """Ставит предохранители перед API Практикума и отправкой в Telegram."""
+    global api_breaker, telegram_breaker
+    api_breaker = api
+    telegram_breaker = telegram_
+
+
+def use_token_checks(checks):
+    """Запоминает отказы API по токенам в checks (preflight.TokenChecks)."""
+    global token_checks
+    token_checks = checks
+
+
+def use_notifier(fanout):
+    """Включает рассылку по каналам, заданным у подписок."""
+    global notifier
+    notifier = fanout
+
+
+def use_outbox(journal):
+    """Отправляет уведомления о статусах через журнал (None — напрямую)."""
+    global outbox
+    outbox = journal
+
+
+def reject_token(token: str):
+    """API отклонил токен: отмечает это и выбрасывает InvalidToken."""
+    if token_checks is not None:
+        token_checks.record(token, False)
+    raise exceptions.InvalidToken('API Практикума отклонил токен')
+
+
 def send_message(bot, message: str):
     """Отправляем сообщение в телеграм."""
+    send_tenant_message(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_tenant_message(bot, chat_id, message: str):
+    """Отправляем сообщение в указанный чат телеграма."""
+    if isinstance(bot, MessageQueue):
+        bot.send_message(chat_id, text=message)
+        metrics.TELEGRAM_SENDS.labels('queued').inc()
+        return
+    import telegram
+    breaker = telegram_breaker
+    if breaker is not None:
+        breaker.check()
     try:
         logger.info('Начали отправку сообщения')
-        bot.send_message(TELEGRAM_CHAT_ID, text=message)
+        with metrics.SEND_LATENCY.time():
+            bot.send_message(chat_id, text=message)
     except telegram.error.TelegramError:
+        metrics.TELEGRAM_SENDS.labels('failed').inc()
+        if breaker is not None:
+            breaker.record_failure()
         raise exceptions.CriticalError('Сообщения не отправлены')
     else:
-        logger.info(f'Сообщение успешно отправилось в чат {TELEGRAM_CHAT_ID}')
+        metrics.TELEGRAM_SENDS.labels('sent').inc()
+        if breaker is not None:
+            breaker.record_success()
+        logger.info(f'Сообщение успешно отправилось в чат {chat_id}')
 
 
 def get_api_answer(current_timestamp: int):
     """Делает зпрос к API."""
+    return get_tenant_api_answer(PRACTICUM_TOKEN, current_timestamp)
+
+
+def get_tenant_api_answer(token: str, current_timestamp: int):
+    """Делает зпрос к API с токеном конкретного подписчика."""
+    with metrics.API_LATENCY.time():
+        if api_breaker is None:
+            return _request_api(token, current_timestamp)
+        return api_breaker.call(_request_api, token, current_timestamp)
+
+
+def _request_api(token: str, current_timestamp: int):
+    import requests
     timestamp = current_timestamp
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    if response_cache is not None:
+        headers.update(response_cache.request_headers(token, params))
     try:
-        response = requests.get(
-            ENDPOINT, headers=HEADERS, params=params)
-        if response.status_code != HTTPStatus.OK:
-            raise ConnectionError(
-                'Возникла ошибка соединения!'
-                'Проверьте Ваше подключение к интернету.'
-                f'{response.status_code}, {response.reason},'
-                f'{response.text},{ENDPOINT},{HEADERS},'
-                f'{params}'
-            )
-    except exceptions.InvalidToken:
-        raise ValueError('Неправильный токен используется')
-    except Exception:
+        response = api_client().get(
+            ENDPOINT, headers=headers, params=params,
+            timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as error:
         raise ConnectionError(
-            f'Не удалось подключиться к API{response.status_code} '
-            f'{response.reason}, {response.text}, '
-            f'{ENDPOINT},{HEADERS},{params}')
-
+            f'Не удалось подключиться к API {error}, {ENDPOINT},{params}')
+    if (response_cache is not None
+            and response.status_code == HTTPStatus.NOT_MODIFIED):
+        return response_cache.not_modified(token)
+    if response.status_code in UNAUTHORIZED:
+        reject_token(token)
+    if response.status_code != HTTPStatus.OK:
+        # Заголовки в текст ошибки не попадают: в них токен подписчика.
+        raise ConnectionError(
+            'Возникла ошибка соединения!'
+            'Проверьте Ваше подключение к интернету.'
+            f'{response.status_code}, {response.reason},'
+            f'{response.text},{ENDPOINT},{params}'
+        )
+    if response_cache is not None:
+        return response_cache.decode(
+            token, params, response.content, response.headers)
     return response.json()
 
 
+def get_tenant_api_stream(token: str, current_timestamp: int):
+    """Запрос к API с потоковым разбором тела.
+
+    Возвращает schema.ValidatedStream: работы читаются из сети по мере
+    итерации, соединение закрывается после неё. Кеш ответов не
+    используется — тело не хранится целиком.
+    """
+    with metrics.API_LATENCY.time():
+        if api_breaker is None:
+            return _open_stream(token, current_timestamp)
+        return api_breaker.call(_open_stream, token, current_timestamp)
+
+
+def _open_stream(token: str, current_timestamp: int):
+    import requests
+
+    import json_stream
+    import schema
+    params = {'from_date': current_timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    try:
+        response = api_client().get(
+            ENDPOINT, headers=headers, params=params,
+            timeout=REQUEST_TIMEOUT, stream=True)
+    except requests.RequestException as error:
+        raise ConnectionError(
+            f'Не удалось подключиться к API {error}, {ENDPOINT},{params}')
+    if response.status_code in UNAUTHORIZED:
+        response.close()
+        reject_token(token)
+    if response.status_code != HTTPStatus.OK:
+        response.close()
+        raise ConnectionError(
+            'Возникла ошибка соединения!'
+            f'{response.status_code}, {response.reason},'
+            f'{ENDPOINT},{params}')
+    return schema.ValidatedStream(json_stream.HomeworkStream(
+        response.iter_content(STREAM_CHUNK_SIZE), close=response.close))
+
+
 def check_response(response: dict):
     """Проверяем API на корректность."""
     logging.info('Проверяем ответ сервера')
@@ -79,7 +351,7 @@ def check_response(response: dict):
         raise TypeError('Ответ API отличен от словаря')
     homework_list = response.get('homeworks')
     current_date = response.get('current_date')
-    if not homework_list or not current_date:
+    if homework_list is None or not current_date:
         raise exceptions.CriticalError('Отсутсвие ожидаемых ключей')
     if not isinstance(homework_list, list):
         raise exceptions.IncorrectFormatResponse('Данные не читаемы')
@@ -92,6 +364,11 @@ def parse_status(homework: dict):
     homework_status = homework.get('status')
     if not homework_name:
         raise KeyError(f'Ошибка доступа по ключу {homework_name}')
+    return render_status(homework_name, homework_status)
+
+
+def render_status(homework_name: str, homework_status: str):
+    """Текст уведомления для уже проверенных имени и статуса работы."""
     verdict = HOMEWORK_STATUSES.get(homework_status)
     if not verdict:
         raise KeyError('Нет статуса домашней работы')
@@ -105,37 +382,126 @@ def check_tokens():
 
 def main():
     """Основная логика работы бота."""
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    current_status = None
+    import telegram
+
+    import state_store
+    from circuit_breaker import CircuitBreaker
+    bot = telegram.Bot(token=TELEGRAM_TOKEN, base_url=TELEGRAM_API_URL)
+    import lifecycle
+    # Сигналы ловятся с самого начала: проверка токенов и загрузка
+    # подписок могут занять время.
+    process = lifecycle.Lifecycle().install()
+    import templates
+    templates.load(HOMEWORK_STATUSES_FILE)
+    process.on_reload(lambda: templates.load(HOMEWORK_STATUSES_FILE))
+    if METRICS_PORT:
+        metrics.start_http_server(int(METRICS_PORT))
+    use_session(create_session())
+    if RESPONSE_CACHE:
+        from response_cache import ResponseCache
+        use_response_cache(ResponseCache())
+    store = state_store.open_store(STATE_DB)
+    api = CircuitBreaker(
+        'API Практикума', ignore=(exceptions.InvalidToken,))
+    import preflight
+    preflight.check_bot(bot)
+    checks = preflight.TokenChecks()
+    use_token_checks(checks)
+    if SUBSCRIPTIONS_FILE:
+        _run_subscriptions(bot, process, store, api, checks)
+    else:
+        _run_single(bot, process, store, api, checks)
+    logger.info('Бот остановлен')
+
+
+def _run_subscriptions(bot, process, store, api, checks):
+    """Опрос подписчиков из SUBSCRIPTIONS_FILE асинхронным движком."""
+    import async_engine
+    import message_queue
+    import notifiers
+    import outbox as outboxes
+    import sharding
+    from circuit_breaker import CircuitBreaker
+    error = sharding.single_host_error(config, WORKER_COUNT)
+    if error:
+        sys.exit(error)
+    use_breakers(api)
+    # Лимит Telegram общий на бота, поэтому делится между воркерами.
+    queue = message_queue.MessageQueue(
+        bot, global_rate=message_queue.GLOBAL_RATE / WORKER_COUNT,
+        breaker=CircuitBreaker('Telegram')).start()
+    fanout = notifiers.create_fanout(queue)
+    use_notifier(fanout)
+    worker_id = sharding.worker_id_from_env(config)
+    # Журнал у каждого воркера свой: файл дописывает один процесс.
+    journal = outboxes.open_outbox(
+        f'{OUTBOX_FILE}.{worker_id}' if OUTBOX_FILE and WORKER_COUNT > 1
+        else OUTBOX_FILE)
+    use_outbox(journal)
+    if journal is not None:
+        journal.replay(queue)
+    try:
+        async_engine.run(
+            queue, SUBSCRIPTIONS_FILE, store,
+            int(WEBHOOK_PORT) if WEBHOOK_PORT else None,
+            worker_id, WORKER_COUNT, process, checks)
+    finally:
+        # Каналы досылаются первыми: канал telegram пишет в очередь.
+        if not fanout.stop(process.remaining()):
+            logger.error('Не успели разослать уведомления по каналам')
+        if not queue.stop(process.remaining()):
+            logger.error(
+                f'Не успели отправить сообщений: {len(queue)}')
+        if journal is not None:
+            journal.close()
+        store.close()
+
+
+def _run_single(bot, process, store, api, checks):
+    """Опрос одного подписчика из PRACTICUM_TOKEN и TELEGRAM_CHAT_ID."""
+    import notifiers
+    import outbox as outboxes
+    import preflight
+    import profiling
+    import tenants
+    from circuit_breaker import CircuitBreaker
+    use_breakers(api, CircuitBreaker('Telegram'))
     if not check_tokens():
         msg = 'отсутствие обязательных переменных окружения во время '
         logger.critical(msg)
         sys.exit(msg)
+    subscriptions = tenants.SubscriptionRegistry()
+    subscription = subscriptions.add(
+        PRACTICUM_TOKEN, TELEGRAM_CHAT_ID,
+        channels=notifiers.channels_from_env(TELEGRAM_CHAT_ID))
+    registry = preflight.QuarantinedRegistry(subscriptions, checks)
+    preflight.check_tokens(subscriptions, checks)
+    fanout = None
+    if subscriptions.channels(subscription):
+        fanout = notifiers.create_fanout(bot)
+        use_notifier(fanout)
+    poller = tenants.TenantPoller(bot, store=store, registry=subscriptions)
+    journal = outboxes.open_outbox(OUTBOX_FILE)
+    use_outbox(journal)
+    profiling.start()
 
-    while True:
-        try:
+    while not process.stopping.is_set():
+        process.reload_if_requested()
+        if journal is not None:
+            journal.replay(bot)
+        if subscription in registry:
             logger.info('Начали запрос к API')
-            response = get_api_answer(current_timestamp)
-            homework = check_response(response)
-            current_timestamp = response.get('current_date', current_timestamp)
-            if homework:
-                new_status = parse_status(homework[0])
-            else:
-                logger.info('Домашних работ нет')
-            if new_status != current_status:
-                send_message(bot, new_status)
-            else:
-                logger.debug(f'Статус {homework} не изменился')
-        except exceptions.NoTelegramError as error:
-            logger.error(error)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            send_message(bot, message)
-            logger.error(message)
-        finally:
-            time.sleep(RETRY_TIME)
+            poller(subscription)
+        process.wait(poller.interval(subscription) or RETRY_TIME)
+    profiling.stop()
+    if fanout is not None:
+        fanout.stop(process.remaining())
+    if journal is not None:
+        journal.close()
+    store.close()
 
 
 if __name__ == '__main__':
-    main()
+    # Запуск python homework.py передаётся модулю homework, см. launcher.py.
+    import launcher
+    launcher.main()
@@ -0,0 +1,126 @@
+"""Поштучное сравнение домашних работ с прошлым опросом.
+
+Для каждой работы в памяти хранится только 64-битный отпечаток кортежа
+(homework_name, status, date_updated), ключом служит id работы. Работы
+приходят записями schema.HomeworkRecord.
+"""
+import hashlib
+import json
+
+
+def homework_key(homework) -> str:
+    """Ключ работы: id, а если его нет — название."""
+    key = homework.id
+    if key is None:
+        key = homework.homework_name
+    return str(key)
+
+
+def fingerprint(homework) -> int:
+    """Стабильный между перезапусками отпечаток состояния работы."""
+    data = '\0'.join((
+        str(homework.homework_name),
+        str(homework.status),
+        str(homework.date_updated),
+    )).encode()
+    return int.from_bytes(
+        hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def changes(fingerprints: dict, homeworks):
+    """Один проход по ответу API: отдаёт (ключ, отпечаток, работа)
+    для каждой изменившейся работы.
+
+    Словарь fingerprints не меняется — новый отпечаток записывают после
+    успешной отправки уведомления, чтобы неотправленное повторилось.
+    """
+    for homework in homeworks:
+        key = homework_key(homework)
+        new = fingerprint(homework)
+        if fingerprints.get(key) != new:
+            yield key, new, homework
+
+
+class History:
+    """Отбор ещё не отправленных статусов из истории работ (догрузка).
+
+    В истории у работы бывает несколько записей (reviewing, затем
+    approved), а в fingerprints — отпечаток только последнего
+    отправленного состояния. Отправляются записи новее его по
+    date_updated. Пока запись с этим отпечатком не встретилась, записи
+    работы откладываются; если её в истории нет, состояние старше истории
+    и отправляется всё. Порядок записей не важен.
+    """
+
+    def __init__(self, fingerprints: dict):
+        self.fingerprints = fingerprints
+        # Ключ -> date_updated, после которой записи новые (None — все).
+        self._after = {}
+        self._pending = {}
+        # Ключ -> date_updated состояния, чей отпечаток в fingerprints.
+        self._latest = {}
+
+    def changes(self, homeworks):
+        """Отдаёт (ключ, отпечаток, работа) для неотправленных записей."""
+        for homework in homeworks:
+            yield from self.feed(homework)
+        yield from self.finish()
+
+    def feed(self, homework):
+        """[(ключ, отпечаток, работа)], которые можно отправить сейчас."""
+        key = homework_key(homework)
+        new = fingerprint(homework)
+        if key not in self._after:
+            stored = self.fingerprints.get(key)
+            if stored is None:
+                self._after[key] = None
+            elif stored == new:
+                self._after[key] = self._latest[key] = _date(homework)
+                return self._newer(key, self._pending.pop(key, ()))
+            else:
+                self._pending.setdefault(key, []).append((new, homework))
+                return []
+        return self._newer(key, [(new, homework)])
+
+    def finish(self):
+        """Отложенные записи работ, чьё состояние старше истории."""
+        pending, self._pending = self._pending, {}
+        changed = []
+        for key, items in pending.items():
+            self._after[key] = None
+            changed.extend(self._newer(key, items))
+        return changed
+
+    def delivered(self, key: str, new: int, homework):
+        """Запоминает отправленный статус, если он новее сохранённого."""
+        date = _date(homework)
+        if key not in self._latest or date >= self._latest[key]:
+            self._latest[key] = date
+            self.fingerprints[key] = new
+
+    def _newer(self, key, items):
+        after = self._after[key]
+        return [
+            (key, new, homework) for new, homework in items
+            if after is None or _date(homework) > after
+        ]
+
+
+def _date(homework) -> str:
+    return homework.date_updated or ''
+
+
+def dumps(fingerprints: dict) -> str:
+    """Сериализует отпечатки для хранилища состояния."""
+    return json.dumps(fingerprints, separators=(',', ':'))
+
+
+def loads(data) -> dict:
+    """Восстанавливает отпечатки из хранилища; мусор даёт пустой словарь."""
+    if not data:
+        return {}
+    try:
+        fingerprints = json.loads(data)
+    except ValueError:
+        return {}
+    return fingerprints if isinstance(fingerprints, dict) else {}
@@ -0,0 +1,199 @@
+"""Потоковый разбор ответа homework_statuses.
+
+Тело вида {"homeworks": [...], "current_date": ...} разбирается по мере
+поступления кусков: каждая работа отдаётся, как только прочитан её объект
+целиком, поэтому в памяти одновременно лежит одна работа, а не весь ответ.
+Остальные ключи верхнего уровня собираются в fields.
+"""
+import codecs
+import json
+import re
+
+HOMEWORKS_KEY = 'homeworks'
+# Один элемент или значение верхнего уровня не может быть больше.
+MAX_ITEM_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_OBJECT = 'object'
+_KEY = 'key'
+_COLON = 'colon'
+_VALUE = 'value'
+_NEXT_KEY = 'next key'
+_ITEM = 'item'
+_NEXT_ITEM = 'next item'
+_DONE = 'done'
+
+
+class HomeworkStreamParser:
+    """Разбирает ответ по кускам байт: feed() отдаёт готовые работы."""
+
+    def __init__(self, key: str = HOMEWORKS_KEY,
+                 max_item_size: int = MAX_ITEM_SIZE):
+        self.key = key
+        self.max_item_size = max_item_size
+        self.fields = {}
+        self.found = False
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = _OBJECT
+        self._current_key = None
+        self._handlers = {
+            _OBJECT: self._on_object,
+            _KEY: self._on_key,
+            _NEXT_KEY: self._on_next_key,
+            _COLON: self._on_colon,
+            _VALUE: self._on_value,
+            _ITEM: self._on_item,
+            _NEXT_ITEM: self._on_next_item,
+        }
+
+    def feed(self, chunk: bytes) -> list:
+        """Добавляет кусок тела, возвращает работы, прочитанные целиком."""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        items = self._parse(final=False)
+        if len(self._buffer) - self._pos > self.max_item_size:
+            raise ValueError(
+                f'Элемент ответа больше {self.max_item_size} символов')
+        return items
+
+    def close(self) -> list:
+        """Завершает разбор; ValueError, если ответ оборван или испорчен."""
+        self._buffer = self._buffer[self._pos:] + self._text.decode(
+            b'', final=True)
+        self._pos = 0
+        items = self._parse(final=True)
+        if self._state != _DONE:
+            raise ValueError('Ответ API оборвался или не является JSON')
+        if self._buffer[self._pos:].strip():
+            raise ValueError('Лишние данные после ответа API')
+        return items
+
+    def _skip(self):
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+        return self._buffer[self._pos:self._pos + 1]
+
+    def _value(self, final):
+        # Значение в конце буфера может быть не дочитано (число 12 из 123),
+        # поэтому до конца потока принимаем его, только если за ним что-то
+        # есть.
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise ValueError(
+                    f'Некорректный JSON в ответе API на позиции {self._pos}')
+            return False, None
+        if end == len(self._buffer) and not final:
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char, expected):
+        raise ValueError(
+            f'Ожидался {expected} на позиции {self._pos}, получено {char!r}')
+
+    def _parse(self, final):
+        items = []
+        while self._state != _DONE:
+            char = self._skip()
+            # Обработчик состояния возвращает False, если значение ещё не
+            # дочитано и нужен следующий кусок.
+            if not char or not self._handlers[self._state](
+                    char, final, items):
+                break
+        return items
+
+    def _consume(self, state):
+        self._pos += 1
+        self._state = state
+        return True
+
+    def _on_object(self, char, final, items):
+        if char != '{':
+            self._expect(char, 'объект')
+        return self._consume(_KEY)
+
+    def _on_key(self, char, final, items):
+        if char == '}':
+            return self._consume(_DONE)
+        if char != '"':
+            self._expect(char, 'ключ')
+        ready, key = self._value(final)
+        if ready:
+            self._current_key = key
+            self._state = _COLON
+        return ready
+
+    def _on_next_key(self, char, final, items):
+        if char == '}':
+            return self._consume(_DONE)
+        if char != ',':
+            self._expect(char, "',' или '}'")
+        return self._consume(_KEY)
+
+    def _on_colon(self, char, final, items):
+        if char != ':':
+            self._expect(char, "':'")
+        return self._consume(_VALUE)
+
+    def _on_value(self, char, final, items):
+        if self._current_key == self.key and char == '[':
+            self.found = True
+            return self._consume(_ITEM)
+        ready, value = self._value(final)
+        if ready:
+            self.fields[self._current_key] = value
+            self._state = _NEXT_KEY
+        return ready
+
+    def _on_item(self, char, final, items):
+        if char == ']':
+            return self._consume(_NEXT_KEY)
+        ready, item = self._value(final)
+        if ready:
+            items.append(item)
+            self._state = _NEXT_ITEM
+        return ready
+
+    def _on_next_item(self, char, final, items):
+        if char == ']':
+            return self._consume(_NEXT_KEY)
+        if char != ',':
+            self._expect(char, "',' или ']'")
+        return self._consume(_ITEM)
+
+
+class HomeworkStream:
+    """Итератор по работам из кусков тела ответа.
+
+    После полного прохода в fields лежат остальные ключи ответа, а found
+    показывает, был ли в нём список homeworks. close вызывается в конце
+    итерации, в том числе при ошибке (например, чтобы закрыть соединение).
+    """
+
+    def __init__(self, chunks, close=None):
+        self.chunks = chunks
+        self.parser = HomeworkStreamParser()
+        self._close = close
+
+    @property
+    def fields(self) -> dict:
+        return self.parser.fields
+
+    @property
+    def found(self) -> bool:
+        return self.parser.found
+
+    def __iter__(self):
+        parser = self.parser
+        try:
+            for chunk in self.chunks:
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            if self._close is not None:
+                self._close()
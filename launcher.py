@@ -0,0 +1,19 @@
+"""Точка входа бота: python launcher.py [backfill ... | workers N].
+
+Бот запускается отсюда, а не как python homework.py: запущенный файл
+становится модулем __main__, и остальные модули, делающие import
+homework, получили бы вторую его копию, не видящую настроек из
+create_app() и main().
+"""
+import sys
+
+import homework
+
+
+def main(argv=None):
+    """Настраивает бота и запускает команду из argv."""
+    homework.create_app().run(sys.argv[1:] if argv is None else argv)
+
+
+if __name__ == '__main__':
+    main()
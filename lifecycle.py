@@ -0,0 +1,131 @@
+"""Сигналы процесса: плавная остановка и перечитывание настроек.
+
+SIGTERM и SIGINT не прерывают текущий опрос: цикл бота замечает флаг
+остановки, дожидается начатых опросов, досылает очередь сообщений и
+сохраняет состояние. На всё это есть SHUTDOWN_TIMEOUT секунд (Heroku
+присылает SIGKILL через 30 с после SIGTERM); если не успели, или пришёл
+повторный сигнал, процесс завершается сразу.
+
+SIGHUP просит перечитать подписки и шаблоны сообщений; сами обработчики
+вызываются из цикла бота, а не из обработчика сигнала.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+
+import homework
+
+logger = logging.getLogger(__name__)
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+RELOAD_SIGNAL = getattr(signal, 'SIGHUP', None)
+
+
+def configure(environ=None):
+    """Читает настройки модуля из environ, по умолчанию homework.config."""
+    global SHUTDOWN_TIMEOUT
+    environ = homework.config if environ is None else environ
+    SHUTDOWN_TIMEOUT = float(environ.get('SHUTDOWN_TIMEOUT', 25))
+
+
+configure()
+
+
+class Lifecycle:
+    """Флаги остановки и перезагрузки, которые проверяет цикл бота."""
+
+    def __init__(self, timeout: float = None,
+                 clock=time.monotonic, hard_exit=True):
+        self.timeout = SHUTDOWN_TIMEOUT if timeout is None else timeout
+        self.clock = clock
+        self.hard_exit = hard_exit
+        self.stopping = threading.Event()
+        self.deadline = None
+        self._reload = threading.Event()
+        self._wakeup = threading.Event()
+        self._reloaders = []
+        self._wakers = []
+
+    def on_reload(self, func):
+        """Регистрирует обработчик перезагрузки."""
+        self._reloaders.append(func)
+        return func
+
+    def add_waker(self, func):
+        """func() будит цикл бота при остановке или перезагрузке."""
+        self._wakers.append(func)
+
+    def _wake(self):
+        self._wakeup.set()
+        for waker in self._wakers:
+            waker()
+
+    def stop(self, *args):
+        """Начинает остановку; повторный вызов завершает процесс сразу."""
+        if self.stopping.is_set():
+            self._force_exit('повторный сигнал остановки')
+            return
+        logger.info(f'Остановка, на завершение работы {self.timeout} с')
+        self.deadline = self.clock() + self.timeout
+        self.stopping.set()
+        if self.hard_exit:
+            timer = threading.Timer(
+                self.timeout, self._force_exit, ['истёк SHUTDOWN_TIMEOUT'])
+            timer.daemon = True
+            timer.start()
+        self._wake()
+
+    def _force_exit(self, reason):
+        if not self.hard_exit:
+            return
+        logger.critical(f'Аварийное завершение: {reason}')
+        logging.shutdown()
+        os._exit(1)
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось до крайнего срока остановки."""
+        if self.deadline is None:
+            return self.timeout
+        return max(0.0, self.deadline - self.clock())
+
+    def request_reload(self, *args):
+        """Просит перечитать настройки при ближайшей возможности."""
+        self._reload.set()
+        self._wake()
+
+    def reload_if_requested(self):
+        """Вызывает обработчики перезагрузки, если её просили."""
+        if not self._reload.is_set():
+            return
+        self._reload.clear()
+        for reloader in self._reloaders:
+            try:
+                reloader()
+            except Exception as error:
+                logger.error(f'Не удалось перечитать настройки: {error}')
+
+    def wait(self, seconds: float) -> bool:
+        """Спит до seconds секунд, просыпаясь на сигнал; True — пора
+        останавливаться.
+        """
+        self._wakeup.wait(seconds)
+        self._wakeup.clear()
+        return self.stopping.is_set()
+
+    def install(self):
+        """Ставит обработчики сигналов (только из главного потока)."""
+        for signum in STOP_SIGNALS:
+            signal.signal(signum, self.stop)
+        if RELOAD_SIGNAL is not None:
+            signal.signal(RELOAD_SIGNAL, self.request_reload)
+        return self
+
+    def install_async(self, loop):
+        """То же для цикла asyncio, чтобы сигнал будил select()."""
+        for signum in STOP_SIGNALS:
+            loop.add_signal_handler(signum, self.stop)
+        if RELOAD_SIGNAL is not None:
+            loop.add_signal_handler(RELOAD_SIGNAL, self.request_reload)
+        return self
@@ -0,0 +1,139 @@
+"""Неблокирующее логирование бота.
+
+Записи из цикла опроса попадают в очередь через QueueHandler, а в stdout
+и файл их пишет отдельный поток QueueListener. Файл ротируется и по
+размеру, и по времени. Настраивается переменными окружения, без правки
+homework.py:
+
+LOG_LEVEL           уровень корневого логгера, по умолчанию DEBUG;
+LOG_FILE            файл лога, по умолчанию file.log; пустая строка — без
+                    файла;
+LOG_FORMAT          text или json;
+LOG_MAX_BYTES       размер файла для ротации, по умолчанию 10 МБ;
+LOG_ROTATE_SECONDS  ротация по времени, по умолчанию раз в сутки;
+LOG_BACKUP_COUNT    сколько старых файлов хранить, по умолчанию 5;
+LOG_SAMPLE_EVERY    из повторяющихся записей с extra sampled=True
+                    пропускать каждую N-ю для подписчика, по умолчанию 10;
+LOG_CONFIG          путь к JSON для logging.config.dictConfig, если нужна
+                    полностью своя конфигурация.
+"""
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from collections import defaultdict
+
+TEXT_FORMAT = '%(asctime)s, %(name)s,%(levelname)s, %(message)s'
+
+_listener = None
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Ротация при превышении max_bytes или раз в interval секунд."""
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0,
+                 encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes,
+                         backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record):
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна JSON-строка."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        tenant = getattr(record, 'tenant', None)
+        if tenant is not None:
+            data['tenant'] = tenant
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает каждую every-ю запись с sampled=True для подписчика.
+
+    Остальные записи проходят без изменений. Считается по паре
+    (подписчик, шаблон сообщения), так что разные сообщения не мешают
+    друг другу.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts = defaultdict(int)
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False):
+            return True
+        key = (getattr(record, 'tenant', None), record.msg)
+        count = self._counts[key]
+        self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+def _formatter(kind):
+    if kind == 'json':
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def setup_logging(environ=os.environ):
+    """Настраивает корневой логгер; повторный вызов ничего не делает."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    config_path = environ.get('LOG_CONFIG')
+    if config_path:
+        with open(config_path, encoding='utf-8') as file:
+            logging.config.dictConfig(json.load(file))
+        return None
+
+    formatter = _formatter(environ.get('LOG_FORMAT', 'text'))
+    handlers = [logging.StreamHandler(sys.stdout)]
+    filename = environ.get('LOG_FILE', 'file.log')
+    if filename:
+        handlers.append(SizeAndTimeRotatingFileHandler(
+            filename,
+            max_bytes=int(environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+            interval=int(environ.get('LOG_ROTATE_SECONDS', 24 * 3600)),
+            backup_count=int(environ.get('LOG_BACKUP_COUNT', 5)),
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(
+        SamplingFilter(int(environ.get('LOG_SAMPLE_EVERY', 10))))
+    root = logging.getLogger()
+    root.setLevel(environ.get('LOG_LEVEL', 'DEBUG').upper())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
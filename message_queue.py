@@ -0,0 +1,288 @@
+"""Очередь исходящих сообщений в Telegram с ограничением скорости."""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+MAX_MESSAGE_LENGTH = 4096
+MAX_ATTEMPTS = 3
+SEPARATOR = '\n\n'
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена."""
+        self._refill(now)
+        wait = max(0.0, self.updated - now)
+        if self.tokens >= 1:
+            return wait
+        return wait + (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        """Забирает один токен."""
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, until: float):
+        """Не выдаёт токенов до момента until, затем выдаёт один."""
+        self.tokens = 1
+        self.updated = max(self.updated, until)
+
+
+def _report(callbacks, delivered: bool):
+    for callback in callbacks:
+        try:
+            callback(delivered)
+        except Exception as error:
+            logger.error(f'Ошибка в обработчике доставки: {error}')
+
+
+class MessageQueue:
+    """Фоновая отправка сообщений с лимитами на чат и на всего бота.
+
+    Объект подменяет telegram.Bot: send_message() лишь ставит текст в
+    очередь. Несколько сообщений, накопившихся для одного чата, уходят
+    одним сообщением. На 429 чат ставится на паузу по retry_after.
+    Переданный в send_message() callback вызывается с True после
+    доставки сообщения и с False, если оно так и не отправлено.
+    """
+
+    def __init__(self, bot, global_rate: float = GLOBAL_RATE,
+                 chat_rate: float = CHAT_RATE,
+                 max_attempts: int = MAX_ATTEMPTS, clock=time.monotonic,
+                 breaker=None):
+        self.bot = bot
+        self.breaker = breaker
+        self.chat_rate = chat_rate
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_rate, clock())
+        self.sent = 0
+        self.delivered = 0
+        self.failed = 0
+        self._buckets = {}
+        self._pending = defaultdict(list)
+        self._attempts = defaultdict(int)
+        self._ready = []
+        self._queued = set()
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._inflight = 0
+        self._worker = None
+
+    def send_message(self, chat_id, text: str, callback=None, **kwargs):
+        """Ставит сообщение в очередь вместо немедленной отправки."""
+        callbacks = () if callback is None else (callback,)
+        with self._condition:
+            self._pending[chat_id].append((text, callbacks))
+            self._schedule(chat_id, self.clock())
+            self._condition.notify_all()
+
+    def _bucket(self, chat_id, now):
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(
+                self.chat_rate, 1, now)
+        return bucket
+
+    def _schedule(self, chat_id, now):
+        if chat_id in self._queued:
+            return
+        due = now + self._bucket(chat_id, now).delay(now)
+        heapq.heappush(self._ready, (due, next(self._counter), chat_id))
+        self._queued.add(chat_id)
+
+    def _take(self, chat_id):
+        """Склеивает накопленные сообщения чата в пределах лимита длины."""
+        pending = self._pending[chat_id]
+        text, callbacks = pending.pop(0)
+        while pending and (
+            len(text) + len(SEPARATOR) + len(pending[0][0])
+            <= MAX_MESSAGE_LENGTH
+        ):
+            more, more_callbacks = pending.pop(0)
+            text += SEPARATOR + more
+            callbacks += more_callbacks
+        if not pending:
+            del self._pending[chat_id]
+        return text, callbacks
+
+    def _next(self):
+        """Ждёт, пока можно отправить, и возвращает (чат, текст,
+        callback'и склеенных сообщений).
+        """
+        with self._condition:
+            while True:
+                if not self._ready:
+                    if not self._running:
+                        return None
+                    self._condition.wait()
+                    continue
+                now = self.clock()
+                due = self._ready[0][0]
+                wait = max(due - now, self.global_bucket.delay(now))
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                _, _, chat_id = heapq.heappop(self._ready)
+                self._queued.discard(chat_id)
+                if self._bucket(chat_id, now).delay(now) > 0:
+                    self._schedule(chat_id, now)
+                    continue
+                if self.breaker is not None and not self.breaker.allow():
+                    self._schedule(chat_id, now)
+                    self._condition.wait(self.breaker.retry_in() or 1.0)
+                    continue
+                self.global_bucket.consume(now)
+                self._bucket(chat_id, now).consume(now)
+                self._inflight += 1
+                text, callbacks = self._take(chat_id)
+                if self._pending.get(chat_id):
+                    # Остаток не влез в одно сообщение: чат снова в
+                    # очереди, со своим лимитом скорости.
+                    self._schedule(chat_id, now)
+                return chat_id, text, callbacks
+
+    def _requeue(self, chat_id, text, callbacks, delay=0.0):
+        with self._condition:
+            now = self.clock()
+            self._pending[chat_id].insert(0, (text, callbacks))
+            if delay:
+                self._bucket(chat_id, now).pause(now + delay)
+            self._schedule(chat_id, now)
+
+    def _deliver(self, chat_id, text, callbacks=()):
+        # telegram импортируется при первой отправке: импорт модуля
+        # message_queue не должен тянуть тяжёлый клиент.
+        import telegram
+        self.sent += 1
+        try:
+            self._send(chat_id, text)
+        except telegram.error.RetryAfter as error:
+            logger.warning(
+                f'Telegram просит подождать {error.retry_after} с '
+                f'перед отправкой в чат {chat_id}')
+            self._requeue(chat_id, text, callbacks, error.retry_after)
+        except (telegram.error.TimedOut, telegram.error.NetworkError) as error:
+            self._attempts[chat_id] += 1
+            if self._attempts[chat_id] < self.max_attempts:
+                self._requeue(
+                    chat_id, text, callbacks, self._attempts[chat_id])
+            else:
+                self._attempts.pop(chat_id, None)
+                self.failed += 1
+                logger.error(f'Сообщения в чат {chat_id} не отправлены: '
+                             f'{error}')
+                _report(callbacks, False)
+        except telegram.error.TelegramError as error:
+            self.failed += 1
+            logger.error(f'Сообщения в чат {chat_id} не отправлены: {error}')
+            _report(callbacks, False)
+        else:
+            self._attempts.pop(chat_id, None)
+            self.delivered += 1
+            logger.info(f'Сообщение успешно отправилось в чат {chat_id}')
+            _report(callbacks, True)
+
+    def _send(self, chat_id, text):
+        """Отправка через предохранитель: сбоем Telegram считаются только
+        сетевые ошибки, а 429 и ошибки запроса означают, что он доступен.
+        """
+        import telegram
+        breaker = self.breaker
+        try:
+            with metrics.SEND_LATENCY.time():
+                result = self.bot.send_message(chat_id, text=text)
+        except (telegram.error.TimedOut, telegram.error.NetworkError):
+            metrics.TELEGRAM_SENDS.labels('failed').inc()
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except telegram.error.TelegramError:
+            metrics.TELEGRAM_SENDS.labels('failed').inc()
+            if breaker is not None:
+                breaker.record_success()
+            raise
+        metrics.TELEGRAM_SENDS.labels('sent').inc()
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            try:
+                self._deliver(*item)
+            finally:
+                with self._condition:
+                    self._inflight -= 1
+                    self._condition.notify_all()
+
+    def start(self):
+        """Запускает фоновый поток отправки."""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._worker = threading.Thread(
+            target=self._run, name='telegram-queue', daemon=True)
+        self._worker.start()
+        return self
+
+    def join(self, timeout=None) -> bool:
+        """Ждёт, пока очередь опустеет; False, если не успели за timeout."""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            while self._ready or self._pending or self._inflight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - self.clock()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None) -> bool:
+        """Досылает очередь и останавливает поток; timeout — на всё."""
+        deadline = None if timeout is None else self.clock() + timeout
+        drained = self.join(timeout)
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._worker is not None:
+            self._worker.join(
+                None if deadline is None
+                else max(0.0, deadline - self.clock()))
+        return drained
+
+    def __len__(self):
+        with self._condition:
+            return sum(len(items) for items in self._pending.values())
@@ -0,0 +1,253 @@
+"""Метрики бота в текстовом формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса; их обновление — пара
+операций со словарём и целыми числами без блокировок, чтобы не
+замедлять цикл опроса. Отдаются по HTTP через start_http_server().
+"""
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Этапы опроса без сети занимают доли миллисекунды.
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025) + DEFAULT_BUCKETS
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    """Монотонно растущий счётчик, возможно с метками."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def labels(self, *values):
+        """Дочерний счётчик для значений меток."""
+        child = self._values.get(values)
+        if child is None:
+            child = self._values.setdefault(values, _CounterValue())
+        return child
+
+    def inc(self, amount=1):
+        """Увеличивает счётчик без меток."""
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in sorted(self._values.items()):
+            yield self.name, _labels_text(self.labelnames, values), child.value
+
+
+class _CounterValue:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами, возможно с
+    метками.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str,
+                 buckets=DEFAULT_BUCKETS, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        if not self.labelnames:
+            self.labels()
+
+    def labels(self, *values):
+        """Дочерняя гистограмма для значений меток."""
+        child = self._values.get(values)
+        if child is None:
+            child = self._values.setdefault(
+                values, _HistogramValue(self.buckets))
+        return child
+
+    def observe(self, value: float):
+        """Учитывает одно наблюдение без меток."""
+        self.labels().observe(value)
+
+    def time(self):
+        """Контекстный менеджер, замеряющий время блока."""
+        return _Timer(self.labels())
+
+    def samples(self):
+        for values, child in sorted(self._values.items()):
+            labels = self.labelnames
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield (f'{self.name}_bucket',
+                       _labels_text(labels, values, [('le', bound)]),
+                       cumulative)
+            cumulative += child.counts[-1]
+            yield (f'{self.name}_bucket',
+                   _labels_text(labels, values, [('le', '+Inf')]),
+                   cumulative)
+            yield f'{self.name}_sum', _labels_text(labels, values), child.sum
+            yield (f'{self.name}_count', _labels_text(labels, values),
+                   cumulative)
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Создаёт и регистрирует счётчик."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS,
+                  labelnames=()):
+        """Создаёт и регистрирует гистограмму."""
+        return self._register(
+            Histogram(name, documentation, buckets, labelnames))
+
+    def exposition(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+POLLS = REGISTRY.counter(
+    'homework_bot_polls_total', 'Опросы API Практикума')
+STATUS_CHANGES = REGISTRY.counter(
+    'homework_bot_status_changes_total', 'Изменения статусов домашних работ')
+TELEGRAM_SENDS = REGISTRY.counter(
+    'homework_bot_telegram_sends_total', 'Отправки сообщений в Telegram',
+    ['result'])
+ERRORS = REGISTRY.counter(
+    'homework_bot_errors_total', 'Ошибки по классу исключения',
+    ['exception'])
+API_COALESCED = REGISTRY.counter(
+    'homework_bot_api_coalesced_total',
+    'Опросы, получившие ответ общего запроса к API по тому же токену')
+API_LATENCY = REGISTRY.histogram(
+    'homework_bot_get_api_answer_seconds', 'Длительность запроса к API')
+SEND_LATENCY = REGISTRY.histogram(
+    'homework_bot_send_message_seconds', 'Длительность отправки в Telegram')
+SINK_LATENCY = REGISTRY.histogram(
+    'homework_bot_sink_send_seconds', 'Длительность отправки в канал',
+    labelnames=['sink'])
+SINK_SENDS = REGISTRY.counter(
+    'homework_bot_sink_sends_total', 'Отправки в каналы уведомлений',
+    ['sink', 'result'])
+STAGE_LATENCY = REGISTRY.histogram(
+    'homework_bot_stage_seconds', 'Длительность этапов опроса',
+    STAGE_BUCKETS, labelnames=['stage'])
+OUTBOX_MESSAGES = REGISTRY.counter(
+    'homework_bot_outbox_messages_total', 'Уведомления в журнале outbox',
+    ['result'])
+OUTBOX_COMMITS = REGISTRY.counter(
+    'homework_bot_outbox_commits_total', 'Групповые записи журнала outbox')
+TOKEN_CHECKS = REGISTRY.counter(
+    'homework_bot_token_checks_total', 'Проверки токенов Практикума',
+    ['result'])
+
+
+def count_error(error: BaseException):
+    """Учитывает ошибку по имени её класса."""
+    ERRORS.labels(type(error).__name__).inc()
+
+
+def start_http_server(port: int, address: str = '',
+                      registry: Registry = REGISTRY):
+    """Отдаёт метрики по HTTP в фоновом потоке, возвращает сервер."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.exposition().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f'Метрики доступны на порту {server.server_port}')
+    return server
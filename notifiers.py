@@ -0,0 +1,243 @@
+"""Каналы доставки уведомлений.
+
+Канал (sink) — объект с именем name и методом send(target, text), где
+target — адрес внутри канала: чат Telegram, URL, e-mail. Каналы подписки
+задаются ключом sinks в файле подписок (или NOTIFY_SINKS для одного
+подписчика):
+
+    [{"type": "telegram"}, {"type": "webhook", "url": "https://..."},
+     {"type": "email", "to": "me@example.com"}, {"type": "stdout"}]
+
+Без ключа sinks уведомления, как и раньше, уходят только в чат подписки.
+
+FanOut раздаёт сообщение всем каналам подписки. У каждого канала свои
+очереди и потоки: send() лишь кладёт сообщение в очереди, поэтому
+медленный канал не задерживает ни остальные каналы, ни цикл опроса.
+Адрес всегда попадает в одну и ту же очередь канала, так что сообщения
+одному адресату приходят по порядку. Если очередь переполнена, сообщение
+для этого канала отбрасывается.
+"""
+import json
+import logging
+import queue
+import smtplib
+import sys
+import threading
+import time
+from collections import namedtuple
+from email.message import EmailMessage
+
+import requests
+
+import exceptions
+import homework
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SINK_TIMEOUT = 10
+SINK_WORKERS = 4
+SINK_QUEUE_SIZE = 10_000
+EMAIL_SUBJECT = 'Статус домашней работы'
+
+# kind — имя канала, target — адрес в нём.
+Channel = namedtuple('Channel', ['kind', 'target'])
+
+
+def configure(environ=None):
+    """Читает настройки модуля из environ, по умолчанию homework.config."""
+    global NOTIFY_SINKS, SMTP_HOST, SMTP_PORT, SMTP_FROM
+    environ = homework.config if environ is None else environ
+    NOTIFY_SINKS = environ.get('NOTIFY_SINKS')
+    SMTP_HOST = environ.get('SMTP_HOST', '127.0.0.1')
+    SMTP_PORT = int(environ.get('SMTP_PORT', 1025))
+    SMTP_FROM = environ.get('SMTP_FROM', 'homework-bot@localhost')
+
+
+configure()
+
+
+class TelegramSink:
+    """Чат Telegram через бота или очередь message_queue.MessageQueue."""
+
+    name = 'telegram'
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    def send(self, chat_id, text: str):
+        homework.send_tenant_message(self.bot, chat_id, text)
+
+
+class WebhookSink:
+    """POST {"text": ...} в формате JSON на адрес канала."""
+
+    name = 'webhook'
+
+    def __init__(self, session=requests, timeout: float = SINK_TIMEOUT):
+        self.session = session
+        self.timeout = timeout
+
+    def send(self, url: str, text: str):
+        response = self.session.post(
+            url, json={'text': text}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class EmailSink:
+    """Письмо через SMTP-сервер, по умолчанию локальный на порту 1025."""
+
+    name = 'email'
+
+    def __init__(self, host: str = None, port: int = None,
+                 sender: str = None, timeout: float = SINK_TIMEOUT):
+        self.host = SMTP_HOST if host is None else host
+        self.port = SMTP_PORT if port is None else port
+        self.sender = SMTP_FROM if sender is None else sender
+        self.timeout = timeout
+
+    def send(self, address: str, text: str):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = address
+        message['Subject'] = EMAIL_SUBJECT
+        message.set_content(text)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+class StdoutSink:
+    """Строка в stdout: для отладки и локального стенда."""
+
+    name = 'stdout'
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def send(self, target, text: str):
+        with self._lock:
+            print(f'[{target}] {text}', file=self.stream or sys.stdout,
+                  flush=True)
+
+
+# Ключ адреса в описании канала; без него адрес — чат подписки.
+TARGET_KEYS = {
+    'telegram': 'chat_id', 'webhook': 'url', 'email': 'to', 'stdout': None,
+}
+
+
+def parse_channels(specs, chat_id):
+    """Описания каналов из файла подписок -> кортеж Channel или None."""
+    if specs is None:
+        return None
+    channels = []
+    for spec in specs:
+        kind = spec.get('type')
+        if kind not in TARGET_KEYS:
+            raise ValueError(f'Неизвестный канал уведомлений: {kind}')
+        key = TARGET_KEYS[kind]
+        if key is None:
+            target = chat_id
+        elif key == 'chat_id':
+            target = spec.get(key, chat_id)
+        elif spec.get(key):
+            target = spec[key]
+        else:
+            raise ValueError(f'У канала {kind} нет адреса {key}')
+        channels.append(Channel(kind, target))
+    return tuple(channels)
+
+
+def channels_from_env(chat_id, value=None):
+    """Каналы единственного подписчика из JSON в value или NOTIFY_SINKS."""
+    if value is None:
+        value = NOTIFY_SINKS
+    return parse_channels(json.loads(value) if value else None, chat_id)
+
+
+class FanOut:
+    """Фоновая рассылка по каналам: очередь и потоки на каждый канал."""
+
+    def __init__(self, sinks, workers: int = SINK_WORKERS,
+                 queue_size: int = SINK_QUEUE_SIZE):
+        self.sinks = {sink.name: sink for sink in sinks}
+        self.workers = workers
+        self._queues = {
+            name: [queue.Queue(queue_size) for _ in range(workers)]
+            for name in self.sinks
+        }
+        self._threads = []
+
+    def send(self, channels, text: str):
+        """Ставит сообщение в очередь каждого канала и сразу возвращается."""
+        for channel in channels:
+            try:
+                queues = self._queues[channel.kind]
+                queues[hash(channel.target) % len(queues)].put_nowait(
+                    (channel.target, text))
+            except KeyError:
+                logger.error(f'Канал {channel.kind} не настроен')
+            except queue.Full:
+                metrics.SINK_SENDS.labels(channel.kind, 'dropped').inc()
+                logger.error(f'Очередь канала {channel.kind} переполнена, '
+                             'сообщение отброшено')
+
+    def _run(self, name: str, jobs):
+        sink = self.sinks[name]
+        latency = metrics.SINK_LATENCY.labels(name)
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            self._deliver(sink, latency, *job)
+
+    def _deliver(self, sink, latency, target, text):
+        try:
+            with latency.time():
+                sink.send(target, text)
+        except (Exception, exceptions.NoTelegramError) as error:
+            metrics.SINK_SENDS.labels(sink.name, 'failed').inc()
+            logger.error(f'Канал {sink.name}: уведомление не доставлено: '
+                         f'{error}')
+        else:
+            metrics.SINK_SENDS.labels(sink.name, 'sent').inc()
+
+    def start(self):
+        """Запускает потоки всех каналов."""
+        for name, queues in self._queues.items():
+            for number, jobs in enumerate(queues):
+                thread = threading.Thread(
+                    target=self._run, args=(name, jobs),
+                    name=f'sink-{name}-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None) -> bool:
+        """Досылает очереди и останавливает потоки; False — не успели."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            return max(0.0, deadline - time.monotonic())
+
+        for queues in self._queues.values():
+            for jobs in queues:
+                try:
+                    jobs.put(None, timeout=remaining())
+                except queue.Full:
+                    # Очередь не разобрали до срока: поток остаётся
+                    # работать и stop() вернёт False.
+                    pass
+        for thread in self._threads:
+            thread.join(remaining())
+        return not any(thread.is_alive() for thread in self._threads)
+
+
+def create_fanout(bot) -> FanOut:
+    """Все каналы с настройками из окружения."""
+    return FanOut([
+        TelegramSink(bot), WebhookSink(), EmailSink(), StdoutSink(),
+    ]).start()
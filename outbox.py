@@ -0,0 +1,257 @@
+"""Журнал исходящих уведомлений (outbox) с упреждающей записью.
+
+Уведомление о смене статуса сначала дописывается в журнал и только потом
+отправляется; после доставки в журнал дописывается отметка. Недоставленные
+уведомления отправляются заново при запуске и затем раз в REPLAY_INTERVAL
+секунд, так что сбой Telegram их не теряет.
+
+У каждого уведомления есть ключ идемпотентности: чат, работа и отпечаток
+её статуса. Уведомление с ключом, который уже есть в журнале, не пишется
+и не отправляется второй раз. Дважды может уйти только сообщение, отметка
+о доставке которого не попала на диск до аварийного завершения процесса.
+
+Журнал — строки JSON. Записи пишутся группами (group commit): поток
+записи забирает всё накопившееся, пишет одним write() и делает один
+fsync, а add() возвращается, когда его запись на диске. При открытии и
+закрытии журнал сжимается: остаются недоставленные уведомления и ключи
+последних DELIVERED_KEEP доставленных.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import exceptions
+import homework
+import metrics
+from message_queue import MessageQueue
+
+logger = logging.getLogger(__name__)
+
+DELIVERED_KEEP = 10_000
+REPLAY_INTERVAL = 60
+
+
+def message_key(subscription, key: str, fingerprint: int) -> str:
+    """Ключ идемпотентности уведомления о смене статуса работы key.
+
+    Вместо токена в журнал попадает лишь короткий хеш от него.
+    """
+    token = hashlib.blake2b(
+        subscription.token.encode(), digest_size=4).hexdigest()
+    return f'{subscription.chat_id}:{token}:{key}:{fingerprint}'
+
+
+def channel_key(key: str, channel) -> str:
+    """Ключ уведомления key для канала подписки (notifiers.Channel)."""
+    return f'{key}>{channel.kind}:{channel.target}'
+
+
+class Outbox:
+    """Журнал уведомлений в файле path."""
+
+    def __init__(self, path: str, keep: int = DELIVERED_KEEP,
+                 replay_interval: float = REPLAY_INTERVAL,
+                 clock=time.monotonic):
+        self.path = path
+        self.keep = keep
+        self.replay_interval = replay_interval
+        self.clock = clock
+        self.commits = 0
+        self._pending = OrderedDict()
+        self._delivered = OrderedDict()
+        self._sending = set()
+        self._replayed = None
+        self._buffer = []
+        self._queued = 0
+        self._committed = 0
+        self._error = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._load()
+        self._compact()
+        self._file = open(path, 'ab')
+        self._writer = threading.Thread(
+            target=self._run, name='outbox-writer', daemon=True)
+        self._writer.start()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as file:
+            for number, line in enumerate(file, 1):
+                try:
+                    record = json.loads(line)
+                    if 'done' in record:
+                        self._mark_delivered(record['done'])
+                    else:
+                        self._pending[record['add']] = (
+                            record['chat'], record['text'])
+                except (ValueError, KeyError, TypeError):
+                    # Обрыв последней строки при аварийном завершении.
+                    logger.warning(
+                        f'Пропущена испорченная строка {number} журнала '
+                        f'{self.path}')
+        if self._pending:
+            logger.info(f'В журнале недоставленных уведомлений: '
+                        f'{len(self._pending)}')
+
+    def _mark_delivered(self, key):
+        self._pending.pop(key, None)
+        self._delivered[key] = None
+        self._delivered.move_to_end(key)
+        while len(self._delivered) > self.keep:
+            self._delivered.popitem(last=False)
+
+    def _compact(self):
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'wb') as file:
+            file.writelines(_line({'done': key}) for key in self._delivered)
+            file.writelines(
+                _line({'add': key, 'chat': chat_id, 'text': text})
+                for key, (chat_id, text) in self._pending.items())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+
+    def _append(self, record) -> int:
+        if self._error is not None:
+            raise self._error
+        self._buffer.append(_line(record))
+        self._queued += 1
+        self._condition.notify_all()
+        return self._queued
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._buffer and not self._closed:
+                    self._condition.wait()
+                if not self._buffer:
+                    return
+                batch, self._buffer = self._buffer, []
+                queued = self._queued
+            try:
+                self._file.write(b''.join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as error:
+                logger.critical(f'Не удалось записать журнал уведомлений: '
+                                f'{error}')
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self.commits += 1
+                self._committed = queued
+                self._condition.notify_all()
+            metrics.OUTBOX_COMMITS.inc()
+
+    def add(self, key: str, chat_id, text: str) -> bool:
+        """Записывает уведомление на диск; False — такой ключ уже есть."""
+        with self._condition:
+            if key in self._pending or key in self._delivered:
+                metrics.OUTBOX_MESSAGES.labels('duplicate').inc()
+                return False
+            self._pending[key] = (chat_id, text)
+            queued = self._append(
+                {'add': key, 'chat': chat_id, 'text': text})
+            while self._committed < queued:
+                if self._error is not None:
+                    raise self._error
+                self._condition.wait()
+        metrics.OUTBOX_MESSAGES.labels('added').inc()
+        return True
+
+    def _resolve(self, key: str, delivered: bool):
+        with self._condition:
+            self._sending.discard(key)
+            if delivered and key in self._pending:
+                self._mark_delivered(key)
+                self._append({'done': key})
+        metrics.OUTBOX_MESSAGES.labels(
+            'delivered' if delivered else 'failed').inc()
+
+    def deliver(self, bot, key: str, chat_id, text: str):
+        """Отправляет записанное уведомление. Отметка о доставке ставится
+        после отправки, а для очереди message_queue — после доставки.
+        """
+        with self._condition:
+            self._sending.add(key)
+        if isinstance(bot, MessageQueue):
+            bot.send_message(
+                chat_id, text=text,
+                callback=lambda delivered: self._resolve(key, delivered))
+            return
+        try:
+            homework.send_tenant_message(bot, chat_id, text)
+        except BaseException:
+            self._resolve(key, False)
+            raise
+        self._resolve(key, True)
+
+    def send(self, bot, key: str, chat_id, text: str) -> bool:
+        """add() и deliver(); False, если уведомление уже было."""
+        if not self.add(key, chat_id, text):
+            return False
+        self.deliver(bot, key, chat_id, text)
+        return True
+
+    def replay(self, bot, force: bool = False) -> int:
+        """Заново отправляет недоставленные уведомления, кроме тех, что
+        ещё в пути. Без force — не чаще раза в replay_interval секунд.
+        """
+        now = self.clock()
+        if not force and self._replayed is not None and (
+                now - self._replayed < self.replay_interval):
+            return 0
+        self._replayed = now
+        with self._condition:
+            pending = [
+                (key, chat_id, text)
+                for key, (chat_id, text) in self._pending.items()
+                if key not in self._sending
+            ]
+        for key, chat_id, text in pending:
+            try:
+                self.deliver(bot, key, chat_id, text)
+            except exceptions.NoTelegramError as error:
+                logger.error(f'Повторная отправка не удалась: {error}')
+                break
+        if pending:
+            logger.info(f'Повторно отправлено уведомлений: {len(pending)}')
+        return len(pending)
+
+    def pending(self) -> list:
+        """[(ключ, чат, текст)] недоставленных уведомлений."""
+        with self._condition:
+            return [
+                (key, chat_id, text)
+                for key, (chat_id, text) in self._pending.items()
+            ]
+
+    def close(self):
+        """Дописывает журнал и сжимает его."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+        self._file.close()
+        if self._error is None:
+            self._compact()
+
+    def __len__(self):
+        return len(self._pending)
+
+
+def _line(record) -> bytes:
+    return json.dumps(record, ensure_ascii=False).encode() + b'\n'
+
+
+def open_outbox(path):
+    """Журнал в файле path или None, если путь не задан."""
+    return Outbox(path) if path else None
@@ -0,0 +1,167 @@
+"""Проверка токенов перед запуском опроса.
+
+Все токены Практикума из реестра проверяются параллельно одним запросом к
+API (401 или 403 — токен недействителен), токен Telegram — вызовом getMe.
+Результаты хранятся TOKEN_CHECK_TTL секунд в TokenChecks. Подписки с
+недействительным токеном не опрашиваются (QuarantinedRegistry), пока
+результат не устареет; затем следующий опрос проверяет токен заново.
+Отказ API по токену во время обычного опроса тоже отправляет токен в
+карантин. Сетевые ошибки и сбои API карантином не считаются.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import requests
+import telegram
+
+import homework
+import metrics
+
+logger = logging.getLogger(__name__)
+
+PREFLIGHT_WORKERS = 16
+
+PreflightReport = namedtuple(
+    'PreflightReport', ['tokens', 'checked', 'invalid', 'unknown',
+                        'quarantined'])
+
+
+class TokenChecks:
+    """Результаты проверки токенов со сроком годности ttl секунд."""
+
+    def __init__(self, ttl: float = homework.TOKEN_CHECK_TTL,
+                 clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def record(self, token: str, valid: bool):
+        with self._lock:
+            self._results[token] = (valid, self.clock() + self.ttl)
+
+    def result(self, token: str):
+        """True или False, None — не проверялся или результат устарел."""
+        result = self._results.get(token)
+        if result is None or result[1] <= self.clock():
+            return None
+        return result[0]
+
+    def invalid(self, token: str) -> bool:
+        return self.result(token) is False
+
+    def unchecked(self, tokens) -> list:
+        """Токены без действующего результата проверки."""
+        return [token for token in tokens if self.result(token) is None]
+
+
+class QuarantinedRegistry:
+    """Подписки реестра, чьи токены не в карантине.
+
+    Повторяет интерфейс tenants.SubscriptionRegistry для чтения, поэтому
+    планировщик сам снимает такие подписки с расписания и возвращает их,
+    когда результат проверки устареет.
+    """
+
+    def __init__(self, registry, checks: TokenChecks):
+        self.registry = registry
+        self.checks = checks
+
+    def policy(self, subscription):
+        return self.registry.policy(subscription)
+
+    def locale(self, subscription):
+        return self.registry.locale(subscription)
+
+    def channels(self, subscription):
+        return self.registry.channels(subscription)
+
+    def by_token(self, token: str) -> list:
+        if self.checks.invalid(token):
+            return []
+        return self.registry.by_token(token)
+
+    def __contains__(self, subscription):
+        return (subscription in self.registry
+                and not self.checks.invalid(subscription.token))
+
+    def __iter__(self):
+        invalid = self.checks.invalid
+        return (sub for sub in self.registry if not invalid(sub.token))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def check_practicum_token(token: str):
+    """True/False — принял ли API токен, None — проверить не удалось."""
+    try:
+        response = homework.api_client().get(
+            homework.ENDPOINT,
+            headers={'Authorization': f'OAuth {token}'},
+            params={'from_date': int(time.time())},
+            timeout=homework.REQUEST_TIMEOUT)
+    except requests.RequestException as error:
+        logger.warning(f'Не удалось проверить токен Практикума: {error}')
+        return None
+    if response.status_code in homework.UNAUTHORIZED:
+        return False
+    if response.status_code == HTTPStatus.OK:
+        return True
+    logger.warning(
+        f'Не удалось проверить токен Практикума: {response.status_code}')
+    return None
+
+
+def check_telegram_token(bot):
+    """Как check_practicum_token, но для токена бота."""
+    try:
+        bot.get_me()
+    except (telegram.error.Unauthorized, telegram.error.InvalidToken):
+        return False
+    except telegram.error.TelegramError as error:
+        logger.warning(f'Не удалось проверить токен Telegram: {error}')
+        return None
+    return True
+
+
+def check_tokens(registry, checks: TokenChecks,
+                 workers: int = PREFLIGHT_WORKERS) -> PreflightReport:
+    """Параллельно проверяет токены реестра без действующего результата."""
+    tokens = list(dict.fromkeys(sub.token for sub in registry))
+    pending = checks.unchecked(tokens)
+    invalid = unknown = 0
+    if pending:
+        with ThreadPoolExecutor(min(workers, len(pending))) as pool:
+            results = list(pool.map(check_practicum_token, pending))
+        for token, valid in zip(pending, results):
+            result = {True: 'valid', False: 'invalid', None: 'unknown'}[valid]
+            metrics.TOKEN_CHECKS.labels(result).inc()
+            if valid is None:
+                unknown += 1
+                continue
+            checks.record(token, valid)
+            invalid += not valid
+    quarantined = sum(1 for sub in registry if checks.invalid(sub.token))
+    report = PreflightReport(
+        len(tokens), len(pending), invalid, unknown, quarantined)
+    if quarantined:
+        logger.warning(
+            f'Подписок с недействительным токеном: {quarantined}, они не '
+            f'опрашиваются {checks.ttl} с')
+    logger.info(f'Проверка токенов: {report._asdict()}')
+    return report
+
+
+def check_bot(bot):
+    """Без действующего токена Telegram бот работать не может, поэтому
+    процесс завершается.
+    """
+    if check_telegram_token(bot) is False:
+        msg = 'Telegram отклонил TELEGRAM_TOKEN'
+        logger.critical(msg)
+        raise SystemExit(msg)
@@ -0,0 +1,203 @@
+"""Профилирование цикла опроса. По умолчанию выключено.
+
+PROFILE_STAGES=1 включает таймеры этапов опроса: запрос к API
+(get_api_answer), проверка ответа (check_response), разбор работ и
+тексты уведомлений (parse_status), отправка (send_message). Время этапов
+отдаётся гистограммой homework_bot_stage_seconds в метриках.
+
+PROFILE — через запятую, что снять за первые PROFILE_CYCLES опросов:
+cprofile — статистика cProfile (.pstats, смотреть pstats или snakeviz),
+tracemalloc — снимок выделений памяти (.tracemalloc), flame — стеки
+потока опроса по стенным часам в формате collapsed stacks (.folded) для
+flamegraph.pl или speedscope. Файлы пишутся в PROFILE_DIR с pid процесса
+в имени; если бот остановился раньше, сохраняется то, что успели снять.
+"""
+import cProfile
+import collections
+import contextlib
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+
+import homework
+import metrics
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.005
+TRACEMALLOC_FRAMES = 25
+MODES = ('cprofile', 'tracemalloc', 'flame')
+STAGES = ('get_api_answer', 'check_response', 'parse_status',
+          'send_message')
+
+_NO_TIMER = contextlib.nullcontext()
+
+
+def configure(environ=None):
+    """Читает настройки модуля из environ, по умолчанию homework.config."""
+    global PROFILE_STAGES, PROFILE, PROFILE_CYCLES, PROFILE_DIR
+    environ = homework.config if environ is None else environ
+    PROFILE_STAGES = bool(environ.get('PROFILE_STAGES'))
+    PROFILE = environ.get('PROFILE', '')
+    PROFILE_CYCLES = int(environ.get('PROFILE_CYCLES', 100))
+    PROFILE_DIR = environ.get('PROFILE_DIR', '.')
+
+
+configure()
+
+# Таймеры этапов и текущий Capture; None — выключено.
+stage_timers = None
+capture = None
+
+
+def stage(name: str):
+    """Контекстный менеджер, замеряющий этап опроса, если таймеры
+    включены; иначе ничего не делает.
+    """
+    if stage_timers is None:
+        return _NO_TIMER
+    return stage_timers[name].time()
+
+
+def use_stage_timers(enabled: bool = True):
+    global stage_timers
+    stage_timers = None
+    if enabled:
+        stage_timers = {
+            name: metrics.STAGE_LATENCY.labels(name) for name in STAGES
+        }
+
+
+def folded_stack(frame) -> str:
+    """Стек кадра в формате collapsed stacks: от корня через «;»."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} '
+                     f'({os.path.basename(code.co_filename)}'
+                     f':{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Раз в interval секунд запоминает стек потока thread_id."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[folded_stack(frame)] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class Capture:
+    """Профилирует поток, вызвавший start(), в течение cycles опросов."""
+
+    def __init__(self, modes, cycles: int = None, directory: str = None):
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f'Неизвестный режим профилирования: {unknown}')
+        self.modes = tuple(modes)
+        self.cycles = PROFILE_CYCLES if cycles is None else cycles
+        self.directory = PROFILE_DIR if directory is None else directory
+        self.done = 0
+        self.paths = []
+        self._profile = None
+        self._sampler = None
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        if 'tracemalloc' in self.modes:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if 'flame' in self.modes:
+            self._sampler = StackSampler(threading.get_ident()).start()
+        if 'cprofile' in self.modes:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._running = True
+        logger.info(f'Профилирование {self.modes} на {self.cycles} опросов')
+        return self
+
+    def cycle_done(self):
+        """Учитывает завершённый опрос; после cycles-го сохраняет файлы."""
+        self.done += 1
+        if self.done >= self.cycles:
+            self.stop()
+
+    def _path(self, suffix: str) -> str:
+        path = os.path.join(
+            self.directory, f'profile-{os.getpid()}.{suffix}')
+        self.paths.append(path)
+        return path
+
+    def stop(self):
+        """Останавливает сбор и сохраняет файлы; повторно ничего не делает."""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self._path('pstats'))
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.dump(self._path('folded'))
+        if 'tracemalloc' in self.modes:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            snapshot.dump(self._path('tracemalloc'))
+            for line in snapshot.statistics('lineno')[:10]:
+                logger.info(f'Память: {line}')
+        logger.info(f'Профиль за {self.done} опросов: {self.paths}')
+
+
+def start(stages: bool = None, modes: str = None,
+          cycles: int = None, directory: str = None):
+    """Включает профилирование; не переданное берётся из настроек
+    PROFILE*. Вызывается из потока опроса: cProfile и flame снимают
+    только его.
+    """
+    global capture
+    use_stage_timers(PROFILE_STAGES if stages is None else stages)
+    if modes is None:
+        modes = PROFILE
+    modes = [mode.strip() for mode in modes.split(',') if mode.strip()]
+    capture = None
+    if modes:
+        capture = Capture(modes, cycles, directory).start()
+
+
+def cycle_done():
+    """Отмечает завершённый опрос подписки."""
+    if capture is not None:
+        capture.cycle_done()
+
+
+def stop():
+    """Сохраняет незавершённый профиль при остановке бота."""
+    if capture is not None:
+        capture.stop()
@@ -0,0 +1,134 @@
+"""Условные запросы к API и кеш последнего ответа по токену.
+
+Для каждого токена хранится последний ответ: ETag, Last-Modified, хеш тела
+и уже разобранный словарь. Следующий запрос с теми же параметрами уходит
+с If-None-Match/If-Modified-Since; на 304 или на тело с тем же хешем
+возвращается тот же объект без повторного json-декодирования. Какой ответ
+последним разобрал каждый подписчик, запоминает mark_processed(), а
+is_unchanged() позволяет пропустить check_response только тому, кто этот
+ответ уже разбирал: другие чаты на том же токене его всё равно получат.
+
+Ограничение: API Практикума кладёт в тело current_date, а опрос сдвигает
+from_date на каждом шаге, поэтому при обычном опросе параметры и тело
+меняются каждый раз и кеш не срабатывает. Он помогает только на
+повторных запросах с тем же from_date.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+DEFAULT_MAXSIZE = 4096
+
+CachedResponse = namedtuple(
+    'CachedResponse',
+    ['params', 'etag', 'last_modified', 'digest', 'size', 'data'])
+
+
+class CacheStats:
+    """Счётчики эффективности кеша."""
+
+    __slots__ = (
+        'requests', 'not_modified', 'hash_hits', 'bytes_received',
+        'bytes_saved', 'decodes', 'decode_seconds',
+    )
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    @property
+    def decodes_skipped(self) -> int:
+        """Сколько раз json-декодирование не понадобилось."""
+        return self.not_modified + self.hash_hits
+
+    @property
+    def cpu_seconds_saved(self) -> float:
+        """Оценка сэкономленного на декодировании времени."""
+        if not self.decodes:
+            return 0.0
+        return self.decode_seconds / self.decodes * self.decodes_skipped
+
+
+class ResponseCache:
+    """LRU-кеш последнего ответа API для каждого токена."""
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._processed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+            return entry
+
+    def _put(self, token, entry):
+        with self._lock:
+            self._entries[token] = entry
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def request_headers(self, token, params: dict) -> dict:
+        """Заголовки условного запроса, если ответ на те же params есть."""
+        self.stats.requests += 1
+        entry = self._get(token)
+        headers = {}
+        if entry is None or entry.params != params:
+            return headers
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def not_modified(self, token):
+        """Ответ на 304: данные прошлого ответа."""
+        entry = self._get(token)
+        if entry is None:
+            raise KeyError(f'Нет сохранённого ответа для 304: {token}')
+        self.stats.not_modified += 1
+        self.stats.bytes_saved += entry.size
+        return entry.data
+
+    def decode(self, token, params: dict, body: bytes, headers):
+        """Разбирает тело ответа, если оно отличается от прошлого."""
+        self.stats.bytes_received += len(body)
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        entry = self._get(token)
+        if entry is not None and entry.digest == digest:
+            self.stats.hash_hits += 1
+            data = entry.data
+        else:
+            started = time.process_time()
+            data = json.loads(body)
+            self.stats.decode_seconds += time.process_time() - started
+            self.stats.decodes += 1
+        self._put(token, CachedResponse(
+            params, headers.get('ETag'), headers.get('Last-Modified'),
+            digest, len(body), data))
+        return data
+
+    def is_unchanged(self, key, data) -> bool:
+        """True, если подписчик key уже разбирал этот самый ответ data.
+
+        Такой ответ уже прошёл check_response и сравнение статусов для
+        этого подписчика, поэтому повторять их не нужно. key — пара
+        (токен, чат): ответ по общему токену разбирает каждый чат.
+        """
+        with self._lock:
+            return self._processed.get(key) is data
+
+    def mark_processed(self, key, data):
+        """Запоминает, что подписчик key разобрал ответ data."""
+        with self._lock:
+            self._processed[key] = data
+            self._processed.move_to_end(key)
+            while len(self._processed) > self.maxsize:
+                self._processed.popitem(last=False)
@@ -0,0 +1,132 @@
+"""Проверка ответа homework_statuses за один проход.
+
+Проверяются только поля, от которых зависит работа бота: homework_name и
+status (непустые строки) и date_updated (строка или null — по ней
+сравниваются записи). Остальные поля лишь подставляются в шаблоны и
+попадают в запись как есть. Результат — кортеж компактных HomeworkRecord
+вместо словарей, а при ошибках — одно исключение со списком всех
+нарушений.
+"""
+from collections import namedtuple
+
+import exceptions
+
+HomeworkRecord = namedtuple('HomeworkRecord', [
+    'id', 'homework_name', 'status', 'date_updated', 'reviewer_comment',
+    'lesson_name',
+])
+
+ValidatedResponse = namedtuple(
+    'ValidatedResponse', ['homeworks', 'current_date'])
+
+_new = tuple.__new__
+
+
+def iter_valid_homeworks(homeworks, errors, start=0):
+    """Отдаёт HomeworkRecord по одной; start — номер первой работы в
+    сообщениях об ошибках. Нарушения добавляются в errors, такие работы
+    пропускаются.
+    """
+    for index, item in enumerate(homeworks, start):
+        if type(item) is not dict:
+            errors.append(f'homeworks[{index}]: ожидался словарь, '
+                          f'получен {type(item).__name__}')
+            continue
+        get = item.get
+        name = get('homework_name')
+        status = get('status')
+        date_updated = get('date_updated')
+        if (type(name) is str and name and type(status) is str and status
+                and (date_updated is None or type(date_updated) is str)):
+            yield _new(HomeworkRecord, (
+                get('id'), name, status, date_updated,
+                get('reviewer_comment'), get('lesson_name')))
+        else:
+            _field_errors(index, item, errors)
+
+
+def validate_homeworks(homeworks, errors, start=0) -> tuple:
+    """Кортеж записей iter_valid_homeworks."""
+    return tuple(iter_valid_homeworks(homeworks, errors, start))
+
+
+def _field_errors(index, item, errors):
+    for name in ('homework_name', 'status', 'date_updated'):
+        value = item.get(name)
+        if value is None or value == '':
+            if name != 'date_updated':
+                errors.append(f'homeworks[{index}].{name}: нет значения')
+        elif type(value) is not str:
+            errors.append(f'homeworks[{index}].{name}: ожидался str, '
+                          f'получен {type(value).__name__}')
+
+
+def _check_current_date(current_date, errors):
+    if type(current_date) is not int or current_date <= 0:
+        errors.append(f'current_date: ожидалось положительное целое, '
+                      f'получено {current_date!r}')
+
+
+def validate_response(response) -> ValidatedResponse:
+    """Проверяет весь ответ API и возвращает записи о работах.
+
+    Бросает ResponseValidationError со списком всех нарушений.
+    """
+    if type(response) is not dict:
+        raise exceptions.ResponseValidationError([
+            f'ответ: ожидался словарь, получен {type(response).__name__}'])
+    errors = []
+    homeworks = response.get('homeworks')
+    current_date = response.get('current_date')
+    _check_current_date(current_date, errors)
+    records = ()
+    if homeworks is None:
+        errors.append('homeworks: нет ключа')
+    elif type(homeworks) is not list:
+        errors.append(f'homeworks: ожидался список, '
+                      f'получен {type(homeworks).__name__}')
+    else:
+        records = validate_homeworks(homeworks, errors)
+    if errors:
+        raise exceptions.ResponseValidationError(errors)
+    return ValidatedResponse(records, current_date)
+
+
+class ValidatedStream:
+    """Проверка ответа, который разбирается потоком (json_stream).
+
+    Итерация отдаёт HomeworkRecord по мере чтения тела; после неё
+    заполняется current_date. Нарушения копятся и в конце итерации
+    бросаются одним ResponseValidationError.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.current_date = None
+
+    def __iter__(self):
+        errors = []
+        yield from iter_valid_homeworks(self.stream, errors)
+        self.current_date = finish_stream(self.stream, errors)
+
+
+def finish_stream(stream, errors) -> int:
+    """Проверки ответа, разобранного потоком, после чтения всех работ.
+
+    stream — json_stream.HomeworkStream или HomeworkStreamParser, errors —
+    нарушения, найденные в работах. Возвращает current_date или бросает
+    ResponseValidationError со всеми нарушениями.
+    """
+    fields = stream.fields
+    current_date = fields.get('current_date')
+    _check_current_date(current_date, errors)
+    if not stream.found:
+        homeworks = fields.get('homeworks')
+        if homeworks is None:
+            errors.append('homeworks: нет ключа')
+        else:
+            errors.append(f'homeworks: ожидался список, '
+                          f'получен {type(homeworks).__name__}')
+    if errors:
+        raise exceptions.ResponseValidationError(errors)
+    return current_date
@@ -0,0 +1,260 @@
+"""Распределение подписчиков между несколькими процессами-воркерами.
+
+Подписка достаётся воркеру по консистентному хешированию токена: у
+каждого воркера replicas точек на кольце, подписка принадлежит ближайшей
+точке по часовой стрелке. При добавлении воркера переезжает примерно 1/N
+подписок, и только на новый воркер.
+
+Кольцо лишь предлагает владельца. Опрашивать подписку воркер может, только
+пока держит её аренду в общем хранилище состояния (state_store): во время
+перезапуска с другим WORKER_COUNT старый и новый воркеры могут считать
+подписку своей, но аренду получит только один. Аренда продлевается
+фоновым потоком; перед продлением несохранённое состояние сбрасывается на
+диск, чтобы новый владелец прочитал его актуальным.
+
+Хранилище состояния — локальный файл SQLite, поэтому все воркеры должны
+работать на одной машине (launcher.py workers N). Несколько дайно Heroku
+не видят файлов друг друга, и такой запуск отклоняется.
+"""
+import bisect
+import hashlib
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+RING_REPLICAS = 128
+LEASE_TTL = 60
+# Доля срока аренды, в течение которой воркер считает её своей: запас на
+# задержку продления.
+LEASE_SAFETY = 0.8
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def subscription_key(subscription) -> str:
+    # Подписки одного токена достаются одному воркеру: их опросы
+    # объединяются в один запрос к API.
+    return subscription.token
+
+
+def worker_name(worker_id: int) -> str:
+    return f'worker-{worker_id}'
+
+
+class HashRing:
+    """Кольцо консистентного хеширования."""
+
+    def __init__(self, nodes, replicas: int = RING_REPLICAS):
+        points = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in nodes for replica in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key: str):
+        """Узел, которому принадлежит ключ."""
+        position = bisect.bisect(self._hashes, _hash(key))
+        return self._nodes[position % len(self._nodes)]
+
+
+class ShardedRegistry:
+    """Подписки реестра, которые кольцо отдаёт узлу node.
+
+    Повторяет интерфейс tenants.SubscriptionRegistry для чтения.
+    """
+
+    def __init__(self, registry, ring: HashRing, node):
+        self.registry = registry
+        self.ring = ring
+        self.node = node
+        self._owned = {}
+
+    def owns(self, subscription) -> bool:
+        owned = self._owned.get(subscription)
+        if owned is None:
+            owned = self._owned[subscription] = (
+                self.ring.node(subscription_key(subscription)) == self.node)
+        return owned
+
+    def policy(self, subscription):
+        return self.registry.policy(subscription)
+
+    def locale(self, subscription):
+        return self.registry.locale(subscription)
+
+    def channels(self, subscription):
+        return self.registry.channels(subscription)
+
+    def by_token(self, token: str) -> list:
+        return [sub for sub in self.registry.by_token(token) if self.owns(sub)]
+
+    def __contains__(self, subscription):
+        return subscription in self.registry and self.owns(subscription)
+
+    def __iter__(self):
+        return (sub for sub in self.registry if self.owns(sub))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class LeaseKeeper:
+    """Держит аренду подписок своего шарда в хранилище состояния."""
+
+    def __init__(self, store, owner: str, registry, ttl: float = LEASE_TTL,
+                 clock=time.time):
+        self.store = store
+        self.owner = owner
+        self.registry = registry
+        self.ttl = ttl
+        self.clock = clock
+        self.held = set()
+        self.valid_until = 0.0
+        self._fresh = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def renew(self):
+        """Продлевает аренду своих подписок и отпускает чужие."""
+        self.store.flush()
+        wanted = {tuple(sub): sub for sub in self.registry}
+        now = self.clock()
+        acquired = self.store.acquire_leases(
+            self.owner, wanted, now + self.ttl, now)
+        extra = acquired - wanted.keys()
+        if extra:
+            self.store.release_leases(self.owner, extra)
+        held = {wanted[key] for key in acquired if key in wanted}
+        with self._lock:
+            self._fresh |= held - self.held
+            self._fresh &= held
+            lost = len(self.held - held)
+            self.held = held
+            self.valid_until = now + self.ttl * LEASE_SAFETY
+        if lost or len(held) < len(wanted):
+            logger.info(
+                f'{self.owner}: аренда {len(held)} из {len(wanted)} '
+                f'подписок, потеряно {lost}')
+
+    def holds(self, subscription) -> bool:
+        """Держит ли воркер аренду подписки прямо сейчас."""
+        return subscription in self.held and self.clock() < self.valid_until
+
+    def claim(self, subscription, poller) -> bool:
+        """Можно ли опрашивать подписку. Для только что полученной аренды
+        состояние перечитывается из хранилища: его вёл другой воркер.
+        """
+        if not self.holds(subscription):
+            return False
+        with self._lock:
+            fresh = subscription in self._fresh
+            self._fresh.discard(subscription)
+        if fresh:
+            poller.reload(subscription)
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(self.ttl / 3):
+            try:
+                self.renew()
+            except Exception as error:
+                logger.error(f'{self.owner}: не удалось продлить аренду: '
+                             f'{error}')
+
+    def start(self):
+        """Берёт аренду и продлевает её в фоновом потоке."""
+        self.renew()
+        self._thread = threading.Thread(
+            target=self._run, name='leases', daemon=True)
+        self._thread.start()
+        return self
+
+    def release(self):
+        """Сохраняет состояние и отпускает всю аренду."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.store.flush()
+        self.store.release_leases(self.owner)
+        with self._lock:
+            self.held = set()
+
+
+def worker_id_from_env(environ=os.environ) -> int:
+    """Номер воркера из WORKER_ID (его задаёт spawn_workers), по умолчанию 0.
+
+    environ — словарь настроек, например homework.config.
+    """
+    return int(environ.get('WORKER_ID') or 0)
+
+
+def single_host_error(environ, worker_count: int):
+    """Почему нельзя запустить worker_count воркеров, или None.
+
+    Аренда хранится в локальном файле STATE_DB, так что воркеры делят её,
+    только работая на одной машине: дайно Heroku (DYNO) этот файл не общий.
+    Воркеры spawn_workers (у них задан WORKER_ID) работают на одной
+    машине, в том числе внутри одного дайно.
+    """
+    if worker_count <= 1:
+        return None
+    if not environ.get('STATE_DB', 'state.db'):
+        return 'Воркерам нужно общее хранилище состояния STATE_DB'
+    if environ.get('DYNO') and not environ.get('WORKER_ID'):
+        return (
+            'STATE_DB — локальный файл SQLite, дайно его не делят: '
+            'запускайте воркеров на одной машине (launcher.py workers N) '
+            'и оставьте WORKER_COUNT=1 на дайно')
+    return None
+
+
+def shard(registry, store, worker_id: int, worker_count: int,
+          ttl: float = LEASE_TTL):
+    """Шард реестра для воркера и хранитель его аренды."""
+    ring = HashRing(worker_name(number) for number in range(worker_count))
+    node = worker_name(worker_id)
+    sharded = ShardedRegistry(registry, ring, node)
+    owner = f'{node}@{socket.gethostname()}:{os.getpid()}'
+    return sharded, LeaseKeeper(store, owner, sharded, ttl)
+
+
+def spawn_workers(count: int, argv=None, environ=os.environ):
+    """Запускает count воркеров на этой машине и ждёт их завершения.
+
+    Воркеры получают окружение environ (настройки бота).
+    """
+    argv = argv or [sys.executable, os.path.abspath(sys.argv[0])]
+    # SIGTERM родителю должен остановить и воркеров (блок finally ниже),
+    # SIGHUP передаётся им как есть.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    workers = [
+        subprocess.Popen(argv, env=dict(
+            environ, WORKER_ID=str(number), WORKER_COUNT=str(count)))
+        for number in range(count)
+    ]
+
+    def reload(*args):
+        for worker in workers:
+            worker.send_signal(signal.SIGHUP)
+
+    signal.signal(signal.SIGHUP, reload)
+    try:
+        for worker in workers:
+            worker.wait()
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in workers:
+            worker.wait()
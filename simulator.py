@@ -0,0 +1,495 @@
+"""Локальные заглушки API Практикума и Telegram Bot API для нагрузки.
+
+PracticumSimulator отдаёт homework_statuses: у каждого токена свои работы,
+которые меняют статус в случайные моменты (экспоненциальные интервалы со
+средним transition_interval). Задержка ответа логнормальная, часть
+ответов — 500, зависание дольше таймаута клиента или битый JSON.
+
+TelegramSimulator принимает sendMessage и getMe, умеет отвечать 429 и 500.
+По времени получения сообщения и моменту смены статуса считается задержка
+уведомления. WebhookSimulator и SmtpSimulator принимают уведомления
+каналов webhook и email из notifiers.py.
+
+Запуск отдельно: python simulator.py --api-port 8081 --telegram-port 8082,
+затем PRACTICUM_ENDPOINT=http://127.0.0.1:8081/ и
+TELEGRAM_API_URL=http://127.0.0.1:8082/bot для бота.
+"""
+import argparse
+import bisect
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+TRANSITIONS = {
+    'reviewing': ('approved', 'rejected'),
+    'rejected': ('reviewing',),
+    'approved': ('reviewing',),
+}
+NAME_PATTERN = re.compile(r'работы "([^"]+)"')
+
+
+class Latency:
+    """Логнормальная задержка с медианой median и разбросом sigma."""
+
+    def __init__(self, median: float = 0.0, sigma: float = 0.5):
+        self.median = median
+        self.sigma = sigma
+
+    def sample(self, rand: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(self.sigma * rand.gauss(0, 1))
+
+
+def percentile(values, share: float) -> float:
+    """Перцентиль по отсортированному списку."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+class _Homework:
+
+    __slots__ = ('id', 'name', 'status', 'updated', 'next_change', 'served')
+
+    def __init__(self, id, name, status, updated, next_change):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.updated = updated
+        self.next_change = next_change
+        # Начальную историю считаем уже известной боту.
+        self.served = True
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'homework_name': self.name,
+            'status': self.status,
+            'date_updated': datetime.fromtimestamp(
+                self.updated, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'lesson_name': 'Симуляция',
+        }
+
+
+class _QuietServer(ThreadingHTTPServer):
+    """Не печатает обрывы соединений: клиент ушёл по таймауту или умер."""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Server:
+    """Общая часть: HTTP-сервер в фоновом потоке."""
+
+    def _handler(self):
+        raise NotImplementedError
+
+    def start(self, port: int = 0, host: str = '127.0.0.1'):
+        self.server = _QuietServer((host, port), self._handler())
+        self.port = self.server.server_port
+        threading.Thread(
+            target=self.server.serve_forever, name=type(self).__name__,
+            daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class PracticumSimulator(_Server):
+    """Заглушка API Практикума с меняющимися статусами и сбоями."""
+
+    def __init__(self, homeworks_per_token: int = 3,
+                 transition_interval: float = 60.0, latency=None,
+                 error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 malformed_rate: float = 0.0, hang: float = 11.0,
+                 invalid_tokens=(), seed=None, clock=time.time):
+        self.homeworks_per_token = homeworks_per_token
+        self.transition_interval = transition_interval
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.malformed_rate = malformed_rate
+        self.hang = hang
+        self.invalid_tokens = set(invalid_tokens)
+        self.clock = clock
+        self.rand = random.Random(seed)
+        self.stats = Counter()
+        self.transitions = {}
+        self._homeworks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/'
+
+    def _next_change(self, now):
+        return now + self.rand.expovariate(1 / self.transition_interval)
+
+    def _token_homeworks(self, token, now):
+        homeworks = self._homeworks.get(token)
+        if homeworks is None:
+            # Начальная история старше любого курсора бота.
+            homeworks = self._homeworks[token] = [
+                _Homework(number, f'{token}_hw{number}.zip', 'reviewing',
+                          now - 86400, self._next_change(now))
+                for number in range(self.homeworks_per_token)
+            ]
+        for homework in homeworks:
+            while homework.next_change <= now:
+                if not homework.served:
+                    # Прошлый статус так и не попал ни в один ответ.
+                    self.stats['superseded'] += 1
+                homework.served = False
+                homework.status = self.rand.choice(
+                    TRANSITIONS[homework.status])
+                homework.updated = homework.next_change
+                self.transitions.setdefault(homework.name, []).append(
+                    homework.updated)
+                self.stats['transitions'] += 1
+                homework.next_change = self._next_change(homework.updated)
+        return homeworks
+
+    def respond(self, token: str, from_date: int):
+        """Код ответа и тело для запроса; None вместо кода — зависнуть."""
+        with self._lock:
+            self.stats['requests'] += 1
+            roll = self.rand.random()
+            delay = self.latency.sample(self.rand)
+            if token in self.invalid_tokens:
+                self.stats['unauthorized'] += 1
+                return delay, 401, b'{"code": "not_authenticated"}'
+            if roll < self.error_rate:
+                self.stats['errors'] += 1
+                return delay, 500, b'{"code": "internal_error"}'
+            roll -= self.error_rate
+            if roll < self.timeout_rate:
+                self.stats['timeouts'] += 1
+                return self.hang, None, b''
+            roll -= self.timeout_rate
+            now = self.clock()
+            homeworks = []
+            for homework in self._token_homeworks(token, now):
+                if homework.updated >= from_date:
+                    homeworks.append(homework.as_dict())
+                    if roll >= self.malformed_rate and not homework.served:
+                        homework.served = True
+                        self.stats['served'] += 1
+            body = json.dumps({
+                'homeworks': homeworks, 'current_date': int(now),
+            }, ensure_ascii=False).encode()
+            if roll < self.malformed_rate:
+                self.stats['malformed'] += 1
+                return delay, 200, body[:len(body) // 2]
+            self.stats['ok'] += 1
+            return delay, 200, body
+
+    def _handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                scheme, _, token = self.headers.get(
+                    'Authorization', '').partition(' ')
+                query = parse_qs(url.query)
+                try:
+                    from_date = int(query.get('from_date', ['0'])[0])
+                except ValueError:
+                    from_date = 0
+                if scheme != 'OAuth' or not token:
+                    delay, status, body = 0, 401, b'{}'
+                else:
+                    delay, status, body = simulator.respond(token, from_date)
+                if delay:
+                    time.sleep(delay)
+                if status is None:
+                    self.close_connection = True
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class TelegramSimulator(_Server):
+    """Заглушка Telegram Bot API: getMe и sendMessage."""
+
+    def __init__(self, latency=None, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: int = 1,
+                 seed=None, clock=time.time):
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.clock = clock
+        self.rand = random.Random(seed)
+        self.stats = Counter()
+        self.messages = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        """base_url для telegram.Bot."""
+        return f'http://127.0.0.1:{self.port}/bot'
+
+    def respond(self, method: str, data: dict):
+        """Задержка, код ответа и тело для вызова метода Bot API."""
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency.sample(self.rand)
+            if method == 'getMe':
+                return delay, 200, {'ok': True, 'result': {
+                    'id': 1, 'is_bot': True, 'first_name': 'simulator',
+                    'username': 'simulator_bot'}}
+            if method != 'sendMessage':
+                return delay, 404, {'ok': False, 'error_code': 404,
+                                    'description': 'Not Found'}
+            roll = self.rand.random()
+            if roll < self.error_rate:
+                self.stats['errors'] += 1
+                return delay, 500, {'ok': False, 'error_code': 500,
+                                    'description': 'Internal Server Error'}
+            if roll - self.error_rate < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return delay, 429, {
+                    'ok': False, 'error_code': 429,
+                    'description': 'Too Many Requests',
+                    'parameters': {'retry_after': self.retry_after}}
+            self.stats['messages'] += 1
+            chat_id = data.get('chat_id')
+            if isinstance(chat_id, str) and chat_id.lstrip('-').isdigit():
+                chat_id = int(chat_id)
+            self.messages.append((self.clock(), chat_id, data.get('text')))
+            message_id = len(self.messages)
+        return delay, 200, {'ok': True, 'result': {
+            'message_id': message_id, 'date': int(self.clock()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': data.get('text')}}
+
+    def notification_latencies(self, transitions: dict) -> list:
+        """Отсортированные задержки от смены статуса до сообщения.
+
+        transitions — {название работы: [моменты смены статуса]}. Сообщение
+        относится к последней смене перед ним, каждая смена учитывается
+        один раз.
+        """
+        with self._lock:
+            messages = list(self.messages)
+        latencies = []
+        seen = set()
+        for received, _, text in messages:
+            for name in NAME_PATTERN.findall(text or ''):
+                times = transitions.get(name, ())
+                position = bisect.bisect_right(times, received)
+                if not position or (name, position) in seen:
+                    continue
+                seen.add((name, position))
+                bisect.insort(latencies, received - times[position - 1])
+        return latencies
+
+    def _handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                method = self.path.rstrip('/').rsplit('/', 1)[-1]
+                length = int(self.headers.get('Content-Length', 0))
+                raw = self.rfile.read(length).decode()
+                if 'json' in self.headers.get('Content-Type', ''):
+                    data = json.loads(raw or '{}')
+                else:
+                    data = {
+                        key: values[0]
+                        for key, values in parse_qs(raw).items()
+                    }
+                delay, status, payload = simulator.respond(method, data)
+                if delay:
+                    time.sleep(delay)
+                body = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class WebhookSimulator(_Server):
+    """Приёмник HTTP-вебхуков канала уведомлений: записывает тела POST."""
+
+    def __init__(self, latency=None, error_rate: float = 0.0, seed=None):
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.rand = random.Random(seed)
+        self.stats = Counter()
+        self.messages = []
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}/notify'
+
+    def _handler(self):
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = self.rfile.read(length)
+                with simulator._lock:
+                    simulator.stats['requests'] += 1
+                    delay = simulator.latency.sample(simulator.rand)
+                    failed = simulator.rand.random() < simulator.error_rate
+                    if failed:
+                        simulator.stats['errors'] += 1
+                    else:
+                        simulator.messages.append(json.loads(body))
+                if delay:
+                    time.sleep(delay)
+                self.send_response(500 if failed else 204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class _SmtpHandler(StreamRequestHandler):
+    """Сессия SMTP: по методу smtp_* на команду; письма уходят в
+    simulator.messages.
+    """
+
+    simulator = None
+
+    def reply(self, line: str):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 simulator ESMTP')
+        self.sender, self.recipients = None, []
+        for raw in self.rfile:
+            command = raw.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            self.commands.get(verb, _SmtpHandler.smtp_noop)(self, command)
+
+    def smtp_helo(self, command):
+        self.reply('250 simulator')
+
+    def smtp_mail(self, command):
+        self.sender, self.recipients = command[10:].strip('<>'), []
+        self.reply('250 OK')
+
+    def smtp_rcpt(self, command):
+        self.recipients.append(command[8:].strip('<>'))
+        self.reply('250 OK')
+
+    def smtp_data(self, command):
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        lines = []
+        for line in self.rfile:
+            if line in (b'.\r\n', b'.\n'):
+                break
+            lines.append(line.decode('utf-8', 'replace'))
+        with self.simulator._lock:
+            self.simulator.messages.append(
+                (self.sender, self.recipients, ''.join(lines)))
+        self.reply('250 OK')
+
+    def smtp_noop(self, command):
+        self.reply('250 OK')
+
+    commands = {
+        'HELO': smtp_helo, 'EHLO': smtp_helo, 'MAIL': smtp_mail,
+        'RCPT': smtp_rcpt, 'DATA': smtp_data,
+    }
+
+
+class SmtpSimulator(_Server):
+    """Заглушка SMTP-сервера: принимает письма и хранит их в messages
+    как (отправитель, [получатели], текст письма).
+    """
+
+    def __init__(self):
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def _handler(self):
+        return type('Handler', (_SmtpHandler,), {'simulator': self})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--telegram-port', type=int, default=8082)
+    parser.add_argument('--homeworks', type=int, default=3)
+    parser.add_argument('--transition-interval', type=float, default=60.0)
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='медиана задержки API, с')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--malformed-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    api = PracticumSimulator(
+        args.homeworks, args.transition_interval, Latency(args.latency),
+        args.error_rate, args.timeout_rate, args.malformed_rate,
+    ).start(args.api_port)
+    bot_api = TelegramSimulator(
+        Latency(args.telegram_latency), args.telegram_error_rate,
+    ).start(args.telegram_port)
+    print(f'PRACTICUM_ENDPOINT={api.url}')
+    print(f'TELEGRAM_API_URL={bot_api.url}')
+    try:
+        while True:
+            time.sleep(10)
+            print(f'api: {dict(api.stats)}, telegram: {dict(bot_api.stats)}')
+    except KeyboardInterrupt:
+        pass
+    api.stop()
+    bot_api.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""Хранилище курсора и последнего статуса подписчиков между перезапусками.
+
+Там же хранится аренда подписчиков воркерами (см. sharding.py): запись
+(подписчик, владелец, срок). Чужую аренду можно перехватить только после
+истечения срока, поэтому один чат опрашивает один воркер.
+"""
+import sqlite3
+import threading
+import time
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+class MemoryStateStore:
+    """Хранилище в памяти процесса, для тестов и разовых запусков."""
+
+    def __init__(self):
+        self._records = {}
+        self._leases = {}
+
+    def load_all(self) -> dict:
+        """Возвращает {(токен, чат): (курсор, статус)} для всех подписчиков."""
+        return dict(self._records)
+
+    def get(self, key):
+        """Запись подписчика или None."""
+        return self._records.get(tuple(key))
+
+    def put(self, key, cursor: int, status):
+        """Сохраняет курсор и статус подписчика."""
+        self._records[tuple(key)] = (cursor, status)
+
+    def acquire_leases(self, owner: str, keys, expires_at: float,
+                       now: float) -> set:
+        """Берёт или продлевает аренду keys до expires_at, возвращает все
+        подписки, которые сейчас арендует owner.
+        """
+        leases = self._leases
+        for key in keys:
+            key = tuple(key)
+            current = leases.get(key)
+            if current is None or current[0] == owner or current[1] <= now:
+                leases[key] = (owner, expires_at)
+        return {
+            key for key, (holder, until) in leases.items()
+            if holder == owner and until > now
+        }
+
+    def release_leases(self, owner: str, keys=None):
+        """Отпускает аренду owner: перечисленные подписки или все."""
+        leases = self._leases
+        if keys is None:
+            keys = list(leases)
+        for key in keys:
+            key = tuple(key)
+            if leases.get(key, (None,))[0] == owner:
+                del leases[key]
+
+    def flush(self):
+        """Записывать нечего: всё уже в памяти."""
+
+    def close(self):
+        """Закрывать нечего."""
+
+
+class SQLiteStateStore:
+    """Хранилище в SQLite в режиме WAL с пакетной записью.
+
+    put() только копит изменения в памяти; на диск они уходят одной
+    транзакцией, когда набралось batch_size записей или прошло
+    flush_interval секунд с прошлого сброса, а также при flush()/close().
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        # У chat_id нет типа колонки, чтобы int и str читались как записаны.
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS tenant_state ('
+            'token TEXT NOT NULL, chat_id NOT NULL, '
+            'cursor INTEGER NOT NULL, status TEXT, '
+            'PRIMARY KEY (token, chat_id)) WITHOUT ROWID'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS tenant_lease ('
+            'token TEXT NOT NULL, chat_id NOT NULL, '
+            'owner TEXT NOT NULL, expires_at REAL NOT NULL, '
+            'PRIMARY KEY (token, chat_id)) WITHOUT ROWID'
+        )
+        self._connection.commit()
+
+    def load_all(self) -> dict:
+        """Читает состояние всех подписчиков одним запросом."""
+        self.flush()
+        with self._db_lock:
+            rows = self._connection.execute(
+                'SELECT token, chat_id, cursor, status FROM tenant_state'
+            ).fetchall()
+        return {
+            (token, chat_id): (cursor, status)
+            for token, chat_id, cursor, status in rows
+        }
+
+    def get(self, key):
+        """Запись подписчика с учётом ещё не сброшенных изменений."""
+        key = tuple(key)
+        with self._lock:
+            if key in self._pending:
+                return self._pending[key]
+        with self._db_lock:
+            row = self._connection.execute(
+                'SELECT cursor, status FROM tenant_state '
+                'WHERE token = ? AND chat_id = ?', key).fetchone()
+        return tuple(row) if row else None
+
+    def put(self, key, cursor: int, status):
+        """Откладывает запись до ближайшего пакетного сброса."""
+        with self._lock:
+            self._pending[tuple(key)] = (cursor, status)
+            due = (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        with self._db_lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO tenant_state (token, chat_id, cursor, status) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (token, chat_id) DO UPDATE SET '
+                'cursor = excluded.cursor, status = excluded.status',
+                [key + value for key, value in pending.items()])
+
+    def acquire_leases(self, owner: str, keys, expires_at: float,
+                       now: float) -> set:
+        """Берёт или продлевает аренду keys одной транзакцией.
+
+        Возвращает все подписки, которые сейчас арендует owner.
+        """
+        with self._db_lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO tenant_lease (token, chat_id, owner, expires_at) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (token, chat_id) DO UPDATE SET '
+                'owner = excluded.owner, expires_at = excluded.expires_at '
+                'WHERE tenant_lease.owner = excluded.owner '
+                'OR tenant_lease.expires_at <= ?',
+                [tuple(key) + (owner, expires_at, now) for key in keys])
+            rows = self._connection.execute(
+                'SELECT token, chat_id FROM tenant_lease '
+                'WHERE owner = ? AND expires_at > ?', (owner, now)).fetchall()
+        return {tuple(row) for row in rows}
+
+    def release_leases(self, owner: str, keys=None):
+        """Отпускает аренду owner: перечисленные подписки или все."""
+        with self._db_lock, self._connection:
+            if keys is None:
+                self._connection.execute(
+                    'DELETE FROM tenant_lease WHERE owner = ?', (owner,))
+                return
+            self._connection.executemany(
+                'DELETE FROM tenant_lease '
+                'WHERE token = ? AND chat_id = ? AND owner = ?',
+                [tuple(key) + (owner,) for key in keys])
+
+    def close(self):
+        """Сбрасывает изменения и закрывает базу."""
+        self.flush()
+        with self._db_lock:
+            self._connection.close()
+
+
+def open_store(path=None):
+    """SQLite-хранилище по пути path или хранилище в памяти, если пути нет."""
+    if not path:
+        return MemoryStateStore()
+    return SQLiteStateStore(path)
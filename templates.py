@@ -0,0 +1,189 @@
+"""Тексты уведомлений о статусах на нескольких языках.
+
+Каталог языка — шаблон сообщения message с полем {verdict}, тексты
+статусов statuses и шаблон fallback для статусов, которых нет в
+statuses (None — такой статус считается ошибкой, как в parse_status).
+В шаблонах доступны поля HomeworkRecord: {homework_name}, {status},
+{lesson_name} и другие.
+
+При загрузке каталога вердикт подставляется в message, а поля шаблона
+переписываются в номера полей записи ({0} вместо {homework_name}), так
+что отправка сообщения — один вызов str.format(*record).
+renderer(locale) выбирает шаблоны языка один раз на всю пачку работ.
+
+Каталоги можно переопределить JSON-файлом (HOMEWORK_STATUSES_FILE):
+{язык: {message, statuses, fallback}} поверх встроенных, или прежний
+плоский {статус: текст} для русских текстов.
+"""
+import json
+import logging
+import string
+
+import homework
+import schema
+
+logger = logging.getLogger(__name__)
+
+FIELDS = {name: index for index, name
+          in enumerate(schema.HomeworkRecord._fields)}
+
+
+def configure(environ=None):
+    """Читает настройки модуля из environ, по умолчанию homework.config."""
+    global DEFAULT_LOCALE
+    environ = homework.config if environ is None else environ
+    DEFAULT_LOCALE = environ.get('DEFAULT_LOCALE', 'ru')
+
+
+configure()
+
+LOCALES = {
+    'ru': {
+        'message': 'Изменился статус проверки работы "{homework_name}". '
+                   '{verdict}',
+        'statuses': dict(homework.HOMEWORK_STATUSES),
+        'fallback': 'Изменился статус проверки работы "{homework_name}": '
+                    '{status}.',
+    },
+    'en': {
+        'message': 'Homework "{homework_name}" review status changed. '
+                   '{verdict}',
+        'statuses': {
+            'approved': 'Reviewed: the reviewer liked everything. Hooray!',
+            'reviewing': 'The reviewer has started reviewing it.',
+            'rejected': 'Reviewed: the reviewer left some comments.',
+        },
+        'fallback': 'Homework "{homework_name}" review status changed: '
+                    '{status}.',
+    },
+}
+
+
+def compile_template(text: str, **constants) -> str:
+    """Шаблон -> строка формата для format(*record).
+
+    Поля из constants подставляются сразу, остальные должны быть полями
+    HomeworkRecord и заменяются их номерами; ошибка в шаблоне видна при
+    загрузке, а не при отправке.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        parts.append(_escape(literal))
+        if field is None:
+            continue
+        if field in constants:
+            parts.append(_escape(format(constants[field], spec)))
+            continue
+        if field not in FIELDS:
+            raise ValueError(
+                f'Неизвестное поле {{{field}}} в шаблоне {text!r}')
+        conversion = f'!{conversion}' if conversion else ''
+        spec = f':{spec}' if spec else ''
+        parts.append(f'{{{FIELDS[field]}{conversion}{spec}}}')
+    return ''.join(parts)
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+class Catalog:
+    """Скомпилированные шаблоны всех языков."""
+
+    def __init__(self, locales, default: str = None):
+        if default is None:
+            default = DEFAULT_LOCALE
+        if default not in locales:
+            raise ValueError(f'Нет каталога языка по умолчанию {default}')
+        self.default = default
+        self._tables = {}
+        for locale, spec in locales.items():
+            templates = {
+                status: compile_template(spec['message'], verdict=verdict)
+                for status, verdict in spec['statuses'].items()
+            }
+            fallback = spec.get('fallback')
+            if fallback is not None:
+                fallback = compile_template(fallback)
+            self._tables[locale] = (templates, fallback)
+        self._reported = set()
+
+    @property
+    def locales(self):
+        return list(self._tables)
+
+    def renderer(self, locale=None):
+        """Функция record -> текст уведомления на языке locale.
+
+        Статус без шаблона и без fallback вызывает KeyError.
+        """
+        templates, fallback = self._tables.get(
+            locale, self._tables[self.default])
+        get = templates.get
+
+        def missing(status):
+            if fallback is None:
+                raise KeyError(f'Нет шаблона для статуса {status}')
+            if status not in self._reported:
+                self._reported.add(status)
+                logger.warning(f'Неизвестный статус {status}, отправлен '
+                               'текст по умолчанию')
+            return fallback
+
+        def render(record):
+            return (get(record.status)
+                    or missing(record.status)).format(*record)
+
+        return render
+
+    def render(self, record, locale=None) -> str:
+        return self.renderer(locale)(record)
+
+
+def merge_locales(overrides=None) -> dict:
+    """Встроенные каталоги с переопределениями из overrides поверх."""
+    locales = {
+        locale: dict(spec, statuses=dict(spec['statuses']))
+        for locale, spec in LOCALES.items()
+    }
+    for locale, spec in (overrides or {}).items():
+        merged = locales.setdefault(locale, {'statuses': {}})
+        merged.update(
+            (key, value) for key, value in spec.items() if key != 'statuses')
+        merged['statuses'].update(spec.get('statuses', {}))
+        if 'message' not in merged:
+            raise ValueError(f'У языка {locale} нет шаблона message')
+    return locales
+
+
+def read_overrides(path: str) -> dict:
+    """Читает файл шаблонов; плоский {статус: текст} — русские тексты."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not data or not isinstance(data, dict):
+        raise ValueError(f'В файле {path} ожидался непустой JSON-объект')
+    if all(isinstance(text, str) for text in data.values()):
+        return {'ru': {'statuses': data}}
+    if not all(isinstance(spec, dict) for spec in data.values()):
+        raise ValueError(f'В файле {path} ожидалось {{статус: текст}} '
+                         'или {язык: {...}}')
+    return data
+
+
+catalog = Catalog(merge_locales())
+
+
+def load(path=None):
+    """Пересобирает каталог, при path — с шаблонами из файла.
+
+    Каталог заменяется целиком и только если все шаблоны собрались.
+    Русские тексты статусов попадают и в homework.HOMEWORK_STATUSES,
+    которым пользуется parse_status.
+    """
+    global catalog
+    locales = merge_locales(read_overrides(path) if path else None)
+    catalog = Catalog(locales)
+    homework.HOMEWORK_STATUSES.clear()
+    homework.HOMEWORK_STATUSES.update(locales['ru']['statuses'])
+    logger.info(f'Шаблоны сообщений загружены: {", ".join(catalog.locales)}')
+    return catalog
@@ -0,0 +1,520 @@
+"""Опрос API Практикума для множества подписчиков в одном процессе."""
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections import namedtuple
+
+import adaptive
+import exceptions
+import homework
+import homework_diff
+import metrics
+import notifiers
+import outbox
+import profiling
+import schema
+import state_store
+import templates
+
+logger = logging.getLogger(__name__)
+
+Subscription = namedtuple('Subscription', ['token', 'chat_id'])
+
+
+class TenantState:
+    """Курсор, отпечатки отправленных статусов и интервал опроса."""
+
+    __slots__ = (
+        'cursor', 'fingerprints', 'interval', 'reviewing', 'last_error')
+
+    def __init__(self, cursor: int, status=None):
+        self.cursor = cursor
+        self.fingerprints = homework_diff.loads(status)
+        self.interval = None
+        self.reviewing = set()
+        self.last_error = None
+
+    @property
+    def status(self) -> str:
+        """Отпечатки в виде строки для хранилища состояния."""
+        return homework_diff.dumps(self.fingerprints)
+
+
+class SubscriptionRegistry:
+    """Реестр пар (токен Практикума, чат телеграма)."""
+
+    def __init__(self, subscriptions=()):
+        self._subscriptions = {}
+        self._by_token = {}
+        self._locales = {}
+        self._channels = {}
+        for subscription in subscriptions:
+            self.add(*subscription)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """Загружает подписки из JSON-файла вида [{token, chat_id}, ...].
+
+        Необязательный ключ policy задаёт границы интервала опроса
+        подписчика, см. adaptive.PollPolicy, locale — язык уведомлений,
+        см. templates.py, а sinks — каналы доставки, см. notifiers.py.
+        """
+        with open(path, encoding='utf-8') as file:
+            items = json.load(file)
+        registry = cls()
+        for item in items:
+            policy = item.get('policy')
+            if policy is not None:
+                policy = adaptive.policy_from_dict(policy)
+            channels = notifiers.parse_channels(
+                item.get('sinks'), item['chat_id'])
+            registry.add(item['token'], item['chat_id'], policy,
+                         item.get('locale'), channels)
+        return registry
+
+    def add(self, token: str, chat_id, policy=None, locale=None,
+            channels=None):
+        """Добавляет подписку или обновляет её настройки: политику опроса,
+        язык и каналы уведомлений.
+        """
+        subscription = Subscription(token, chat_id)
+        self._subscriptions[subscription] = policy
+        for settings, value in ((self._locales, locale),
+                                (self._channels, channels)):
+            if value is None:
+                settings.pop(subscription, None)
+            else:
+                settings[subscription] = value
+        self._by_token.setdefault(token, {})[subscription] = None
+        return subscription
+
+    def replace(self, other):
+        """Заменяет подписки на подписки реестра other на месте: ссылки
+        на этот реестр у планировщика и шардов остаются в силе.
+        """
+        self._subscriptions = dict(other._subscriptions)
+        self._by_token = {
+            token: dict(same_token)
+            for token, same_token in other._by_token.items()
+        }
+        self._locales = dict(other._locales)
+        self._channels = dict(other._channels)
+
+    def policy(self, subscription) -> adaptive.PollPolicy:
+        """Политика опроса подписчика."""
+        return self._subscriptions.get(subscription) or adaptive.DEFAULT_POLICY
+
+    def locale(self, subscription):
+        """Язык уведомлений подписчика, None — язык по умолчанию."""
+        return self._locales.get(subscription)
+
+    def channels(self, subscription):
+        """Каналы уведомлений подписчика, None — только его чат."""
+        return self._channels.get(subscription)
+
+    def remove(self, token: str, chat_id):
+        """Удаляет подписку, если она есть."""
+        subscription = Subscription(token, chat_id)
+        self._subscriptions.pop(subscription, None)
+        self._locales.pop(subscription, None)
+        self._channels.pop(subscription, None)
+        same_token = self._by_token.get(token, {})
+        same_token.pop(subscription, None)
+        if not same_token:
+            self._by_token.pop(token, None)
+
+    def by_token(self, token: str) -> list:
+        """Все подписки на токен Практикума."""
+        return list(self._by_token.get(token, ()))
+
+    def __contains__(self, subscription):
+        return subscription in self._subscriptions
+
+    def __iter__(self):
+        return iter(self._subscriptions)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+class TenantPoller:
+    """Один цикл опроса подписчика на функциях модуля homework."""
+
+    def __init__(self, bot, start_timestamp=None, store=None, registry=None,
+                 stream=None):
+        self.bot = bot
+        self.start_timestamp = start_timestamp
+        self.registry = registry
+        if stream is None:
+            stream = homework.STREAM_RESPONSES
+        self.stream = stream
+        if store is None:
+            store = state_store.MemoryStateStore()
+        self.store = store
+        self.states = {
+            Subscription(*key): TenantState(*record)
+            for key, record in store.load_all().items()
+        }
+
+    def state(self, subscription):
+        """Возвращает состояние подписчика, создавая его при первом опросе."""
+        state = self.states.get(subscription)
+        if state is None:
+            cursor = self.start_timestamp
+            if cursor is None:
+                cursor = int(time.time())
+            state = self.states[subscription] = TenantState(cursor)
+        return state
+
+    def reload(self, subscription):
+        """Перечитывает состояние подписчика из хранилища: до этого его
+        мог опрашивать другой воркер.
+        """
+        record = self.store.get(subscription)
+        if record is None:
+            self.states.pop(subscription, None)
+        else:
+            self.states[subscription] = TenantState(*record)
+
+    def save(self, subscription, state):
+        """Передаёт состояние подписчика в хранилище."""
+        self.store.put(subscription, state.cursor, state.status)
+
+    def failure_message(self, state, error):
+        """Текст уведомления об ошибке или None, если о такой ошибке
+        подписчику уже сообщали после последнего успешного опроса.
+        """
+        message = f'Сбой в работе программы: {error}'
+        logger.error(message)
+        kind = type(error).__name__
+        if state.last_error == kind:
+            return None
+        state.last_error = kind
+        return message
+
+    def finish(self, subscription, state, outcome: str):
+        """Пересчитывает интервал опроса и сохраняет состояние."""
+        if outcome != adaptive.ERROR:
+            state.last_error = None
+        policy = adaptive.DEFAULT_POLICY
+        if self.registry is not None:
+            policy = self.registry.policy(subscription)
+        state.interval = adaptive.next_interval(
+            policy, state.interval, outcome, bool(state.reviewing))
+        self.save(subscription, state)
+        profiling.cycle_done()
+
+    def interval(self, subscription):
+        """Интервал до следующего опроса подписчика для планировщика."""
+        state = self.states.get(subscription)
+        return None if state is None else state.interval
+
+    def process(self, subscription, state, response, advance=True):
+        """Разбирает ответ API, возвращает [(ключ, отпечаток, сообщение)]
+        для каждой изменившейся работы. advance=False не сдвигает курсор.
+
+        response — словарь из API или уже проверенный
+        schema.ValidatedResponse.
+        """
+        cache = homework.response_cache
+        key = (subscription.token, subscription.chat_id)
+        if cache is not None and cache.is_unchanged(key, response):
+            logger.debug(
+                'Ответ API не изменился с прошлого опроса',
+                extra={'tenant': subscription.chat_id, 'sampled': True})
+            return []
+        data = response
+        if not isinstance(response, schema.ValidatedResponse):
+            with profiling.stage('check_response'):
+                response = schema.validate_response(response)
+        if advance:
+            state.cursor = response.current_date
+        with profiling.stage('parse_status'):
+            changed = list(
+                self._changes(subscription, state, response.homeworks))
+        self._count_changes(subscription, len(changed), response.homeworks)
+        if cache is not None:
+            cache.mark_processed(key, data)
+        return changed
+
+    def process_stream(self, subscription, state, stream, advance=True):
+        """Как process, но для schema.ValidatedStream: изменения отдаются
+        по мере чтения ответа. Курсор сдвигается, только если ответ
+        дочитан и прошёл проверку.
+        """
+        changed = 0
+        for change in self._changes(subscription, state, stream):
+            changed += 1
+            yield change
+        if advance:
+            state.cursor = stream.current_date
+        self._count_changes(subscription, changed, 'в потоке ответа')
+
+    def notify(self, subscription, message: str, key=None):
+        """Отправляет уведомление: в каналы подписки через
+        homework.notifier или, если каналы не заданы, в её чат.
+
+        Уведомление с ключом идемпотентности key (outbox.message_key)
+        отправляется в чат через журнал homework.outbox, если он включён:
+        неотправленное останется в журнале и уйдёт позже. Так же, мимо
+        homework.notifier, уходят уведомления в каналы telegram подписки.
+        """
+        channels = None
+        if self.registry is not None:
+            channels = self.registry.channels(subscription)
+        journal = key is not None and homework.outbox is not None
+        with profiling.stage('send_message'):
+            if channels and homework.notifier is not None:
+                if journal:
+                    channels = self._journal_telegram(channels, key, message)
+                homework.notifier.send(channels, message)
+            elif journal:
+                self._journal(key, subscription.chat_id, message)
+            else:
+                homework.send_tenant_message(
+                    self.bot, subscription.chat_id, message)
+
+    def _journal(self, key, chat_id, message: str):
+        try:
+            homework.outbox.send(self.bot, key, chat_id, message)
+        except exceptions.NoTelegramError as error:
+            logger.error(f'{error}, уведомление осталось в журнале')
+
+    def _journal_telegram(self, channels, key, message: str):
+        # Журнал досылает только в Telegram, поэтому через него идут
+        # каналы telegram, а остальные возвращаются для homework.notifier.
+        others = []
+        for channel in channels:
+            if channel.kind == 'telegram':
+                self._journal(
+                    outbox.channel_key(key, channel), channel.target, message)
+            else:
+                others.append(channel)
+        return others
+
+    def renderer(self, subscription):
+        """Функция record -> текст уведомления на языке подписчика."""
+        locale = None
+        if self.registry is not None:
+            locale = self.registry.locale(subscription)
+        return templates.catalog.renderer(locale)
+
+    def _changes(self, subscription, state, homeworks):
+        # Шаблоны языка выбираются один раз на весь ответ.
+        render = self.renderer(subscription)
+        return (
+            (key, fingerprint, render(item))
+            for key, fingerprint, item in homework_diff.changes(
+                state.fingerprints, self._track_reviewing(state, homeworks))
+        )
+
+    def _track_reviewing(self, state, homeworks):
+        for item in homeworks:
+            if item.status == 'reviewing':
+                state.reviewing.add(homework_diff.homework_key(item))
+            else:
+                state.reviewing.discard(homework_diff.homework_key(item))
+            yield item
+
+    def _count_changes(self, subscription, changed: int, homeworks):
+        if not changed:
+            logger.debug(
+                'Статус %s не изменился', homeworks,
+                extra={'tenant': subscription.chat_id, 'sampled': True})
+        metrics.STATUS_CHANGES.inc(changed)
+
+    def __call__(self, subscription):
+        state = self.state(subscription)
+        outcome = adaptive.ERROR
+        metrics.POLLS.inc()
+        try:
+            if self.stream:
+                with profiling.stage('get_api_answer'):
+                    stream = homework.get_tenant_api_stream(
+                        subscription.token, state.cursor)
+                changed = self.process_stream(subscription, state, stream)
+            else:
+                with profiling.stage('get_api_answer'):
+                    response = homework.get_tenant_api_answer(
+                        subscription.token, state.cursor)
+                changed = self.process(subscription, state, response)
+            sent = 0
+            for key, fingerprint, message in changed:
+                self.notify(subscription, message, outbox.message_key(
+                    subscription, key, fingerprint))
+                state.fingerprints[key] = fingerprint
+                sent += 1
+            outcome = adaptive.CHANGED if sent else adaptive.UNCHANGED
+        except exceptions.NoTelegramError as error:
+            metrics.count_error(error)
+            logger.error(error)
+        except Exception as error:
+            metrics.count_error(error)
+            message = self.failure_message(state, error)
+            if message is not None:
+                try:
+                    self.notify(subscription, message)
+                except exceptions.NoTelegramError as send_error:
+                    logger.error(send_error)
+        self.finish(subscription, state, outcome)
+
+
+class PollScheduler:
+    """Равномерно распределяет опросы подписчиков по окну period.
+
+    Каждая подписка получает постоянное смещение внутри окна по хешу
+    токена, поэтому добавление новых подписчиков не сдвигает расписание
+    остальных. Подписки одного токена опрашиваются вместе: когда приходит
+    время одной, вместе с ней опрашиваются и остальные, чтобы их запросы
+    к API объединились (см. async_engine.SingleFlight). Если передан
+    interval(subscription), следующий опрос ставится через возвращённое
+    им число секунд (None — через period). При асинхронном опросе это
+    интервал по итогам предыдущего завершённого опроса. Пока pause()
+    возвращает положительное число секунд (например, разомкнут
+    предохранитель API), опросы не идут.
+    """
+
+    def __init__(self, registry, poll, period=homework.RETRY_TIME,
+                 clock=time.monotonic, sleep=time.sleep, interval=None,
+                 pause=None):
+        self.registry = registry
+        self.poll = poll
+        self.period = period
+        self.interval = interval
+        self.pause = pause
+        self.clock = clock
+        self.sleep = sleep
+        self._queue = []
+        # Время следующего опроса подписки; записи очереди с другим
+        # временем устарели.
+        self._due = {}
+        self._counter = itertools.count()
+
+    def offset(self, subscription) -> float:
+        """Смещение подписки внутри окна опроса."""
+        digest = hashlib.blake2b(
+            subscription.token.encode(), digest_size=4).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 32 * self.period
+
+    def sync(self, now=None):
+        """Ставит в расписание подписки, добавленные в реестр."""
+        if now is None:
+            now = self.clock()
+        window_start = now - now % self.period
+        for subscription in self.registry:
+            if subscription in self._due:
+                continue
+            due = window_start + self.offset(subscription)
+            if due < now:
+                due += self.period
+            self._schedule(subscription, due)
+
+    def _schedule(self, subscription, due):
+        self._due[subscription] = due
+        heapq.heappush(self._queue, (due, next(self._counter), subscription))
+
+    def run_pending(self, now=None) -> int:
+        """Опрашивает всех подписчиков, чьё время пришло."""
+        if now is None:
+            now = self.clock()
+        if self.pause is not None and self.pause() > 0:
+            return 0
+        polled = 0
+        while self._queue and self._queue[0][0] <= now:
+            due, _, subscription = heapq.heappop(self._queue)
+            if self._due.get(subscription) != due:
+                continue
+            if subscription not in self.registry:
+                del self._due[subscription]
+                continue
+            for peer in self._same_token(subscription):
+                self.poll(peer)
+                polled += 1
+                self._schedule(
+                    peer, self._next_due(peer, self._due[peer], now))
+        return polled
+
+    def _same_token(self, subscription):
+        """Подписка и остальные запланированные подписки её токена."""
+        peers = [subscription]
+        for peer in self.registry.by_token(subscription.token):
+            if peer != subscription and peer in self._due:
+                peers.append(peer)
+        return peers
+
+    def _next_due(self, subscription, due, now):
+        delay = None if self.interval is None else self.interval(subscription)
+        if delay is not None:
+            return now + delay
+        # Пропущенные из-за паузы окна не навёрстываем, сохраняя смещение.
+        due += self.period
+        if due <= now:
+            due += ((now - due) // self.period + 1) * self.period
+        return due
+
+    def next_due(self):
+        """Время ближайшего запланированного опроса."""
+        return self._queue[0][0] if self._queue else None
+
+    def delay(self) -> float:
+        """Сколько спать до следующего опроса."""
+        if self.pause is not None:
+            paused = self.pause()
+            if paused > 0:
+                return min(paused, self.period)
+        due = self.next_due()
+        delay = self.period if due is None else due - self.clock()
+        return max(0, min(delay, self.period))
+
+    def run_forever(self):
+        """Основной цикл планировщика."""
+        while True:
+            self.sync()
+            self.run_pending()
+            delay = self.delay()
+            if delay > 0:
+                self.sleep(delay)
+
+
+def api_pause() -> float:
+    """Сколько ещё разомкнут предохранитель API Практикума."""
+    breaker = homework.api_breaker
+    return 0.0 if breaker is None else breaker.retry_in()
+
+
+def load_registry(path: str):
+    """Читает реестр из файла, завершая работу, если подписок нет."""
+    registry = SubscriptionRegistry.from_file(path)
+    if not len(registry):
+        msg = f'В файле {path} нет ни одной подписки'
+        logger.critical(msg)
+        raise SystemExit(msg)
+    logger.info(f'Загружено подписок: {len(registry)}')
+    return registry
+
+
+def reload_registry(registry, path: str):
+    """Перечитывает файл подписок в существующий реестр.
+
+    Ошибочный или пустой файл не трогает текущие подписки.
+    """
+    fresh = SubscriptionRegistry.from_file(path)
+    if not len(fresh):
+        raise ValueError(f'В файле {path} нет ни одной подписки')
+    added = sum(1 for sub in fresh if sub not in registry)
+    removed = sum(1 for sub in registry if sub not in fresh)
+    registry.replace(fresh)
+    logger.info(f'Подписки перечитаны: всего {len(registry)}, '
+                f'добавлено {added}, удалено {removed}')
+
+
+def run(bot, path: str, store=None):
+    """Запускает опрос всех подписок из файла."""
+    registry = load_registry(path)
+    poller = TenantPoller(bot, store=store, registry=registry)
+    PollScheduler(
+        registry, poller, interval=poller.interval, pause=api_pause,
+    ).run_forever()
@@ -0,0 +1,44 @@
+import adaptive
+import tenants
+
+
+def no_jitter():
+    return 0.5
+
+
+class TestAdaptive:
+
+    def test_reviewing_polls_faster(self):
+        policy = adaptive.DEFAULT_POLICY
+        interval = adaptive.next_interval(
+            policy, 600, adaptive.UNCHANGED, reviewing=True, rand=no_jitter)
+        assert interval == policy.reviewing_interval, (
+            'Пока работа на ревью, опрашивать нужно чаще'
+        )
+
+    def test_backoff_is_bounded(self):
+        policy = adaptive.PollPolicy(max_interval=5000)
+        interval = None
+        seen = []
+        for _ in range(6):
+            interval = adaptive.next_interval(
+                policy, interval, adaptive.ERROR, False, rand=no_jitter)
+            seen.append(interval)
+        assert seen == [1200, 2400, 4800, 5000, 5000, 5000]
+
+    def test_jitter_stays_within_bounds(self):
+        policy = adaptive.PollPolicy(jitter=0.5)
+        for rand in (lambda: 0.0, lambda: 1.0):
+            interval = adaptive.next_interval(
+                policy, policy.max_interval, adaptive.UNCHANGED, False,
+                rand=rand)
+            assert policy.min_interval <= interval <= policy.max_interval
+
+    def test_policy_from_file(self, tmp_path):
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(
+            '[{"token": "a", "chat_id": 1, "policy": {"max_interval": 99}},'
+            ' {"token": "b", "chat_id": 2}]')
+        registry = tenants.SubscriptionRegistry.from_file(str(path))
+        assert registry.policy(('a', 1)).max_interval == 99
+        assert registry.policy(('b', 2)) == adaptive.DEFAULT_POLICY
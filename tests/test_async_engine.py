@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+from aiohttp import web
+
+import async_engine
+import homework
+import tenants
+from utils import FakeBot
+
+OLD = '1970-01-01T00:01:40Z'
+NEW = '1970-01-01T00:03:20Z'
+
+
+async def homework_statuses(request):
+    token = request.headers['Authorization'].split()[1]
+    if token == 'slow':
+        await asyncio.sleep(1.5)
+    return web.json_response({
+        'homeworks': [{'homework_name': token, 'status': 'approved'}],
+        'current_date': int(request.query['from_date']) + 1,
+    })
+
+
+async def run_engine(monkeypatch, registry, handler=homework_statuses,
+                     **kwargs):
+    app = web.Application()
+    app.router.add_get('/', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(homework, 'ENDPOINT', f'http://127.0.0.1:{port}/')
+    bot = FakeBot()
+    engine = async_engine.AsyncEngine(
+        registry, bot, start_timestamp=0, **kwargs)
+    started = time.monotonic()
+    try:
+        await engine.poll_all()
+        elapsed = time.monotonic() - started
+    finally:
+        await runner.cleanup()
+    return engine, bot, elapsed
+
+
+class TestAsyncEngine:
+
+    def test_slow_tenant_does_not_block_others(self, monkeypatch):
+        registry = tenants.SubscriptionRegistry(
+            [('slow', 0)] + [(f'token-{i}', i + 1) for i in range(20)])
+        engine, bot, elapsed = asyncio.run(run_engine(
+            monkeypatch, registry, concurrency=5, timeout=0.3))
+        assert elapsed < 1, (
+            'Медленный ответ API не должен задерживать остальных подписчиков'
+        )
+        statuses = [text for chat_id, text in bot.sent if chat_id != 0]
+        assert len(statuses) == 20
+        failures = [text for chat_id, text in bot.sent if chat_id == 0]
+        assert failures and failures[0].startswith(
+            'Сбой в работе программы'), (
+            'Таймаут запроса должен превращаться в сообщение об ошибке'
+        )
+        state = engine.poller.states[tenants.Subscription('token-0', 1)]
+        assert state.cursor == 1
+
+    def test_same_token_polls_share_one_request(self, monkeypatch):
+        tokens = []
+
+        async def statuses(request):
+            tokens.append(request.headers['Authorization'].split()[1])
+            await asyncio.sleep(0.1)
+            return await homework_statuses(request)
+
+        registry = tenants.SubscriptionRegistry(
+            [('shared', 1), ('shared', 2), ('shared', 3), ('other', 4)])
+        engine, bot, _ = asyncio.run(run_engine(
+            monkeypatch, registry, handler=statuses))
+        assert sorted(tokens) == ['other', 'shared'], (
+            'Одновременные опросы одного токена должны делить один запрос'
+        )
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2, 3, 4]
+
+    def test_stream_responses(self, monkeypatch):
+        notified = []
+        notify = async_engine.notify_async
+
+        async def notify_async(poller, subscription, message, key=None):
+            notified.append(message)
+            await notify(poller, subscription, message, key)
+
+        async def statuses(request):
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await response.write(
+                b'{"homeworks": [{"homework_name": "hw.zip", '
+                b'"status": "approved"},')
+            for _ in range(100):
+                if notified:
+                    break
+                await asyncio.sleep(0.01)
+            flushed_before_end.append(bool(notified))
+            await response.write(
+                b'{"homework_name": "old.zip", "status": "rejected"}], '
+                b'"current_date": 300}')
+            await response.write_eof()
+            return response
+
+        flushed_before_end = []
+        monkeypatch.setattr(async_engine, 'notify_async', notify_async)
+        monkeypatch.setattr(homework, 'STREAM_RESPONSES', True)
+        monkeypatch.setattr(homework, 'STREAM_CHUNK_SIZE', 7)
+        registry = tenants.SubscriptionRegistry([('token', 1)])
+        engine, bot, _ = asyncio.run(run_engine(
+            monkeypatch, registry, handler=statuses))
+        assert engine.poller.stream
+        assert len(bot.sent) == 2
+        assert flushed_before_end == [True], (
+            'Асинхронный движок должен отправлять изменения по мере '
+            'чтения ответа, не дожидаясь его конца'
+        )
+        state = engine.poller.states[tenants.Subscription('token', 1)]
+        assert state.cursor == 300
+
+    def test_poll_and_webhook_send_each_change_once(self):
+        class SlowBot(FakeBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                time.sleep(0.05)
+                super().send_message(chat_id, text, **kwargs)
+
+        response = {'homeworks': [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        ], 'current_date': 100}
+
+        async def fetch(token, from_date):
+            return response
+
+        async def main():
+            poller = async_engine.AsyncTenantPoller(
+                bot, None, start_timestamp=0)
+            poller.fetch = fetch
+            subscription = tenants.Subscription('token', 1)
+            await asyncio.gather(
+                poller.handle(subscription),
+                poller.push(subscription, response))
+
+        bot = SlowBot()
+        asyncio.run(main())
+        assert len(bot.sent) == 2, (
+            'Одновременные опрос и вебхук не должны дублировать уведомления'
+        )
+
+    def test_single_flight_joins_overlapping_from_date(self):
+        calls = []
+
+        async def fetch(token, from_date):
+            calls.append((token, from_date))
+            await asyncio.sleep(0.05)
+            return {'homeworks': [
+                {'homework_name': 'old', 'status': 'approved',
+                 'date_updated': OLD},
+                {'homework_name': 'new', 'status': 'approved',
+                 'date_updated': NEW},
+            ], 'current_date': 300}
+
+        async def main():
+            flights = async_engine.SingleFlight()
+            responses = await asyncio.gather(
+                flights.get('token', 50, fetch),
+                flights.get('token', 50, fetch),
+                flights.get('token', 150, fetch),
+                flights.get('token', 10, fetch))
+            return flights, responses
+
+        flights, (first, same, later, earlier) = asyncio.run(main())
+        assert calls == [('token', 50), ('token', 10)], (
+            'Запрос с более ранним from_date не может взять чужой ответ'
+        )
+        assert same is first, 'Ответ разбирается один раз на всех'
+        assert [item['homework_name'] for item in later['homeworks']] == [
+            'new'], 'Работы старше from_date опроса должны отбрасываться'
+        assert len(earlier['homeworks']) == 2
+        assert len(flights) == 0
+
+    def test_single_flight_shares_errors(self):
+        calls = []
+
+        async def fetch(token, from_date):
+            calls.append(from_date)
+            await asyncio.sleep(0.05)
+            raise ConnectionError('API недоступен')
+
+        async def main():
+            flights = async_engine.SingleFlight()
+            return await asyncio.gather(
+                flights.get('token', 1, fetch), flights.get('token', 1, fetch),
+                return_exceptions=True)
+
+        results = asyncio.run(main())
+        assert calls == [1]
+        assert all(isinstance(result, ConnectionError) for result in results)
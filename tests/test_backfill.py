@@ -0,0 +1,170 @@
+import json
+
+import homework
+import homework_diff
+import json_stream
+import schema
+import state_store
+import tenants
+from backfill import Backfill, RequestBudget, parse_since
+from utils import FakeBot, make_homework, make_record
+
+
+def streamed(response, read=None):
+    """Ответ API так, как его отдаёт homework.get_tenant_api_stream;
+    в список read попадает отметка о каждом прочитанном куске тела.
+    """
+    body = json.dumps(response).encode()
+
+    def chunks():
+        for start in range(0, len(body), 16):
+            if read is not None:
+                read.append(start)
+            yield body[start:start + 16]
+
+    return schema.ValidatedStream(json_stream.HomeworkStream(chunks()))
+
+
+class TestBackfill:
+
+    def test_budget_limits_rate_and_total(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        budget = RequestBudget(rate=2, total=5, clock=lambda: now[0],
+                               sleep=sleep)
+        assert [budget.acquire() for _ in range(6)] == [True] * 5 + [False]
+        assert now[0] == 1.5, 'После запаса ведра — 2 запроса в секунду'
+
+    def test_parse_since(self):
+        assert parse_since('86400') == 86400
+        assert parse_since('1970-01-02') == 86400
+
+    def test_replays_once_per_chat_and_token(self, monkeypatch):
+        calls = []
+
+        def fake_stream(token, timestamp):
+            calls.append((token, timestamp))
+            return streamed({
+                'homeworks': [
+                    make_homework(2, 'approved', '2022-01-03'),
+                    make_homework(1, 'approved', '2022-01-02'),
+                ],
+                'current_date': 100,
+            })
+
+        monkeypatch.setattr(homework, 'get_tenant_api_stream', fake_stream)
+        registry = tenants.SubscriptionRegistry(
+            [('token', 1), ('token', 2), ('other', 3)])
+        store = state_store.MemoryStateStore()
+        bot = FakeBot()
+        report = Backfill(bot, registry, since=10, store=store).run()
+        assert sorted(calls) == [('other', 10), ('token', 10)], (
+            'На токен нужен один запрос, даже если подписок несколько'
+        )
+        assert report.sent == 6
+        assert [text for chat, text in bot.sent if chat == 1] == [
+            homework.parse_status(make_homework(2, 'approved', '')),
+            homework.parse_status(make_homework(1, 'approved', '')),
+        ], 'История отправляется в порядке ответа API'
+        assert store.get(('token', 1))[0] == 100
+
+        report = Backfill(bot, registry, since=10, store=store).run()
+        assert report.sent == 0 and report.duplicates == 6, (
+            'Повторная догрузка не должна дублировать уведомления'
+        )
+
+    def test_output_is_streamed(self, monkeypatch):
+        read = []
+        monkeypatch.setattr(
+            homework, 'get_tenant_api_stream',
+            lambda token, timestamp: streamed({
+                'homeworks': [
+                    make_homework(i, 'approved', f'2022-01-{i:02}')
+                    for i in range(20, 0, -1)
+                ],
+                'current_date': 100,
+            }, read))
+
+        class Bot(FakeBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                super().send_message(chat_id, len(read))
+
+        bot = Bot()
+        registry = tenants.SubscriptionRegistry([('token', 1), ('token', 2)])
+        report = Backfill(bot, registry, since=0).run()
+        assert report.sent == 40
+        assert bot.sent[0][1] < len(read) / 2, (
+            'Записи нужно отправлять по мере чтения ответа, а не после него'
+        )
+
+    def test_latest_only_and_request_limit(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'get_tenant_api_stream',
+            lambda token, timestamp: streamed({
+                'homeworks': [
+                    make_homework(1, 'reviewing', '2022-01-01'),
+                    make_homework(1, 'approved', '2022-01-02'),
+                ],
+                'current_date': 100,
+            }))
+        registry = tenants.SubscriptionRegistry([('a', 1), ('b', 2)])
+        bot = FakeBot()
+        report = Backfill(
+            bot, registry, since=0, latest=True,
+            budget=RequestBudget(rate=100, total=1)).run()
+        assert report.requests == 1 and report.over_budget == 1
+        assert len(bot.sent) == 1
+        assert 'ревьюеру всё понравилось' in bot.sent[0][1]
+
+    def test_rerun_skips_multi_entry_history(self, monkeypatch):
+        history = [
+            make_homework(1, 'reviewing', '2022-01-01'),
+            make_homework(1, 'approved', '2022-01-02'),
+        ]
+        monkeypatch.setattr(
+            homework, 'get_tenant_api_stream',
+            lambda token, timestamp: streamed(
+                {'homeworks': history, 'current_date': 100}))
+        registry = tenants.SubscriptionRegistry([('token', 1)])
+        store = state_store.MemoryStateStore()
+        bot = FakeBot()
+        assert Backfill(bot, registry, since=0, store=store).run().sent == 2
+        history.reverse()
+        report = Backfill(bot, registry, since=0, store=store).run()
+        assert report.sent == 0 and report.duplicates == 2, (
+            'Повторная догрузка не должна повторять ни одну запись истории'
+        )
+        assert len(bot.sent) == 2
+
+    def test_sends_only_newer_than_stored_state(self, monkeypatch):
+        monkeypatch.setattr(
+            homework, 'get_tenant_api_stream',
+            lambda token, timestamp: streamed({
+                'homeworks': [
+                    make_homework(1, 'approved', '2022-01-03'),
+                    make_homework(1, 'rejected', '2022-01-02'),
+                    make_homework(1, 'reviewing', '2022-01-01'),
+                ],
+                'current_date': 100,
+            }))
+        registry = tenants.SubscriptionRegistry([('token', 1)])
+        store = state_store.MemoryStateStore()
+        poller = tenants.TenantPoller(None, start_timestamp=0, store=store)
+        state = poller.state(tenants.Subscription('token', 1))
+        state.fingerprints['1'] = homework_diff.fingerprint(
+            make_record(1, 'rejected', '2022-01-02'))
+        poller.save(tenants.Subscription('token', 1), state)
+        bot = FakeBot()
+        report = Backfill(bot, registry, since=0, store=store).run()
+        assert report.sent == 1
+        assert 'ревьюеру всё понравилось' in bot.sent[0][1], (
+            'Отправляется только статус новее уже полученного'
+        )
+        assert store.get(('token', 1))[1] == homework_diff.dumps(
+            {'1': homework_diff.fingerprint(make_record(
+                1, 'approved', '2022-01-03'))})
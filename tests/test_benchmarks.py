@@ -0,0 +1,108 @@
+"""Бенчмарки этапов опроса на записанном ответе API.
+
+Нужен pytest-benchmark, без него файл пропускается. Сохранить базу и
+сравнивать с ней:
+
+    pytest tests/test_benchmarks.py --benchmark-autosave
+    pytest tests/test_benchmarks.py --benchmark-compare \\
+        --benchmark-compare-fail=median:20%
+"""
+import json
+import os
+
+import pytest
+
+import homework
+import schema
+import tenants
+from response_cache import ResponseCache
+from utils import FakeBot
+
+pytest.importorskip('pytest_benchmark')
+
+PAYLOAD_PATH = os.path.join(
+    os.path.dirname(__file__), 'fixtures', 'api_response.json')
+
+
+class RecordedResponse:
+    status_code = 200
+    reason = 'OK'
+
+    def __init__(self, content):
+        self.content = content
+        self.headers = {'ETag': '"recorded"'}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class RecordedClient:
+    """Отдаёт записанный ответ API вместо сети."""
+
+    def __init__(self, content):
+        self.content = content
+
+    def get(self, url, **kwargs):
+        return RecordedResponse(self.content)
+
+
+@pytest.fixture(scope='module')
+def content():
+    with open(PAYLOAD_PATH, 'rb') as file:
+        return file.read()
+
+
+@pytest.fixture
+def payload(content):
+    return json.loads(content)
+
+
+@pytest.fixture
+def recorded_api(content, monkeypatch):
+    monkeypatch.setattr(homework, 'http_client', RecordedClient(content))
+    monkeypatch.setattr(homework, 'response_cache', None)
+    monkeypatch.setattr(homework, 'api_breaker', None)
+
+
+class TestStageBenchmarks:
+
+    @pytest.mark.benchmark(group='get_api_answer')
+    def test_get_api_answer(self, benchmark, recorded_api):
+        response = benchmark(homework.get_api_answer, 0)
+        assert len(response['homeworks']) == 40
+
+    @pytest.mark.benchmark(group='get_api_answer')
+    def test_get_api_answer_cached(self, benchmark, recorded_api,
+                                   monkeypatch):
+        monkeypatch.setattr(homework, 'response_cache', ResponseCache())
+        benchmark(homework.get_api_answer, 0)
+
+    @pytest.mark.benchmark(group='check_response')
+    def test_check_response(self, benchmark, payload):
+        assert len(benchmark(homework.check_response, payload)) == 40
+
+    @pytest.mark.benchmark(group='check_response')
+    def test_validate_response(self, benchmark, payload):
+        benchmark(schema.validate_response, payload)
+
+    @pytest.mark.benchmark(group='parse_status')
+    def test_parse_status(self, benchmark, payload):
+        homeworks = payload['homeworks']
+        messages = benchmark(
+            lambda: [homework.parse_status(item) for item in homeworks])
+        assert len(messages) == 40
+
+    @pytest.mark.benchmark(group='parse_status')
+    def test_process_changes(self, benchmark, payload, monkeypatch):
+        monkeypatch.setattr(homework, 'response_cache', None)
+        poller = tenants.TenantPoller(FakeBot())
+        subscription = tenants.Subscription('token', 1)
+        changed = benchmark(
+            lambda: poller.process(
+                subscription, tenants.TenantState(0), payload))
+        assert len(changed) == 40, 'Без отпечатков изменились все работы'
+
+    @pytest.mark.benchmark(group='send_message')
+    def test_send_message(self, benchmark, monkeypatch):
+        monkeypatch.setattr(homework, 'telegram_breaker', None)
+        benchmark(homework.send_tenant_message, FakeBot(), 1, 'Статус')
@@ -0,0 +1,80 @@
+import pytest
+
+import circuit_breaker
+import exceptions
+import tenants
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise ConnectionError('API недоступен')
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_recovers(self):
+        clock = FakeClock()
+        breaker = circuit_breaker.CircuitBreaker(
+            'API', failure_threshold=2, reset_timeout=10, clock=clock)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                breaker.call(fail)
+        assert breaker.state == circuit_breaker.OPEN
+        with pytest.raises(exceptions.CircuitOpen):
+            breaker.call(lambda: 'ok')
+        assert breaker.retry_in() == 10
+
+        clock.now = 10
+        assert breaker.state == circuit_breaker.HALF_OPEN
+        assert breaker.allow() and not breaker.allow(), (
+            'В half-open пропускается только один пробный запрос'
+        )
+        breaker.record_success()
+        assert breaker.state == circuit_breaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        clock = FakeClock()
+        breaker = circuit_breaker.CircuitBreaker(
+            'API', failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.record_failure()
+        clock.now = 5
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+        assert breaker.state == circuit_breaker.OPEN
+        assert breaker.retry_in() == 5
+
+    def test_scheduler_skips_polls_while_open(self):
+        registry = tenants.SubscriptionRegistry([('token', 1)])
+        polled = []
+        paused = [30.0]
+        scheduler = tenants.PollScheduler(
+            registry, polled.append, period=60, pause=lambda: paused[0])
+        scheduler.sync(now=0)
+        assert scheduler.run_pending(now=100) == 0
+        assert scheduler.delay() == 30
+        paused[0] = 0
+        assert scheduler.run_pending(now=100) == 1
+
+    def test_repeated_errors_are_reported_once(self, monkeypatch):
+        import homework
+
+        sent = []
+        monkeypatch.setattr(homework, 'get_tenant_api_answer',
+                            lambda token, timestamp: fail())
+        monkeypatch.setattr(homework, 'send_tenant_message',
+                            lambda bot, chat_id, text: sent.append(text))
+        poller = tenants.TenantPoller(bot=None, start_timestamp=0)
+        subscription = tenants.Subscription('token', 1)
+        for _ in range(3):
+            poller(subscription)
+        assert len(sent) == 1, (
+            'Одинаковая ошибка не должна отправляться в чат каждый опрос'
+        )
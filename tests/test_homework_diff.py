@@ -0,0 +1,32 @@
+import homework_diff
+from utils import make_record
+
+
+class TestHomeworkDiff:
+
+    def test_reports_every_changed_homework(self):
+        fingerprints = {}
+        homeworks = [make_record(i, 'reviewing') for i in range(3)]
+        changed = list(homework_diff.changes(fingerprints, homeworks))
+        assert [key for key, _, _ in changed] == ['0', '1', '2'], (
+            'Уведомление нужно для каждой работы, а не только для первой'
+        )
+        for key, fingerprint, _ in changed:
+            fingerprints[key] = fingerprint
+
+        homeworks[2] = make_record(2, 'approved')
+        changed = list(homework_diff.changes(fingerprints, homeworks))
+        assert [item for _, _, item in changed] == [homeworks[2]]
+
+    def test_date_updated_is_part_of_fingerprint(self):
+        first = homework_diff.fingerprint(make_record(1, 'rejected'))
+        second = homework_diff.fingerprint(
+            make_record(1, 'rejected', '2022-02-01T00:00:00Z'))
+        assert first != second
+
+    def test_dumps_roundtrip(self):
+        fingerprints = {'1': homework_diff.fingerprint(make_record(1, 'x'))}
+        restored = homework_diff.loads(homework_diff.dumps(fingerprints))
+        assert restored == fingerprints
+        assert homework_diff.loads('not json') == {}
+        assert homework_diff.loads(None) == {}
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+import exceptions
+import homework
+import json_stream
+import schema
+import tenants
+from utils import FakeBot
+
+RESPONSE = {
+    'current_date': 1234567890,
+    'homeworks': [
+        {'id': i, 'homework_name': f'дз {i}.zip', 'status': 'approved',
+         'reviewer_comment': 'Всё \\"отлично\\" ]}'}
+        for i in range(5)
+    ],
+    'extra': [1, {'a': None}],
+}
+
+
+def split(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class StreamResponse:
+
+    def __init__(self, body, chunk_size=7):
+        self.status_code = 200
+        self.body = body
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(split(self.body, self.chunk_size))
+
+    def close(self):
+        self.closed = True
+
+
+class StreamClient:
+
+    def __init__(self, response):
+        self.response = response
+        self.kwargs = None
+
+    def get(self, url, **kwargs):
+        self.kwargs = kwargs
+        return self.response
+
+
+class TestJsonStream:
+
+    def test_any_chunking_gives_same_result(self):
+        body = json.dumps(RESPONSE, ensure_ascii=False, indent=1).encode()
+        for size in (1, 2, 3, 5, 64, len(body)):
+            stream = json_stream.HomeworkStream(split(body, size))
+            assert list(stream) == RESPONSE['homeworks'], (
+                f'Разбор не должен зависеть от размера куска ({size})'
+            )
+            assert stream.found
+            assert stream.fields == {
+                'current_date': RESPONSE['current_date'],
+                'extra': RESPONSE['extra'],
+            }
+
+    def test_broken_body_raises(self):
+        body = json.dumps(RESPONSE).encode()
+        for broken in (body[:-1], body[:len(body) // 2], body + b'x',
+                       b'[]', b'{"homeworks": [1 2]}'):
+            with pytest.raises(ValueError):
+                list(json_stream.HomeworkStream(split(broken, 4)))
+
+    def test_validated_stream_reports_violations_at_the_end(self):
+        body = json.dumps({
+            'homeworks': [{'homework_name': 'a', 'status': 'approved'},
+                          {'status': 'approved'}],
+        }).encode()
+        seen = []
+        with pytest.raises(exceptions.ResponseValidationError) as error:
+            for record in schema.ValidatedStream(
+                    json_stream.HomeworkStream([body])):
+                seen.append(record.homework_name)
+        assert seen == ['a']
+        assert len(error.value.errors) == 2
+
+    def test_poller_streams_response(self, monkeypatch):
+        response = StreamResponse(json.dumps(RESPONSE).encode())
+        client = StreamClient(response)
+        monkeypatch.setattr(homework, 'http_client', client)
+        bot = FakeBot()
+        poller = tenants.TenantPoller(bot, start_timestamp=1, stream=True)
+        subscription = tenants.Subscription('token', 1)
+        poller(subscription)
+        assert client.kwargs['stream'] is True
+        assert response.closed, 'Соединение нужно закрыть после чтения'
+        assert len(bot.sent) == 5
+        assert poller.state(subscription).cursor == RESPONSE['current_date']
+
+        response.body = response.body[:-10]
+        response.closed = False
+        poller(subscription)
+        assert response.closed
+        chat_id, text = bot.sent[-1]
+        assert text.startswith('Сбой в работе программы')
+        assert poller.state(subscription).cursor == RESPONSE['current_date']
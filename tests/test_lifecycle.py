@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+import async_engine
+import homework
+import lifecycle
+import tenants
+from utils import FakeBot
+
+
+async def slow_statuses(request):
+    await asyncio.sleep(1)
+    return web.json_response({
+        'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+        'current_date': 1,
+    })
+
+
+async def stop_during_poll(monkeypatch, process):
+    app = web.Application()
+    app.router.add_get('/', slow_statuses)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(homework, 'ENDPOINT', f'http://127.0.0.1:{port}/')
+    bot = FakeBot()
+    engine = async_engine.AsyncEngine(
+        tenants.SubscriptionRegistry([('token', 1)]), bot,
+        timeout=5, period=0.2, start_timestamp=0)
+    asyncio.get_running_loop().call_later(0.4, process.stop)
+    try:
+        await engine.run_forever(process)
+    finally:
+        await runner.cleanup()
+    return bot
+
+
+class TestLifecycle:
+
+    def test_stop_wakes_waiting_loop(self):
+        process = lifecycle.Lifecycle(timeout=5, hard_exit=False)
+        threading.Timer(0.1, process.stop).start()
+        started = time.monotonic()
+        assert process.wait(10), 'После остановки wait должен вернуть True'
+        assert time.monotonic() - started < 1, (
+            'Сигнал остановки должен прерывать ожидание между опросами'
+        )
+        assert 0 < process.remaining() <= 5
+
+    def test_remaining_counts_down_from_stop(self):
+        now = [100.0]
+        process = lifecycle.Lifecycle(
+            timeout=10, clock=lambda: now[0], hard_exit=False)
+        assert process.remaining() == 10
+        process.stop()
+        now[0] += 4
+        assert process.remaining() == 6
+        now[0] += 20
+        assert process.remaining() == 0
+
+    def test_sighup_runs_reloaders_in_loop(self):
+        process = lifecycle.Lifecycle(hard_exit=False)
+        calls = []
+        process.on_reload(lambda: calls.append('statuses'))
+        process.on_reload(lambda: 1 / 0)
+        process.on_reload(lambda: calls.append('tenants'))
+        previous = {
+            signum: signal.getsignal(signum)
+            for signum in (*lifecycle.STOP_SIGNALS, signal.SIGHUP)
+        }
+        try:
+            process.install()
+            os.kill(os.getpid(), signal.SIGHUP)
+            assert not process.wait(1), 'SIGHUP не должен останавливать бота'
+            assert calls == [], (
+                'Перезагрузка выполняется циклом бота, не обработчиком сигнала'
+            )
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        process.reload_if_requested()
+        assert calls == ['statuses', 'tenants'], (
+            'Ошибка одного обработчика не должна мешать остальным'
+        )
+        process.reload_if_requested()
+        assert len(calls) == 2
+
+    def test_engine_finishes_started_polls(self, monkeypatch):
+        process = lifecycle.Lifecycle(timeout=5, hard_exit=False)
+        started = time.monotonic()
+        bot = asyncio.run(stop_during_poll(monkeypatch, process))
+        assert bot.sent and bot.sent[0][0] == 1, (
+            'Начатый до остановки опрос должен дослать уведомление'
+        )
+        assert time.monotonic() - started < 3
+
+    def test_reload_registry_in_place(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'token': 'a', 'chat_id': 1}]))
+        registry = tenants.load_registry(str(path))
+        path.write_text(json.dumps([
+            {'token': 'b', 'chat_id': 2}, {'token': 'b', 'chat_id': 3}]))
+        tenants.reload_registry(registry, str(path))
+        assert set(registry) == {
+            tenants.Subscription('b', 2), tenants.Subscription('b', 3)}
+        assert len(registry.by_token('b')) == 2
+        assert registry.by_token('a') == []
+        path.write_text('[]')
+        with pytest.raises(ValueError):
+            tenants.reload_registry(registry, str(path))
+        assert len(registry) == 2, (
+            'Пустой файл подписок не должен отключать всех подписчиков'
+        )
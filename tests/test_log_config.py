@@ -0,0 +1,61 @@
+import json
+import logging
+
+import log_config
+
+
+def make_record(msg, **extra):
+    record = logging.LogRecord(
+        'homework', logging.DEBUG, __file__, 1, msg, (), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestLogConfig:
+
+    def test_sampling_is_per_tenant(self):
+        sampling = log_config.SamplingFilter(every=3)
+        passed = [
+            sampling.filter(make_record('Статус %s', tenant=1, sampled=True))
+            for _ in range(6)
+        ]
+        assert passed == [True, False, False, True, False, False]
+        assert sampling.filter(
+            make_record('Статус %s', tenant=2, sampled=True)), (
+            'Счётчик выборки должен быть отдельным для каждого подписчика'
+        )
+        assert all(
+            sampling.filter(make_record('Ошибка', tenant=1))
+            for _ in range(3)
+        ), 'Записи без sampled не должны прореживаться'
+
+    def test_json_format(self):
+        line = log_config.JsonFormatter().format(
+            make_record('Статус не изменился', tenant=42))
+        data = json.loads(line)
+        assert data['message'] == 'Статус не изменился'
+        assert data['tenant'] == 42 and data['level'] == 'DEBUG'
+
+    def test_rotation_by_size_keeps_backup_count(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler = log_config.SizeAndTimeRotatingFileHandler(
+            str(path), max_bytes=100, backup_count=2)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        for _ in range(20):
+            handler.emit(make_record('x' * 40))
+        handler.close()
+        names = sorted(item.name for item in tmp_path.iterdir())
+        assert names == ['bot.log', 'bot.log.1', 'bot.log.2'], (
+            'Файл лога не должен расти без ограничений'
+        )
+
+    def test_rotation_by_time(self, tmp_path):
+        path = tmp_path / 'bot.log'
+        handler = log_config.SizeAndTimeRotatingFileHandler(
+            str(path), interval=60, backup_count=1)
+        handler.emit(make_record('first'))
+        handler.rollover_at = 0
+        handler.emit(make_record('second'))
+        handler.close()
+        assert (tmp_path / 'bot.log.1').read_text().strip() == 'first'
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import telegram
+
+import message_queue
+from utils import FakeBot
+
+
+class TestMessageQueue:
+
+    def test_token_bucket(self):
+        bucket = message_queue.TokenBucket(rate=2, capacity=2, now=0)
+        bucket.consume(0)
+        bucket.consume(0)
+        assert bucket.delay(0) == 0.5
+        assert bucket.delay(0.5) == 0
+        bucket.pause(10)
+        assert bucket.delay(1) == 9
+
+    def test_messages_for_one_chat_are_coalesced(self):
+        bot = FakeBot()
+        queue = message_queue.MessageQueue(bot)
+        for i in range(3):
+            queue.send_message(1, f'статус {i}')
+        queue.send_message(2, 'другой чат')
+        queue.start()
+        assert queue.stop(timeout=5)
+        assert bot.sent == [
+            (1, 'статус 0\n\nстатус 1\n\nстатус 2'),
+            (2, 'другой чат'),
+        ], 'Сообщения одного чата должны уходить одним сообщением'
+
+    def test_retry_after_is_respected(self):
+        bot = FakeBot(failures=[telegram.error.RetryAfter(0.2)])
+        queue = message_queue.MessageQueue(bot).start()
+        queue.send_message(1, 'текст')
+        assert queue.stop(timeout=5)
+        assert bot.sent == [(1, 'текст')], (
+            'После 429 сообщение должно быть отправлено повторно'
+        )
+        assert queue.sent == 2 and queue.delivered == 1
+
+    def test_chat_rate_limit(self):
+        bot = FakeBot()
+        queue = message_queue.MessageQueue(bot, chat_rate=20).start()
+        queue.send_message(1, 'первое')
+        queue.join(timeout=5)
+        queue.send_message(1, 'второе')
+        queue.send_message(1, 'третье')
+        assert queue.stop(timeout=5)
+        assert bot.sent == [(1, 'первое'), (1, 'второе\n\nтретье')]
+
+    def test_long_backlog_is_split_and_drained(self):
+        bot = FakeBot()
+        queue = message_queue.MessageQueue(bot, chat_rate=20)
+        texts = [str(i) * 3000 for i in range(3)]
+        for text in texts:
+            queue.send_message(1, text)
+        queue.start()
+        assert queue.stop(timeout=5), 'Очередь должна досылать остаток'
+        assert [text for _, text in bot.sent] == texts, (
+            'Не влезшие в одно сообщение тексты уходят следующими'
+        )
+        assert len(queue) == 0
+
+    def test_stop_keeps_to_timeout(self):
+        release = threading.Event()
+
+        class StuckBot(FakeBot):
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                release.wait(5)
+
+        queue = message_queue.MessageQueue(StuckBot()).start()
+        for chat_id in range(3):
+            queue.send_message(chat_id, 'текст')
+        started = time.monotonic()
+        assert not queue.stop(timeout=0.3)
+        assert time.monotonic() - started < 0.6, (
+            'stop() не должен ждать дольше timeout в сумме'
+        )
+        release.set()
@@ -0,0 +1,43 @@
+import urllib.request
+
+import exceptions
+import metrics
+
+
+class TestMetrics:
+
+    def test_exposition_format(self):
+        registry = metrics.Registry()
+        polls = registry.counter('polls_total', 'Опросы')
+        errors = registry.counter('errors_total', 'Ошибки', ['exception'])
+        latency = registry.histogram('latency_seconds', 'Время', [0.1, 1])
+        polls.inc()
+        polls.inc()
+        errors.labels('CriticalError').inc()
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(5)
+        text = registry.exposition()
+        assert '# TYPE polls_total counter\npolls_total 2\n' in text
+        assert 'errors_total{exception="CriticalError"} 1' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 2' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+        assert 'latency_seconds_count 3' in text
+
+    def test_errors_are_counted_by_class(self):
+        before = metrics.ERRORS.labels('CircuitOpen').value
+        metrics.count_error(exceptions.CircuitOpen('API недоступен'))
+        assert metrics.ERRORS.labels('CircuitOpen').value == before + 1
+
+    def test_http_endpoint(self):
+        server = metrics.start_http_server(0, '127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+                content_type = response.headers['Content-Type']
+        finally:
+            server.shutdown()
+        assert content_type.startswith('text/plain')
+        assert 'homework_bot_polls_total' in body
@@ -0,0 +1,140 @@
+import email
+import email.policy
+import io
+import json
+import threading
+import time
+
+import pytest
+
+import homework
+import metrics
+import notifiers
+import tenants
+from simulator import Latency, SmtpSimulator, WebhookSimulator
+from utils import FakeBot
+
+
+@pytest.fixture
+def webhook():
+    receiver = WebhookSimulator(latency=Latency(0.3, sigma=0.01)).start()
+    yield receiver
+    receiver.stop()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestNotifiers:
+
+    def test_slow_sink_does_not_block_others(self, webhook):
+        bot = FakeBot()
+        stream = io.StringIO()
+        fanout = notifiers.FanOut([
+            notifiers.TelegramSink(bot), notifiers.WebhookSink(),
+            notifiers.StdoutSink(stream),
+        ]).start()
+        channels = (
+            notifiers.Channel('telegram', 1),
+            notifiers.Channel('webhook', webhook.url),
+            notifiers.Channel('stdout', 1),
+        )
+        sent_before = metrics.SINK_SENDS.labels('webhook', 'sent').value
+        started = time.monotonic()
+        for number in range(3):
+            fanout.send(channels, f'статус {number}')
+        assert time.monotonic() - started < 0.1, (
+            'Рассылка не должна ждать доставки'
+        )
+        assert wait_for(lambda: len(bot.sent) == 3, timeout=0.25), (
+            'Медленный канал не должен задерживать остальные'
+        )
+        assert stream.getvalue().count('[1] статус') == 3
+        assert fanout.stop(5)
+        assert [item['text'] for item in webhook.messages] == [
+            'статус 0', 'статус 1', 'статус 2'], (
+            'Сообщения одному адресату должны приходить по порядку'
+        )
+        assert metrics.SINK_SENDS.labels(
+            'webhook', 'sent').value == sent_before + 3
+        assert metrics.SINK_LATENCY.labels('webhook').sum >= 0.9
+
+    def test_failures_are_counted(self, webhook):
+        webhook.error_rate = 1.0
+        fanout = notifiers.FanOut([notifiers.WebhookSink()]).start()
+        failed = metrics.SINK_SENDS.labels('webhook', 'failed').value
+        fanout.send([notifiers.Channel('webhook', webhook.url)], 'текст')
+        fanout.stop(5)
+        assert metrics.SINK_SENDS.labels(
+            'webhook', 'failed').value == failed + 1
+
+    def test_email_sink(self):
+        smtp = SmtpSimulator().start()
+        try:
+            notifiers.EmailSink('127.0.0.1', smtp.port).send(
+                'student@example.com', 'Работа проверена')
+        finally:
+            smtp.stop()
+        (sender, recipients, data), = smtp.messages
+        assert recipients == ['student@example.com']
+        message = email.message_from_bytes(
+            data.encode(), policy=email.policy.default)
+        assert message.get_content().strip() == 'Работа проверена'
+        assert message['Subject'] == notifiers.EMAIL_SUBJECT
+
+    def test_poller_fans_out_configured_channels(self, tmp_path,
+                                                 monkeypatch):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'token': 'token', 'chat_id': 1,
+             'sinks': [{'type': 'telegram'}, {'type': 'stdout'}]},
+            {'token': 'token', 'chat_id': 2},
+        ]))
+        registry = tenants.load_registry(str(path))
+        bot = FakeBot()
+        stream = io.StringIO()
+        fanout = notifiers.FanOut([
+            notifiers.TelegramSink(bot), notifiers.StdoutSink(stream),
+        ]).start()
+        monkeypatch.setattr(homework, 'notifier', fanout)
+        poller = tenants.TenantPoller(bot, registry=registry)
+        poller.notify(tenants.Subscription('token', 1), 'раз')
+        poller.notify(tenants.Subscription('token', 2), 'два')
+        fanout.stop(5)
+        assert sorted(bot.sent) == [(1, 'раз'), (2, 'два')]
+        assert stream.getvalue() == '[1] раз\n', (
+            'Подписка без sinks получает уведомления только в свой чат'
+        )
+
+    def test_unknown_sink_is_rejected(self):
+        with pytest.raises(ValueError):
+            notifiers.parse_channels([{'type': 'pigeon'}], 1)
+        with pytest.raises(ValueError):
+            notifiers.parse_channels([{'type': 'webhook'}], 1)
+
+    def test_stop_keeps_to_timeout_with_full_queue(self):
+        busy = threading.Event()
+        release = threading.Event()
+
+        class StuckSink(notifiers.StdoutSink):
+
+            def send(self, target, text):
+                busy.set()
+                release.wait(5)
+
+        fanout = notifiers.FanOut(
+            [StuckSink()], workers=1, queue_size=1).start()
+        channel = notifiers.Channel('stdout', 1)
+        fanout.send([channel], 'первое')
+        assert busy.wait(2)
+        fanout.send([channel], 'второе')
+        started = time.monotonic()
+        assert not fanout.stop(0.2)
+        assert time.monotonic() - started < 0.5, (
+            'Полная очередь канала не должна задерживать stop()'
+        )
+        release.set()
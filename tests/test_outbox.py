@@ -0,0 +1,133 @@
+import io
+import threading
+
+import pytest
+import telegram
+
+import homework
+import message_queue
+import notifiers
+import outbox
+import tenants
+from utils import FakeBot
+
+
+def answer(token, timestamp):
+    return {'homeworks': [{'id': 7, 'homework_name': 'hw.zip',
+                           'status': 'approved'}],
+            'current_date': timestamp + 1}
+
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(homework, 'telegram_breaker', None)
+    monkeypatch.setattr(homework, 'response_cache', None)
+    monkeypatch.setattr(homework, 'get_tenant_api_answer', answer)
+    return str(tmp_path / 'outbox.jsonl')
+
+
+class TestOutbox:
+
+    def test_failed_notification_is_replayed_once(self, journal_path,
+                                                  monkeypatch):
+        journal = outbox.Outbox(journal_path)
+        monkeypatch.setattr(homework, 'outbox', journal)
+        bot = FakeBot(failures=[telegram.error.NetworkError('нет сети')])
+        poller = tenants.TenantPoller(bot, start_timestamp=0)
+        subscription = tenants.Subscription('token', 1)
+        poller(subscription)
+        assert bot.sent == [] and len(journal) == 1, (
+            'Неотправленное уведомление должно остаться в журнале'
+        )
+        journal.close()
+
+        journal = outbox.Outbox(journal_path)
+        assert [chat_id for _, chat_id, _ in journal.pending()] == [1]
+        assert journal.replay(bot) == 1
+        assert len(bot.sent) == 1 and 'hw.zip' in bot.sent[0][1]
+        journal.close()
+
+        journal = outbox.Outbox(journal_path)
+        assert journal.replay(bot) == 0
+        key, = journal._delivered
+        assert not journal.send(bot, key, 1, 'тот же статус'), (
+            'Уведомление с известным ключом не должно уходить повторно'
+        )
+        assert len(bot.sent) == 1
+        journal.close()
+
+    def test_queue_marks_delivery_after_send(self, journal_path):
+        journal = outbox.Outbox(journal_path)
+        bot = FakeBot(
+            failures=[telegram.error.Unauthorized('бот заблокирован')])
+        queue = message_queue.MessageQueue(bot).start()
+        journal.send(queue, 'a', 1, 'первое')
+        journal.send(queue, 'b', 2, 'второе')
+        assert queue.stop(timeout=5)
+        assert [key for key, _, _ in journal.pending()] == ['a'], (
+            'Отметка о доставке ставится только после отправки'
+        )
+        journal.close()
+
+    def test_telegram_channel_of_sinks_is_journaled(self, journal_path,
+                                                    monkeypatch):
+        journal = outbox.Outbox(journal_path)
+        monkeypatch.setattr(homework, 'outbox', journal)
+        bot = FakeBot(failures=[telegram.error.NetworkError('нет сети')])
+        stream = io.StringIO()
+        fanout = notifiers.FanOut([
+            notifiers.TelegramSink(bot), notifiers.StdoutSink(stream),
+        ]).start()
+        monkeypatch.setattr(homework, 'notifier', fanout)
+        registry = tenants.SubscriptionRegistry()
+        subscription = registry.add('token', 1, channels=(
+            notifiers.Channel('telegram', 1),
+            notifiers.Channel('stdout', 1)))
+        poller = tenants.TenantPoller(
+            bot, start_timestamp=0, registry=registry)
+        poller(subscription)
+        assert fanout.stop(timeout=5)
+        assert 'hw.zip' in stream.getvalue()
+        assert bot.sent == [] and len(journal) == 1, (
+            'Сбой канала telegram не должен терять уведомление'
+        )
+        assert journal.replay(bot) == 1
+        assert len(bot.sent) == 1 and len(journal) == 0
+        journal.close()
+
+    def test_group_commit(self, journal_path):
+        journal = outbox.Outbox(journal_path)
+
+        def append(worker):
+            for number in range(100):
+                journal.add(f'{worker}:{number}', worker, 'текст')
+
+        threads = [
+            threading.Thread(target=append, args=(worker,))
+            for worker in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert journal.commits < 2000, (
+            'Одновременные записи должны объединяться в один fsync'
+        )
+        journal.close()
+        assert len(outbox.Outbox(journal_path).pending()) == 2000
+
+    def test_torn_line_is_skipped(self, journal_path):
+        journal = outbox.Outbox(journal_path)
+        journal.add('a', 1, 'текст')
+        journal.close()
+        with open(journal_path, 'ab') as file:
+            file.write(b'{"add": "b", "ch')
+        pending = outbox.Outbox(journal_path).pending()
+        assert [key for key, _, _ in pending] == ['a'], (
+            'Оборванная последняя строка журнала должна пропускаться'
+        )
+
+    def test_message_key_hides_token(self):
+        key = outbox.message_key(
+            tenants.Subscription('secret-token', 5), '7', 42)
+        assert 'secret-token' not in key and key.startswith('5:')
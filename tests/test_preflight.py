@@ -0,0 +1,91 @@
+import time
+
+import pytest
+import telegram
+
+import exceptions
+import homework
+import preflight
+import tenants
+from circuit_breaker import CLOSED, CircuitBreaker
+from simulator import Latency, PracticumSimulator
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = PracticumSimulator(
+        homeworks_per_token=1, latency=Latency(0.2, sigma=0.01),
+        invalid_tokens={'bad-1', 'bad-2'}, seed=1).start()
+    monkeypatch.setattr(homework, 'ENDPOINT', api.url)
+    monkeypatch.setattr(homework, 'token_checks', None)
+    yield api
+    api.stop()
+
+
+class UnauthorizedBot:
+
+    def get_me(self):
+        raise telegram.error.Unauthorized('Unauthorized')
+
+
+class TestPreflight:
+
+    def test_checks_tokens_concurrently_and_caches(self, api):
+        now = [0.0]
+        checks = preflight.TokenChecks(ttl=60, clock=lambda: now[0])
+        registry = tenants.SubscriptionRegistry(
+            [(f'token-{i}', i) for i in range(14)]
+            + [('bad-1', 100), ('bad-1', 101), ('bad-2', 102)])
+        started = time.monotonic()
+        report = preflight.check_tokens(registry, checks)
+        assert time.monotonic() - started < 1.5, (
+            'Токены должны проверяться параллельно'
+        )
+        assert (report.tokens, report.invalid, report.quarantined) == (
+            16, 2, 3)
+        quarantined = preflight.QuarantinedRegistry(registry, checks)
+        assert len(quarantined) == 14
+        assert tenants.Subscription('bad-1', 100) not in quarantined
+        assert quarantined.by_token('bad-2') == []
+
+        requests = api.stats['requests']
+        assert preflight.check_tokens(registry, checks).checked == 0
+        assert api.stats['requests'] == requests, (
+            'Пока результат проверки не устарел, токен не проверяется заново'
+        )
+        now[0] += 61
+        assert len(quarantined) == 17, (
+            'Устаревший карантин должен снова пускать подписку в опрос'
+        )
+        assert preflight.check_tokens(registry, checks).checked == 16
+
+    def test_rejected_token_is_quarantined_during_poll(self, api,
+                                                      monkeypatch):
+        checks = preflight.TokenChecks()
+        monkeypatch.setattr(homework, 'token_checks', checks)
+        breaker = CircuitBreaker(
+            'API', failure_threshold=1, ignore=(exceptions.InvalidToken,))
+        monkeypatch.setattr(homework, 'api_breaker', breaker)
+        with pytest.raises(exceptions.InvalidToken):
+            homework.get_tenant_api_answer('bad-1', 0)
+        assert checks.invalid('bad-1')
+        assert breaker.state == CLOSED, (
+            'Отказ по токену не говорит о сбое API и не размыкает '
+            'предохранитель'
+        )
+        assert homework.get_tenant_api_answer('good', 0)['homeworks']
+
+    def test_scheduler_skips_quarantined(self):
+        checks = preflight.TokenChecks()
+        checks.record('bad', False)
+        registry = preflight.QuarantinedRegistry(
+            tenants.SubscriptionRegistry([('good', 1), ('bad', 2)]), checks)
+        polled = []
+        scheduler = tenants.PollScheduler(registry, polled.append, period=10)
+        scheduler.sync(now=0)
+        scheduler.run_pending(now=10)
+        assert polled == [tenants.Subscription('good', 1)]
+
+    def test_rejected_bot_token_stops_startup(self):
+        with pytest.raises(SystemExit):
+            preflight.check_bot(UnauthorizedBot())
@@ -0,0 +1,74 @@
+import pstats
+import time
+
+import pytest
+
+import homework
+import metrics
+import profiling
+import tenants
+from utils import FakeBot
+
+
+def slow_answer(token, timestamp):
+    time.sleep(0.02)
+    return {'homeworks': [{'id': 1, 'homework_name': 'hw.zip',
+                           'status': 'approved'}],
+            'current_date': 10}
+
+
+@pytest.fixture
+def poller(monkeypatch):
+    monkeypatch.setattr(profiling, 'stage_timers', None)
+    monkeypatch.setattr(profiling, 'capture', None)
+    monkeypatch.setattr(homework, 'response_cache', None)
+    monkeypatch.setattr(homework, 'telegram_breaker', None)
+    monkeypatch.setattr(homework, 'get_tenant_api_answer', slow_answer)
+    return tenants.TenantPoller(FakeBot(), start_timestamp=0)
+
+
+def stage_counts():
+    return {
+        name: sum(metrics.STAGE_LATENCY.labels(name).counts)
+        for name in profiling.STAGES
+    }
+
+
+class TestProfiling:
+
+    def test_stage_timers_are_opt_in(self, poller):
+        before = stage_counts()
+        poller(tenants.Subscription('token', 1))
+        assert stage_counts() == before, (
+            'Без PROFILE_STAGES этапы не замеряются'
+        )
+        profiling.start(stages=True, modes='')
+        poller(tenants.Subscription('token', 2))
+        after = stage_counts()
+        assert all(after[name] == before[name] + 1
+                   for name in profiling.STAGES)
+        assert metrics.STAGE_LATENCY.labels('get_api_answer').sum >= 0.02
+
+    def test_capture_stops_after_cycles(self, poller, tmp_path):
+        profiling.start(stages=False, modes='cprofile, flame, tracemalloc',
+                        cycles=3, directory=str(tmp_path))
+        for chat_id in range(4):
+            poller(tenants.Subscription('token', chat_id))
+        capture = profiling.capture
+        assert capture.done == 4
+        assert len(capture.paths) == 3, 'Профиль сохраняется один раз'
+        pstats_path, folded_path, _ = capture.paths
+        stats = pstats.Stats(pstats_path)
+        assert any(name == 'slow_answer'
+                   for _, _, name in stats.stats), (
+            'cProfile должен видеть вызовы в потоке опроса'
+        )
+        with open(folded_path, encoding='utf-8') as file:
+            lines = file.read().splitlines()
+        assert lines, 'Сэмплер должен снять стеки за время опросов'
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) > 0 and 'slow_answer' in stack
+
+    def test_unknown_mode_is_rejected(self):
+        with pytest.raises(ValueError):
+            profiling.Capture(['perf'])
@@ -0,0 +1,99 @@
+import json
+
+import homework
+import response_cache
+import tenants
+from utils import FakeBot
+
+
+class MockResponse:
+
+    def __init__(self, status_code, body=b'', headers=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = headers or {}
+        self.reason = ''
+        self.text = body.decode()
+
+    def json(self):
+        raise AssertionError('json() не должен вызываться при включённом кеше')
+
+
+class RecordingClient:
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.headers.append(headers)
+        return self.responses.pop(0)
+
+
+BODY = json.dumps({'homeworks': [], 'current_date': 1}).encode()
+SUBSCRIBER = ('token', 1)
+
+
+class TestResponseCache:
+
+    def test_conditional_request_and_not_modified(self, monkeypatch):
+        cache = response_cache.ResponseCache()
+        client = RecordingClient([
+            MockResponse(200, BODY, {'ETag': '"v1"'}),
+            MockResponse(304),
+        ])
+        monkeypatch.setattr(homework, 'http_client', client)
+        monkeypatch.setattr(homework, 'response_cache', cache)
+
+        first = homework.get_tenant_api_answer('token', 0)
+        assert not cache.is_unchanged(SUBSCRIBER, first)
+        cache.mark_processed(SUBSCRIBER, first)
+        second = homework.get_tenant_api_answer('token', 0)
+        assert client.headers[1]['If-None-Match'] == '"v1"', (
+            'Повторный запрос должен быть условным'
+        )
+        assert second is first and cache.is_unchanged(SUBSCRIBER, second)
+        assert cache.stats.not_modified == 1
+        assert cache.stats.bytes_saved == len(BODY)
+
+    def test_same_body_is_not_decoded_again(self):
+        cache = response_cache.ResponseCache()
+        params = {'from_date': 0}
+        first = cache.decode('token', params, BODY, {})
+        cache.mark_processed(SUBSCRIBER, first)
+        second = cache.decode('token', params, BODY, {})
+        assert second is first and cache.is_unchanged(SUBSCRIBER, second)
+        assert not cache.is_unchanged(('token', 2), second), (
+            'Другой чат на том же токене этот ответ ещё не разбирал'
+        )
+        assert (cache.stats.decodes, cache.stats.hash_hits) == (1, 1)
+        assert cache.request_headers('token', {'from_date': 5}) == {}
+
+    def test_lru_eviction(self):
+        cache = response_cache.ResponseCache(maxsize=2)
+        for token in ('a', 'b', 'a', 'c'):
+            cache.decode(token, {}, BODY, {'ETag': token})
+        assert cache.request_headers('b', {}) == {}
+        assert cache.request_headers('a', {}) == {'If-None-Match': 'a'}
+
+    def test_every_chat_on_token_is_notified(self, monkeypatch):
+        body = json.dumps({
+            'homeworks': [{'id': 1, 'homework_name': 'hw.zip',
+                           'status': 'approved'}],
+            'current_date': 1,
+        }).encode()
+        client = RecordingClient(
+            [MockResponse(200, body), MockResponse(200, body)])
+        monkeypatch.setattr(homework, 'http_client', client)
+        monkeypatch.setattr(homework, 'response_cache',
+                            response_cache.ResponseCache())
+        monkeypatch.setattr(homework, 'api_breaker', None)
+        monkeypatch.setattr(homework, 'telegram_breaker', None)
+        monkeypatch.setattr(homework, 'outbox', None)
+        bot = FakeBot()
+        poller = tenants.TenantPoller(bot, start_timestamp=0)
+        poller(tenants.Subscription('token', 1))
+        poller(tenants.Subscription('token', 2))
+        assert [chat_id for chat_id, _ in bot.sent] == [1, 2], (
+            'Ответ из кеша должен дойти до всех чатов на токене'
+        )
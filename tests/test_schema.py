@@ -0,0 +1,64 @@
+import pytest
+
+import exceptions
+import schema
+
+
+def make_homework(**fields):
+    data = {
+        'id': 1,
+        'homework_name': 'hw.zip',
+        'status': 'approved',
+        'date_updated': '2022-01-01T00:00:00Z',
+    }
+    data.update(fields)
+    return data
+
+
+class TestSchema:
+
+    def test_valid_response_gives_records(self):
+        result = schema.validate_response({
+            'homeworks': [
+                make_homework(), make_homework(id=2, lesson_name='x')],
+            'current_date': 5,
+        })
+        assert result.current_date == 5
+        assert result.homeworks[0] == schema.HomeworkRecord(
+            1, 'hw.zip', 'approved', '2022-01-01T00:00:00Z', None, None)
+        assert result.homeworks[1].lesson_name == 'x'
+
+    def test_unused_fields_are_not_checked(self):
+        result = schema.validate_response({
+            'homeworks': [make_homework(id='1', lesson_name=3)],
+            'current_date': 5,
+        })
+        assert result.homeworks[0].id == '1', (
+            'Поля, от которых не зависит логика бота, не проверяются'
+        )
+
+    def test_reports_every_violation(self):
+        with pytest.raises(exceptions.ResponseValidationError) as error:
+            schema.validate_response({
+                'homeworks': [
+                    make_homework(),
+                    make_homework(homework_name=''),
+                    make_homework(status=3, date_updated=1),
+                    'not a dict',
+                ],
+            })
+        assert error.value.errors == [
+            'current_date: ожидалось положительное целое, получено None',
+            'homeworks[1].homework_name: нет значения',
+            'homeworks[2].status: ожидался str, получен int',
+            'homeworks[2].date_updated: ожидался str, получен int',
+            'homeworks[3]: ожидался словарь, получен str',
+        ], 'Все нарушения нужно сообщать разом'
+        assert isinstance(
+            error.value, exceptions.IncorrectFormatResponse)
+
+    def test_wrong_top_level(self):
+        for response in ([], {'homeworks': {}, 'current_date': 1},
+                         {'current_date': 1}):
+            with pytest.raises(exceptions.ResponseValidationError):
+                schema.validate_response(response)
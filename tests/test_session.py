@@ -0,0 +1,34 @@
+import homework
+
+
+class RecordingSession:
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append((url, kwargs))
+        raise ConnectionError('нет сети')
+
+
+class TestSession:
+
+    def test_create_session_configures_pool(self):
+        session = homework.create_session(pool_size=7, retries=2)
+        adapter = session.get_adapter(homework.ENDPOINT)
+        assert adapter._pool_maxsize == 7
+        assert adapter.max_retries.total == 2
+        assert 502 in adapter.max_retries.status_forcelist
+
+    def test_get_api_answer_uses_injected_session(self, monkeypatch):
+        session = RecordingSession()
+        monkeypatch.setattr(homework, 'http_client', session)
+        try:
+            homework.get_api_answer(0)
+        except Exception:
+            pass
+        assert len(session.calls) == 1, (
+            'Запрос к API должен идти через http_client'
+        )
+        url, kwargs = session.calls[0]
+        assert kwargs['timeout'] == homework.REQUEST_TIMEOUT
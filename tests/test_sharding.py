@@ -0,0 +1,79 @@
+from collections import Counter
+
+import sharding
+import state_store
+import tenants
+
+
+def subscriptions(count):
+    return [tenants.Subscription(f'token-{i}', i) for i in range(count)]
+
+
+class TestSharding:
+
+    def test_ring_moves_few_tenants(self):
+        keys = [sharding.subscription_key(sub) for sub in subscriptions(10000)]
+        four = sharding.HashRing(sharding.worker_name(i) for i in range(4))
+        five = sharding.HashRing(sharding.worker_name(i) for i in range(5))
+        before = {key: four.node(key) for key in keys}
+        after = {key: five.node(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        assert len(moved) < 0.25 * len(keys), (
+            'При добавлении воркера должна переезжать примерно 1/N подписок'
+        )
+        assert {after[key] for key in moved} == {'worker-4'}, (
+            'Подписки должны переезжать только на новый воркер'
+        )
+        counts = Counter(after.values())
+        assert max(counts.values()) < 1.3 * min(counts.values())
+
+    def test_sqlite_lease_is_exclusive(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        first = state_store.SQLiteStateStore(path)
+        second = state_store.SQLiteStateStore(path)
+        keys = [('token', 1), ('token', 2)]
+        assert first.acquire_leases('a', keys, 100, 0) == set(keys)
+        assert second.acquire_leases('b', keys, 100, 50) == set(), (
+            'Чужую действующую аренду перехватывать нельзя'
+        )
+        assert second.acquire_leases('b', keys[:1], 200, 100) == {keys[0]}
+        assert first.acquire_leases('a', keys, 200, 100) == {keys[1]}
+        first.release_leases('a')
+        assert second.acquire_leases('b', keys, 300, 150) == set(keys)
+        first.close()
+        second.close()
+
+    def test_resharding_never_shares_a_chat(self, tmp_path):
+        store = state_store.SQLiteStateStore(str(tmp_path / 'state.db'))
+        registry = tenants.SubscriptionRegistry(subscriptions(200))
+        old_registry, old = sharding.shard(registry, store, 0, 1)
+        new_registry, new = sharding.shard(registry, store, 1, 2)
+        old.owner, new.owner = 'old', 'new'
+        old.renew()
+        new.renew()
+        assert len(old.held) == 200 and not new.held
+
+        poller = tenants.TenantPoller(None, start_timestamp=1, store=store)
+        subscription = next(iter(new_registry))
+        store.put(subscription, 42, None)
+        old.release()
+        new.renew()
+        assert new.held == set(new_registry)
+        assert not new.held & old.held
+        assert new.claim(subscription, poller)
+        assert poller.state(subscription).cursor == 42, (
+            'Новый владелец должен прочитать состояние из хранилища'
+        )
+        store.close()
+
+    def test_workers_stay_on_one_host(self):
+        assert sharding.single_host_error({'DYNO': 'worker.1'}, 1) is None
+        assert sharding.single_host_error({}, 4) is None
+        assert sharding.single_host_error({'DYNO': 'worker.1'}, 4), (
+            'Воркеры на разных дайно не делят локальный STATE_DB'
+        )
+        assert sharding.single_host_error(
+            {'DYNO': 'worker.1', 'WORKER_ID': '2'}, 4) is None, (
+            'Воркеры launcher.py workers N работают внутри одного дайно'
+        )
+        assert sharding.single_host_error({'STATE_DB': ''}, 2)
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+import requests
+import telegram
+
+import homework
+import tenants
+from simulator import PracticumSimulator, TelegramSimulator
+
+
+@pytest.fixture
+def simulators(monkeypatch):
+    now = [1_000_000.0]
+    api = PracticumSimulator(
+        homeworks_per_token=2, transition_interval=10, seed=1,
+        clock=lambda: now[0]).start()
+    bot_api = TelegramSimulator(seed=1, clock=lambda: now[0]).start()
+    monkeypatch.setattr(homework, 'ENDPOINT', api.url)
+    yield api, bot_api, now
+    api.stop()
+    bot_api.stop()
+
+
+class TestSimulator:
+
+    def test_end_to_end_poll(self, simulators):
+        api, bot_api, now = simulators
+        bot = telegram.Bot(token='123:simulated', base_url=bot_api.url)
+        poller = tenants.TenantPoller(bot, start_timestamp=0)
+        subscription = tenants.Subscription('token', 7)
+        poller(subscription)
+        assert len(bot_api.messages) == 2, (
+            'Первый опрос с from_date=0 должен вернуть всю историю'
+        )
+        now[0] += 100
+        poller(subscription)
+        assert api.stats['transitions'] > 0
+        latencies = bot_api.notification_latencies(api.transitions)
+        assert latencies and all(value >= 0 for value in latencies)
+        assert bot_api.messages[-1][1] == 7
+
+    def test_injected_failures(self, simulators):
+        api, _, _ = simulators
+        api.error_rate = 1.0
+        response = requests.get(
+            api.url, headers={'Authorization': 'OAuth token'})
+        assert response.status_code == 500
+        api.error_rate = 0.0
+        api.malformed_rate = 1.0
+        response = requests.get(
+            api.url, headers={'Authorization': 'OAuth token'})
+        with pytest.raises(ValueError):
+            json.loads(response.content)
+        api.invalid_tokens.add('bad')
+        response = requests.get(
+            api.url, headers={'Authorization': 'OAuth bad'})
+        assert response.status_code == 401
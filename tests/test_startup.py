@@ -0,0 +1,87 @@
+import json
+import os
+import subprocess
+import sys
+
+import homework
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('telegram', 'requests', 'dotenv')
+
+
+def run_python(code, cwd):
+    """Выполняет code в свежем интерпретаторе и разбирает строку JSON,
+    которую он напечатал (остальной stdout — лог).
+    """
+    environ = dict(os.environ, PYTHONPATH=ROOT)
+    for name in ('LOG_FILE', 'LOG_CONFIG', 'RETRY_TIME'):
+        environ.pop(name, None)
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=cwd, env=environ,
+        capture_output=True, text=True, check=True).stdout
+    return json.loads(next(
+        line for line in output.splitlines() if line.startswith('{')))
+
+
+class TestStartup:
+
+    def test_import_has_no_side_effects(self, tmp_path):
+        result = run_python(
+            'import json, logging, sys\n'
+            'import homework\n'
+            f'print(json.dumps({{"heavy": [name for name in {HEAVY!r} '
+            'if name in sys.modules], '
+            '"handlers": len(logging.getLogger().handlers)}))',
+            tmp_path)
+        assert result['heavy'] == [], (
+            'Импорт homework не должен подключать telegram, requests и dotenv'
+        )
+        assert result['handlers'] == 0, 'Логирование настраивает create_app()'
+        assert not (tmp_path / 'file.log').exists()
+
+    def test_create_app_applies_config(self, tmp_path):
+        result = run_python(
+            'import json, logging\n'
+            'import homework\n'
+            'app = homework.create_app({"LOG_FILE": "bot.log", '
+            '"RETRY_TIME": "7"})\n'
+            'logging.getLogger("startup").warning("запуск")\n'
+            'print(json.dumps({"retry": homework.RETRY_TIME, '
+            '"config": app.config["LOG_FILE"]}))',
+            tmp_path)
+        assert result == {'retry': 7, 'config': 'bot.log'}
+        log = (tmp_path / 'bot.log').read_text(encoding='utf-8')
+        assert 'запуск' in log, 'create_app() должен настроить логирование'
+
+    def test_configure_reads_environ(self):
+        try:
+            homework.configure({
+                'PRACTICUM_TOKEN': 'token',
+                'PRACTICUM_ENDPOINT': 'http://127.0.0.1/api/',
+                'WORKER_COUNT': '3',
+            })
+            assert homework.ENDPOINT == 'http://127.0.0.1/api/'
+            assert homework.WORKER_COUNT == 3
+            assert homework.HEADERS == {'Authorization': 'OAuth token'}
+            assert homework.STATE_DB == 'state.db'
+            homework.configure({'HTTP_POOL_SIZE': '50', 'HTTP_RETRIES': '0'})
+            adapter = homework.create_session().get_adapter(homework.ENDPOINT)
+            assert adapter._pool_maxsize == 50
+            assert adapter.max_retries.total == 0
+        finally:
+            homework.configure()
+
+    def test_config_reaches_other_modules(self, tmp_path):
+        result = run_python(
+            'import json\n'
+            'import homework, notifiers\n'
+            'homework.create_app({"LOG_FILE": "", "SMTP_PORT": "2525", '
+            '"SHUTDOWN_TIMEOUT": "3", "WORKER_ID": "4"})\n'
+            'import lifecycle, sharding\n'
+            'print(json.dumps({"smtp": notifiers.EmailSink().port, '
+            '"shutdown": lifecycle.Lifecycle().timeout, '
+            '"worker": sharding.worker_id_from_env(homework.config)}))',
+            tmp_path)
+        assert result == {'smtp': 2525, 'shutdown': 3, 'worker': 4}, (
+            'Настройки из create_app() должны доходить до всех модулей'
+        )
@@ -0,0 +1,46 @@
+import state_store
+import tenants
+
+
+class TestStateStore:
+
+    def test_sqlite_survives_reopen(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = state_store.SQLiteStateStore(path, flush_interval=3600)
+        store.put(('token', 1), 100, 'approved')
+        store.put(('token', '2'), 200, None)
+        assert store.get(('token', 1)) == (100, 'approved'), (
+            'Несброшенные изменения должны быть видны через get()'
+        )
+        store.close()
+
+        reopened = state_store.SQLiteStateStore(path)
+        assert reopened.load_all() == {
+            ('token', 1): (100, 'approved'),
+            ('token', '2'): (200, None),
+        }
+        reopened.close()
+
+    def test_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = state_store.SQLiteStateStore(
+            path, batch_size=3, flush_interval=3600)
+        reader = state_store.SQLiteStateStore(path)
+        store.put(('a', 1), 1, None)
+        store.put(('b', 1), 1, None)
+        assert reader.load_all() == {}, (
+            'До заполнения пакета записи не должны попадать в базу'
+        )
+        store.put(('c', 1), 1, None)
+        assert len(reader.load_all()) == 3
+        store.close()
+        reader.close()
+
+    def test_poller_resumes_from_store(self):
+        store = state_store.MemoryStateStore()
+        store.put(('token', 1), 555, '{"7":42}')
+        poller = tenants.TenantPoller(bot=None, store=store)
+        state = poller.state(tenants.Subscription('token', 1))
+        assert (state.cursor, state.fingerprints) == (555, {'7': 42}), (
+            'После перезапуска курсор должен восстанавливаться из хранилища'
+        )
@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import homework
+import schema
+import templates
+import tenants
+from utils import FakeBot
+
+
+def record(status, name='hw'):
+    return schema.HomeworkRecord(1, name, status, None, None, 'Урок')
+
+
+@pytest.fixture
+def restore_templates(monkeypatch):
+    monkeypatch.setattr(templates, 'catalog', templates.catalog)
+    monkeypatch.setattr(
+        homework, 'HOMEWORK_STATUSES', dict(homework.HOMEWORK_STATUSES))
+
+
+class TestTemplates:
+
+    def test_default_locale_matches_parse_status(self):
+        render = templates.catalog.renderer()
+        for status in homework.HOMEWORK_STATUSES:
+            item = record(status, name='{x} "ДЗ"')
+            assert render(item) == homework.render_status(
+                item.homework_name, status), (
+                'Скомпилированный шаблон должен давать тот же текст, '
+                'что и parse_status'
+            )
+
+    def test_unknown_status_uses_fallback(self):
+        render = templates.catalog.renderer('en')
+        texts = [render(record('approved')), render(record('on_hold'))]
+        assert texts[0].startswith('Homework "hw"')
+        assert texts[1].endswith('on_hold.'), (
+            'Для неизвестного статуса отправляется текст по умолчанию'
+        )
+        strict = templates.Catalog({'ru': {
+            'message': '{homework_name}: {verdict}',
+            'statuses': {'approved': 'ok'}, 'fallback': None}})
+        with pytest.raises(KeyError):
+            strict.render(record('on_hold'))
+
+    def test_bad_template_fails_on_load(self):
+        with pytest.raises(ValueError):
+            templates.compile_template('{homework_name} {chat_id}')
+
+    def test_poller_uses_tenant_locale(self, monkeypatch):
+        def fake_answer(token, timestamp):
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': timestamp + 1,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_api_answer', fake_answer)
+        registry = tenants.SubscriptionRegistry()
+        registry.add('token', 1, locale='en')
+        registry.add('token', 2)
+        bot = FakeBot()
+        poller = tenants.TenantPoller(bot, start_timestamp=0,
+                                      registry=registry)
+        for subscription in registry:
+            poller(subscription)
+        texts = dict(bot.sent)
+        assert texts[1].startswith('Homework "hw"'), (
+            'Подписчик с locale=en должен получать уведомления на английском'
+        )
+        assert texts[2].startswith('Изменился статус проверки работы')
+
+    def test_load_file(self, tmp_path, restore_templates):
+        path = tmp_path / 'statuses.json'
+        path.write_text(json.dumps({'approved': 'Принято!'}))
+        templates.load(str(path))
+        assert homework.parse_status(
+            {'homework_name': 'hw', 'status': 'approved'}
+        ).endswith('Принято!'), (
+            'Плоский файл заменяет русские тексты и для parse_status'
+        )
+        assert templates.catalog.render(record('approved')).endswith(
+            'Принято!')
+        assert 'rejected' in homework.HOMEWORK_STATUSES
+
+        path.write_text(json.dumps({'de': {
+            'message': 'Arbeit "{homework_name}" ({lesson_name}): {verdict}',
+            'statuses': {'approved': 'Angenommen.'},
+        }}))
+        templates.load(str(path))
+        assert templates.catalog.render(record('approved'), 'de') == (
+            'Arbeit "hw" (Урок): Angenommen.')
+        assert homework.HOMEWORK_STATUSES['approved'] != 'Принято!', (
+            'Перезагрузка должна сбрасывать прежние переопределения'
+        )
+
+        loaded = templates.catalog
+        path.write_text(json.dumps({'ru': {'message': '{chat_id}'}}))
+        with pytest.raises(ValueError):
+            templates.load(str(path))
+        assert templates.catalog is loaded, (
+            'Ошибочный файл шаблонов не должен менять каталог'
+        )
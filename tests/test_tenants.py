@@ -0,0 +1,81 @@
+from collections import Counter
+
+import tenants
+from utils import FakeBot
+
+
+class TestTenants:
+
+    def test_registry_deduplicates(self):
+        registry = tenants.SubscriptionRegistry(
+            [('token', 1), ('token', 1), ('token', 2)])
+        assert len(registry) == 2, (
+            'Повторная подписка не должна добавлять запись в реестр'
+        )
+        registry.remove('token', 1)
+        assert tenants.Subscription('token', 1) not in registry
+
+    def test_scheduler_spreads_polls(self):
+        registry = tenants.SubscriptionRegistry(
+            (f'token-{i}', i) for i in range(6000))
+        polled = []
+        scheduler = tenants.PollScheduler(registry, polled.append, period=600)
+        scheduler.sync(now=0)
+        buckets = Counter(
+            int(scheduler.offset(sub) // 60) for sub in registry)
+        assert len(buckets) == 10
+        assert max(buckets.values()) < 1.2 * min(buckets.values()), (
+            'Опросы должны равномерно распределяться по окну'
+        )
+        assert scheduler.run_pending(now=300) < len(registry)
+        scheduler.run_pending(now=600)
+        assert set(polled) == set(registry), (
+            'За одно окно должен быть опрошен каждый подписчик'
+        )
+
+    def test_poller_reuses_homework_functions(self, monkeypatch):
+        import homework
+
+        calls = []
+
+        def fake_answer(token, timestamp):
+            calls.append((token, timestamp))
+            return {
+                'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+                'current_date': timestamp + 1,
+            }
+
+        monkeypatch.setattr(homework, 'get_tenant_api_answer', fake_answer)
+        bot = FakeBot()
+        poller = tenants.TenantPoller(bot, start_timestamp=10)
+        subscription = tenants.Subscription('token', 42)
+        poller(subscription)
+        poller(subscription)
+        assert calls == [('token', 10), ('token', 11)]
+        assert len(bot.sent) == 1 and bot.sent[0][0] == 42, (
+            'Неизменившийся статус не должен отправляться повторно'
+        )
+
+    def test_scheduler_polls_same_token_together(self):
+        first = tenants.Subscription('shared', 1)
+        second = tenants.Subscription('shared', 2)
+        registry = tenants.SubscriptionRegistry(
+            [('shared', 1), ('shared', 2), ('solo', 3)])
+        intervals = {first: 100, second: 130}
+        polled = []
+        scheduler = tenants.PollScheduler(
+            registry, polled.append, period=600, interval=intervals.get)
+        scheduler.sync(now=0)
+        scheduler.run_pending(now=600)
+        assert len(polled) == 3
+        assert abs(polled.index(first) - polled.index(second)) == 1, (
+            'Подписки одного токена должны опрашиваться вместе'
+        )
+        polled.clear()
+        assert scheduler.run_pending(now=700) == 2
+        assert set(polled) == {first, second}, (
+            'Опрос одной подписки должен подтягивать остальные её токена'
+        )
+        assert scheduler.run_pending(now=730) == 0, (
+            'Подтянутая подписка не должна опрашиваться второй раз'
+        )
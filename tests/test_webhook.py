@@ -0,0 +1,59 @@
+import asyncio
+
+import aiohttp
+
+import async_engine
+import tenants
+import webhook
+from utils import FakeBot
+
+
+PAYLOAD = {
+    'homeworks': [{'id': 1, 'homework_name': 'hw1', 'status': 'approved'}],
+    'current_date': 100,
+}
+
+
+async def post_events(engine, requests):
+    runner = await webhook.start(engine, 0, '127.0.0.1', secret='s3cret')
+    port = runner.addresses[0][1]
+    url = f'http://127.0.0.1:{port}{webhook.WEBHOOK_PATH}'
+    statuses = []
+    try:
+        async with aiohttp.ClientSession() as session:
+            for headers, body in requests:
+                async with session.post(
+                        url, headers=headers, json=body) as response:
+                    statuses.append(response.status)
+        await engine.drain()
+    finally:
+        await runner.cleanup()
+    return statuses
+
+
+class TestWebhook:
+
+    def test_push_notifies_every_subscriber_once(self):
+        registry = tenants.SubscriptionRegistry(
+            [('token', 1), ('token', 2), ('other', 3)])
+        bot = FakeBot()
+        engine = async_engine.AsyncEngine(registry, bot, start_timestamp=7)
+        headers = {
+            'Authorization': 'OAuth token',
+            webhook.SECRET_HEADER: 's3cret',
+        }
+        statuses = asyncio.run(post_events(engine, [
+            (headers, PAYLOAD),
+            (headers, PAYLOAD),
+            (headers, {'homeworks': 'не список'}),
+            ({**headers, webhook.SECRET_HEADER: 'wrong'}, PAYLOAD),
+            ({**headers, 'Authorization': 'OAuth nobody'}, PAYLOAD),
+        ]))
+        assert statuses == [202, 202, 400, 403, 404]
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [1, 2], (
+            'Повторный вебхук с тем же статусом не должен слать сообщение'
+        )
+        state = engine.poller.states[tenants.Subscription('token', 1)]
+        assert state.cursor == 7, (
+            'Вебхук не должен сдвигать курсор опроса-сверки'
+        )
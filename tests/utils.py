@@ -1,6 +1,8 @@
 from inspect import signature
 from types import ModuleType
 
+import schema
+
 
 def check_function(scope: ModuleType, func_name: str, params_qty: int = 0):
     """Checks if scope has a function with specific name and params with qty"""
@@ -37,3 +39,30 @@ def check_default_var_exists(scope: ModuleType, var_name: str) -> None:
         f'{var_name} должна быть переменной, а не функцией.'
     )
 
+
+class FakeBot:
+    """Бот, который запоминает отправленное: [(chat_id, text)].
+
+    Исключения из failures выбрасываются по одному перед отправками.
+    """
+
+    def __init__(self, failures=()):
+        self.sent = []
+        self.failures = list(failures)
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+
+
+def make_homework(id, status, date='2022-01-01T00:00:00Z'):
+    """Работа в том виде, в каком её отдаёт API."""
+    return {'id': id, 'homework_name': f'hw{id}', 'status': status,
+            'date_updated': date}
+
+
+def make_record(id, status, date='2022-01-01T00:00:00Z'):
+    """Та же работа после проверки схемы."""
+    return schema.HomeworkRecord(**make_homework(id, status, date),
+                                 reviewer_comment=None, lesson_name=None)
@@ -0,0 +1,73 @@
+"""Приём статусов домашних работ вебхуком вместо опроса API.
+
+POST /homework_statuses с заголовком Authorization: OAuth <токен> и телом
+того же вида, что отдаёт API ({"homeworks": [...], "current_date": ...}).
+Тело проверяется schema.validate_response и отправляется в обработку
+всем подпискам на этот токен; ответ 202 не ждёт отправки сообщений.
+"""
+import hmac
+import json
+import logging
+
+from aiohttp import web
+
+import exceptions
+import homework
+import schema
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = '/homework_statuses'
+SECRET_HEADER = 'X-Webhook-Secret'
+
+
+def configure(environ=None):
+    """Читает настройки модуля из environ, по умолчанию homework.config."""
+    global WEBHOOK_SECRET
+    environ = homework.config if environ is None else environ
+    WEBHOOK_SECRET = environ.get('WEBHOOK_SECRET')
+
+
+configure()
+
+
+def create_app(engine, secret=None) -> web.Application:
+    """Приложение aiohttp, передающее вебхуки в engine.push()."""
+    if secret is None:
+        secret = WEBHOOK_SECRET
+
+    async def receive(request):
+        if secret and not hmac.compare_digest(
+                request.headers.get(SECRET_HEADER, ''), secret):
+            raise web.HTTPForbidden(text='Неверный секрет вебхука')
+        scheme, _, token = request.headers.get(
+            'Authorization', '').partition(' ')
+        if scheme != 'OAuth' or not token:
+            raise web.HTTPUnauthorized(text='Нет токена OAuth')
+        try:
+            payload = schema.validate_response(
+                await request.json(loads=json.loads))
+        except exceptions.ResponseValidationError as error:
+            raise web.HTTPBadRequest(
+                text=json.dumps({'errors': error.errors}, ensure_ascii=False),
+                content_type='application/json')
+        except ValueError as error:
+            raise web.HTTPBadRequest(text=f'Некорректный JSON: {error}')
+        accepted = engine.push(token, payload)
+        if not accepted:
+            raise web.HTTPNotFound(text='Нет подписок на этот токен')
+        return web.json_response({'accepted': accepted}, status=202)
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, receive)
+    return app
+
+
+async def start(engine, port: int, host: str = '0.0.0.0',
+                secret=None) -> web.AppRunner:
+    """Поднимает приём вебхуков в текущем цикле событий."""
+    runner = web.AppRunner(create_app(engine, secret), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f'Приём вебхуков на порту {port}{WEBHOOK_PATH}')
+    return runner